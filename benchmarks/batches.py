@@ -0,0 +1,74 @@
+"""
+Per element Stream.filter/map compared with Stream.filter_batches/map_batches on edges:
+filtering of zero-length edges as in main.py, computing of lengths of edges and
+the width of the edges rotated and scaled.
+Usage: python -m benchmarks.batches [count] [batch_size]
+"""
+import math
+import random
+import sys
+import time
+
+from parser.functions import np
+from parser.io import Point, Edge
+from parser.stream import Stream
+
+ENDS = {'ax': 'point_a.x', 'ay': 'point_a.y', 'bx': 'point_b.x', 'by': 'point_b.y'}
+
+
+def edges(n: int) -> list[Edge]:
+    rnd = random.Random(0)
+    result = list()
+    for _ in range(n):
+        point = Point(round(rnd.random() * 100, 1), round(rnd.random() * 100, 1))
+        # every tenth edge is a zero-length one
+        result.append(Edge(point, point if rnd.random() < 0.1 else Point(rnd.random() * 100, rnd.random() * 100)))
+    return result
+
+
+def lengths(batch):
+    return np.hypot(batch['bx'] - batch['ax'], batch['by'] - batch['ay'])
+
+
+def rotated_width(batch) -> list:
+    """
+    width of the bounding box of the edges rotated by 30 degrees and scaled
+    """
+    cos, sin = np.cos(np.pi / 6) * 1.5, np.sin(np.pi / 6) * 1.5
+    xs = np.concatenate((batch['ax'] * cos - batch['ay'] * sin, batch['bx'] * cos - batch['by'] * sin))
+    return [xs.min(), xs.max()]
+
+
+def rotated_x(edge: Edge) -> (float, float):
+    cos, sin = math.cos(math.pi / 6) * 1.5, math.sin(math.pi / 6) * 1.5
+    return edge.point_a.x * cos - edge.point_a.y * sin, edge.point_b.x * cos - edge.point_b.y * sin
+
+
+def measure(name: str, run, n: int):
+    started = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - started
+    print(f'{name:>17}: {elapsed:.3f}s, {n / elapsed:10.0f} edges/s, result {result:.3f}')
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 4096
+    data = edges(n)
+    if np is None:
+        print('numpy is not installed, batches are lists')
+        sys.exit(0)
+    measure('filter', lambda: Stream(data).filter(lambda item: item.length() > 0).count(), n)
+    measure('filter_batches', lambda: Stream(data).filter_batches(lambda batch: lengths(batch) > 0, Edge.COLUMNS,
+                                                                  batch_size=batch_size, to_row=Edge.to_row).count(), n)
+    measure('by attributes', lambda: Stream(data).filter_batches(lambda batch: lengths(batch) > 0, ENDS,
+                                                                 batch_size=batch_size).count(), n)
+    measure('map', lambda: sum(Stream(data).map(lambda item: item.length())), n)
+    measure('map_batches', lambda: sum(Stream(data).map_batches(lengths, Edge.COLUMNS, batch_size=batch_size,
+                                                                to_row=Edge.to_row)), n)
+    measure('batch sums', lambda: sum(Stream(data).map_batches(lambda batch: [lengths(batch).sum()], Edge.COLUMNS,
+                                                               batch_size=batch_size, to_row=Edge.to_row)), n)
+    measure('transform', lambda: (lambda xs: max(xs) - min(xs))(
+        Stream(data).map(rotated_x).flat_map().to_list()), n)
+    measure('transform batches', lambda: (lambda xs: max(xs) - min(xs))(
+        Stream(data).map_batches(rotated_width, Edge.COLUMNS, batch_size=batch_size, to_row=Edge.to_row).to_list()), n)
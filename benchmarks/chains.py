@@ -0,0 +1,57 @@
+"""
+Size of the graph with chains of nodes of degree 2 contracted and time of calculate_paths with and without
+the contraction on G-code files and on synthetic jobs of closed contours and of polylines crossing each other.
+Usage: python -m benchmarks.chains [file.gcode ...]
+"""
+import copy
+import random
+import sys
+import time
+
+from benchmarks.contours import contours
+from graph import add_edge, calculate_paths, contract_chains
+from parser.io import GCodeFileReader, Point, Edge
+
+
+def polylines(count: int, nodes: int) -> list[Edge]:
+    """
+    random walks, they cross where they share a node of the 1 mm grid
+    """
+    rnd = random.Random(0)
+    edges = list()
+    for _ in range(count):
+        x, y = rnd.randint(0, 1000), rnd.randint(0, 1000)
+        for _ in range(nodes):
+            step_x, step_y = rnd.choice(((1, 0), (-1, 0), (0, 1), (0, -1)))
+            edges.append(Edge(Point(float(x), float(y)), Point(float(x + step_x), float(y + step_y))))
+            x, y = x + step_x, y + step_y
+    return edges
+
+
+def measure(name: str, edges: list[Edge]):
+    nodes = list()
+    matrix = dict()
+    for edge in edges:
+        if edge.length() > 0:
+            add_edge(nodes, matrix, edge)
+    contracted_nodes, contracted, _ = contract_chains(nodes, matrix)
+    size = sum(len(neighbours) for neighbours in matrix.values()) // 2
+    # a loop is counted once by its node
+    contracted_size = sum(len(neighbours) + (key in neighbours) for key, neighbours in contracted.items()) // 2
+    timings = dict()
+    for contract in (False, True):
+        walked = copy.deepcopy(matrix)
+        started = time.perf_counter()
+        paths, _ = calculate_paths(nodes, walked, contract=contract)
+        timings[contract] = (time.perf_counter() - started, len(paths))
+    print(f'{name}: nodes {len(matrix)} -> {len(contracted)}, edges {size} -> {contracted_size} '
+          f'({1 - contracted_size / size:.1%} less), calculate_paths {timings[False][0]:.3f}s -> '
+          f'{timings[True][0]:.3f}s ({timings[False][0] / timings[True][0]:.2f}x), '
+          f'paths {timings[False][1]} -> {timings[True][1]}')
+
+
+if __name__ == '__main__':
+    for filename in sys.argv[1:]:
+        measure(filename, list(GCodeFileReader(filename)))
+    measure('contours', contours(2000, 20_000))
+    measure('polylines', polylines(200, 1000))
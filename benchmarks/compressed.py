@@ -0,0 +1,70 @@
+"""
+End-to-end time of parsing compressed G-code: decompressed to a temporary file and parsed, compared with
+streamed by GCodeFileReader and streamed with decompression in a background thread.
+The file is compressed by gzip, bz2 and xz first when it is not given compressed.
+Usage: python -m benchmarks.compressed [file.gcode] [repeat]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.contours import contours
+from optimizer.streaming import StreamingOptimizer
+from parser.compression import COMPRESSIONS, compression
+from parser.io import GCodeFileReader, GCodeFileWriter
+
+
+def measure(function, repeat: int) -> (float, int):
+    best = None
+    edges = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        edges = function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, edges
+
+
+def decompress_and_parse(filename: str, directory: str) -> int:
+    module = compression(filename)
+    plain = os.path.join(directory, 'plain.gcode')
+    with module.open(filename, 'rb') as source, open(plain, 'wb') as target:
+        shutil.copyfileobj(source, target, 1024 * 1024)
+    edges = sum(1 for _ in GCodeFileReader(plain))
+    os.remove(plain)
+    return edges
+
+
+def stream(filename: str, background: bool) -> int:
+    return sum(1 for _ in GCodeFileReader(filename, background=background))
+
+
+if __name__ == '__main__':
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    with tempfile.TemporaryDirectory() as directory:
+        if len(sys.argv) > 1:
+            source = sys.argv[1]
+        else:
+            source = os.path.join(directory, 'contours.gcode')
+            GCodeFileWriter(source).write(StreamingOptimizer(contours(2000, 20_000), 1000.0, 1000.0))
+        if compression(source) is not None:
+            files = [source]
+        else:
+            files = list()
+            for suffix in COMPRESSIONS.keys():
+                started = time.perf_counter()
+                filename = os.path.join(directory, f'source.gcode{suffix}')
+                GCodeFileWriter(filename).write(line.rstrip('\n') for line in open(source))
+                print(f'{suffix:>4} written in {time.perf_counter() - started:.3f}s, '
+                      f'{os.path.getsize(source) / os.path.getsize(filename):.1f}x smaller')
+                files.append(filename)
+        for filename in files:
+            name = compression(filename).__name__
+            unpacked, edges = measure(lambda: decompress_and_parse(filename, directory), repeat)
+            streamed, _ = measure(lambda: stream(filename, False), repeat)
+            background, _ = measure(lambda: stream(filename, True), repeat)
+            print(f'{name:>5}: {edges} edges, decompress and parse {unpacked:.3f}s, '
+                  f'streamed {streamed:.3f}s ({unpacked / streamed:.2f}x), '
+                  f'background {background:.3f}s ({unpacked / background:.2f}x)')
@@ -0,0 +1,42 @@
+"""
+Travel and time of StreamingOptimizer on closed contours: many small polygons and a few contours of 10k+ nodes.
+Closed contours are entered at their node nearest to the head.
+Usage: python -m benchmarks.contours [polygons] [nodes]
+"""
+import math
+import random
+import sys
+import time
+
+from optimizer.streaming import StreamingOptimizer
+from parser.io import Point, Edge
+
+
+def polygon(cx: float, cy: float, radius: float, n: int, phase: float) -> list[Edge]:
+    points = [Point(round(cx + radius * math.cos(phase + 2 * math.pi * idx / n), 3),
+                    round(cy + radius * math.sin(phase + 2 * math.pi * idx / n), 3)) for idx in range(n)]
+    return [Edge(points[idx - 1], points[idx]) for idx in range(1, n)] + [Edge(points[-1], points[0])]
+
+
+def contours(polygons: int, nodes: int) -> list[Edge]:
+    rnd = random.Random(0)
+    edges = list()
+    for _ in range(polygons):
+        edges.extend(polygon(rnd.uniform(0, 1000), rnd.uniform(0, 1000), rnd.uniform(2, 10), rnd.randint(5, 60),
+                             rnd.uniform(0, 2 * math.pi)))
+    for idx in range(3):
+        edges.extend(polygon(500.0, 500.0, 100.0 * (idx + 2), nodes, rnd.uniform(0, 2 * math.pi)))
+    return edges
+
+
+if __name__ == '__main__':
+    polygons = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    nodes = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    edges = contours(polygons, nodes)
+    started = time.perf_counter()
+    optimizer = StreamingOptimizer(edges, 1000.0, 1000.0, window_size=len(edges))
+    lines = sum(1 for _ in optimizer)
+    elapsed = time.perf_counter() - started
+    report = optimizer.report
+    print(f'{len(edges)} edges, {lines} lines: {elapsed:.3f}s, {report.paths} paths, {report.cycles} cycles, '
+          f'travel {report.travel_length:.1f}, saved by entry nodes {report.cycles_saved:.1f}')
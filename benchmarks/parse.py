@@ -0,0 +1,41 @@
+"""
+Parse throughput of the modal GCodeMachine and of the GCodeFileReader built on it.
+Usage: python -m benchmarks.parse [file.gcode] [repeat]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from parser.io import GCodeMachine, GCodeFileReader
+
+
+def measure(name: str, function, lines: int):
+    started = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - started
+    print(f'{name:>24}: {elapsed:8.3f}s {lines / elapsed:12.0f} lines/s')
+    return elapsed
+
+
+def run_machine(commands: list[str]):
+    machine = GCodeMachine(precision=1)
+    for command in commands:
+        machine.command(command)
+        if machine.is_on():
+            for _ in machine.points(0.01):
+                pass
+
+
+if __name__ == '__main__':
+    filename = sys.argv[1] if len(sys.argv) > 1 else '0250.NOT_OPPTIMIZE.gcode'
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    with open(filename) as source:
+        commands = source.readlines() * repeat
+    with tempfile.NamedTemporaryFile('w', suffix='.gcode', delete=False) as target:
+        target.writelines(commands)
+    try:
+        measure('GCodeMachine.command', lambda: run_machine(commands), len(commands))
+        measure('GCodeFileReader', lambda: sum(1 for _ in GCodeFileReader(target.name)), len(commands))
+    finally:
+        os.remove(target.name)
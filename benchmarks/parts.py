@@ -0,0 +1,81 @@
+"""
+Time of walking paths of a nested sheet by calculate_paths for every copy compared with PartDetector walking
+a part once per class, and of StreamingOptimizer with and without repeated_parts, the measured speedup of
+the optimizer is printed next to the estimate of the report.
+Copies are placed on a grid of steps rounded to 0.1 mm as the reader rounds them.
+Usage: python -m benchmarks.parts [copies] [nodes]
+"""
+import math
+import random
+import sys
+import time
+
+from benchmarks.contours import polygon
+from graph import add_edge, calculate_paths
+from optimizer.parts import PartDetector
+from optimizer.streaming import StreamingOptimizer
+from parser.io import Point, Edge
+
+
+def part(rnd: random.Random, nodes: int) -> list[Edge]:
+    """
+    an outline with holes and a slot
+    """
+    edges = polygon(0.0, 0.0, 20.0, nodes, rnd.uniform(0, 2 * math.pi))
+    for _ in range(3):
+        edges.extend(polygon(rnd.uniform(-8, 8), rnd.uniform(-8, 8), rnd.uniform(1, 3), nodes // 4, 0.0))
+    slot = [Point(-5.0, -15.0), Point(5.0, -15.0), Point(5.0, -12.0), Point(-5.0, -12.0)]
+    edges.extend(Edge(slot[idx - 1], slot[idx]) for idx in range(1, len(slot)))
+    return edges
+
+
+def sheet(copies: int, nodes: int) -> list[Edge]:
+    rnd = random.Random(0)
+    # parts are drawn on the grid of the reader, so their copies are exact
+    shapes = [[Edge(Point(round(edge.point_a.x, 1), round(edge.point_a.y, 1)),
+                    Point(round(edge.point_b.x, 1), round(edge.point_b.y, 1))) for edge in part(rnd, nodes)]
+              for _ in range(3)]
+    side = math.ceil(math.sqrt(copies))
+    edges = list()
+    for idx in range(copies):
+        dx = round(50.0 * (idx % side) + 0.3 * idx, 1)
+        dy = round(50.0 * (idx // side) + 0.7 * idx, 1)
+        for edge in shapes[idx % len(shapes)]:
+            edges.append(Edge(Point(round(edge.point_a.x + dx, 1), round(edge.point_a.y + dy, 1)),
+                              Point(round(edge.point_b.x + dx, 1), round(edge.point_b.y + dy, 1))))
+    rnd.shuffle(edges)
+    return edges
+
+
+def walk(edges: list[Edge]) -> int:
+    nodes = list()
+    matrix = dict()
+    for edge in edges:
+        add_edge(nodes, matrix, edge)
+    paths, _ = calculate_paths(nodes, matrix)
+    return sum(len(path) - 1 for path in paths)
+
+
+def measure(function) -> (float, object):
+    started = time.perf_counter()
+    result = function()
+    return time.perf_counter() - started, result
+
+
+if __name__ == '__main__':
+    copies = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    nodes = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    edges = sheet(copies, nodes)
+    every, walked = measure(lambda: walk(edges))
+    detector = PartDetector()
+    once, (paths, _) = measure(lambda: detector.paths(edges))
+    assert walked == sum(len(path) - 1 for path in paths)
+    print(f'{len(edges)} edges of {copies} copies: every copy {every:.3f}s, once per class {once:.3f}s '
+          f'({every / once:.2f}x), {detector.report}')
+    times = dict()
+    for repeated_parts in (False, True):
+        optimizer = StreamingOptimizer(edges, 1000.0, 1000.0, window_size=len(edges), repeated_parts=repeated_parts)
+        times[repeated_parts], lines = measure(lambda: sum(1 for _ in optimizer))
+        print(f'streaming, repeated parts {repeated_parts!s:>5}: {times[repeated_parts]:.3f}s, {lines} lines, '
+              f'{optimizer.report.paths} paths, travel {optimizer.report.travel_length:.1f}')
+    print(f'measured speedup of streaming: {times[False] / times[True]:.2f}x, {optimizer.report.parts}')
@@ -0,0 +1,52 @@
+"""
+Speed and accuracy of Stream.to_pockets compared with Stream.to_buckets.
+The real size of a pocket is the memory traced while the same elements are built again.
+Usage: python -m benchmarks.pockets [mem_limit]
+"""
+import random
+import sys
+import time
+import tracemalloc
+
+from parser.io import Edge, Point
+from parser.stream import Stream
+
+
+def edges(n: int):
+    rnd = random.Random(0)
+    return (Edge(Point(rnd.random(), rnd.random()), Point(rnd.random(), rnd.random())) for _ in range(n))
+
+
+def records(n: int):
+    rnd = random.Random(0)
+    return ({"id": 10 ** 6 + i,
+             "name": f"job-{10 ** 6 + i}",
+             "tags": ["engrave", "cut"][:i % 3],
+             "power": [rnd.random() for _ in range(i % 5)]} for i in range(n))
+
+
+def real_size(supplier, n: int, count: int) -> int:
+    tracemalloc.start()
+    try:
+        data = supplier(n)
+        before = tracemalloc.get_traced_memory()[0]
+        chunk = [next(data) for _ in range(count)]
+        return tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+if __name__ == '__main__':
+    mem_limit = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    n = 200_000
+    for name, supplier in (('edges', edges), ('records', records)):
+        started = time.perf_counter()
+        Stream(supplier(n)).to_buckets(1000).count()
+        buckets_time = time.perf_counter() - started
+        for calibrate in (False, True):
+            started = time.perf_counter()
+            pockets = Stream(supplier(n)).to_pockets(mem_limit, calibrate=calibrate).map(len).to_list()
+            pockets_time = time.perf_counter() - started
+            error = real_size(supplier, n, pockets[0]) / mem_limit - 1
+            print(f'{name:>8} calibrate={str(calibrate):5}: {len(pockets):5} pockets, '
+                  f'{pockets_time:.3f}s (to_buckets {buckets_time:.3f}s), size error {error:+.1%}')
@@ -0,0 +1,67 @@
+"""
+Throughput of the schema inference: the former recursive Metadata.compute, the iterative one,
+sampled lists and the tree reduce of partial schemas of parallel workers. The parallel mode falls back to
+the sequential one below MetadataAggregator.aggregate_parallel min_size records and on one core.
+Usage: python -m benchmarks.schema [count] [workers]
+"""
+import random
+import re
+import sys
+import time
+from functools import partial
+
+from parser.schema import Metadata, MetadataAggregator
+from parser.stream import Stream
+
+
+def records(n: int):
+    rnd = random.Random(0)
+    return ({"id": 10 ** 6 + i,
+             "name": f"job-{i % 10}",
+             "material": {"kind": ["plywood", "acrylic", "leather"][i % 3], "thickness": rnd.random()},
+             "tags": ["engrave", "cut"][:i % 3],
+             "passes": [{"power": rnd.random(), "speed": rnd.random(), "note": None} for _ in range(i % 4)],
+             "path": [[rnd.random(), rnd.random()] for _ in range(100)]} for i in range(n))
+
+
+def recursive_compute(obj) -> Metadata:
+    """
+    Metadata.compute before it became iterative
+    """
+    obj_type = re.sub(r"<class '(.+)'>", r'\1', str(type(obj)))
+    if obj is None:
+        return Metadata(obj_type=obj_type, schema=None, nullable=True)
+    if isinstance(obj, list):
+        if len(obj) == 0:
+            return Metadata(obj_type=obj_type, schema=None)
+        return Metadata(obj_type=obj_type, schema=Stream(obj).map(recursive_compute).reduce(Metadata.merge))
+    if isinstance(obj, dict):
+        return Metadata(obj_type=obj_type, schema={key: recursive_compute(value) for key, value in obj.items()})
+    schema = obj if isinstance(obj, str) and len(obj) <= 64 else None
+    return Metadata(obj_type=obj_type, schema=schema)
+
+
+def sequential(n: int, compute) -> Metadata:
+    return Stream(records(n)).map(compute).reduce(Metadata.merge)
+
+
+def parallel(n: int, workers: int, sample_size: int = None) -> Metadata:
+    return MetadataAggregator.aggregate_parallel(records(n), n=workers, sample_size=sample_size)
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    expected = None
+    for name, run in (('recursive', lambda: sequential(n, recursive_compute)),
+                      ('iterative', lambda: sequential(n, Metadata.compute)),
+                      ('sampled 8', lambda: sequential(n, partial(Metadata.compute, sample_size=8))),
+                      (f'parallel {workers}', lambda: parallel(n, workers)),
+                      (f'parallel {workers} sampled 8', lambda: parallel(n, workers, sample_size=8))):
+        started = time.perf_counter()
+        schema = run()
+        elapsed = time.perf_counter() - started
+        # partial schemas are merged in another order, so enums are compared as sets
+        expected = expected or schema
+        print(f'{name:>20}: {elapsed:.3f}s, {n / elapsed:10.0f} records/s, '
+              f'same schema: {not expected.diff(schema)}')
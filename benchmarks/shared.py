@@ -0,0 +1,43 @@
+"""
+Edge arrays sent to ParallelStream workers through the queue and through shared memory. Every worker returns
+lengths of all its edges, so arrays go both ways. Shared blocks left after the runs are counted.
+Usage: python -m benchmarks.shared [arrays] [rows] [workers]
+"""
+import glob
+import sys
+import time
+
+import numpy as np
+
+from parser.stream import Stream
+
+
+def arrays(count: int, rows: int):
+    rnd = np.random.default_rng(0)
+    return (rnd.random((rows, 4)) * 1000 for _ in range(count))
+
+
+def lengths(idx: int):
+    def combiner(items) -> np.ndarray:
+        return np.concatenate([np.hypot(ends[:, 2] - ends[:, 0], ends[:, 3] - ends[:, 1]) for ends in items] or [[]])
+
+    return combiner
+
+
+def run(count: int, rows: int, workers: int, shared_memory: bool) -> float:
+    return float(sum(result.sum() for result in Stream(arrays(count, rows))
+                     .parallelize(n=workers, max_queue_size=8, shared_memory=shared_memory)
+                     .consume(lengths)))
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    for shared_memory in (False, True):
+        started = time.perf_counter()
+        total = run(count, rows, workers, shared_memory)
+        elapsed = time.perf_counter() - started
+        print(f'{"shared memory" if shared_memory else "queue":>13}: {elapsed:.3f}s, '
+              f'{count * rows * 32 / elapsed / 2 ** 20:8.1f} MB/s, total length {total:.1f}')
+    print(f'shared blocks left: {len(glob.glob("/dev/shm/ps*"))}')
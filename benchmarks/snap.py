@@ -0,0 +1,46 @@
+"""
+Endpoint snapping of fragmented contours: every edge gets its own copies of its ends shifted by up to 0.05 mm,
+so the strokes fall apart into single edges. Time of snapping and of the optimization with and without it.
+Usage: python -m benchmarks.snap [polygons]
+"""
+import random
+import sys
+import time
+
+from benchmarks.contours import contours
+from optimizer.snap import EndpointSnapper
+from optimizer.streaming import StreamingOptimizer
+from parser.io import Point, Edge
+
+
+def fragmented(edges: list[Edge], shift: float) -> list[Edge]:
+    rnd = random.Random(0)
+
+    def moved(point: Point) -> Point:
+        return Point(round(point.x + rnd.uniform(-shift, shift), 3), round(point.y + rnd.uniform(-shift, shift), 3))
+
+    return [Edge(moved(edge.point_a), moved(edge.point_b)) for edge in edges]
+
+
+def optimize(edges: list[Edge]) -> (float, StreamingOptimizer):
+    started = time.perf_counter()
+    optimizer = StreamingOptimizer(edges, 1000.0, 1000.0, window_size=len(edges))
+    for _ in optimizer:
+        pass
+    return time.perf_counter() - started, optimizer
+
+
+if __name__ == '__main__':
+    polygons = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    edges = fragmented(contours(polygons, 100), 0.025)
+    elapsed, optimizer = optimize(edges)
+    print(f'{"fragmented":>10}: {len(edges)} edges, {optimizer.report.paths} paths, '
+          f'travel {optimizer.report.travel_length:.1f}, optimized in {elapsed:.3f}s')
+    snapper = EndpointSnapper(tolerance=0.075)
+    started = time.perf_counter()
+    snapped = snapper.snap(edges)
+    snap_time = time.perf_counter() - started
+    elapsed, optimizer = optimize(snapped)
+    print(f'{"snapped":>10}: {len(snapped)} edges, {optimizer.report.paths} paths, '
+          f'travel {optimizer.report.travel_length:.1f}, snapped in {snap_time:.3f}s, optimized in {elapsed:.3f}s')
+    print(f'{"":>10}  {str(snapper.report)}')
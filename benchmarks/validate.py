@@ -0,0 +1,25 @@
+"""
+Validation of records against a known schema: computing Metadata of a record and diffing it
+compared with the validator compiled by Metadata.compile.
+Usage: python -m benchmarks.validate [count]
+"""
+import sys
+import time
+
+from benchmarks.schema import records
+from parser.schema import Metadata, MetadataAggregator
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    data = list(records(n))
+    schema = MetadataAggregator.aggregate(data)
+    started = time.perf_counter()
+    diffed = sum(len(Metadata.compute(record).diff(schema)) for record in data)
+    diff_time = time.perf_counter() - started
+    validate = schema.compile()
+    started = time.perf_counter()
+    validated = sum(len(validate(record)) for record in data)
+    validate_time = time.perf_counter() - started
+    print(f'compute + diff: {diff_time:.3f}s, {n / diff_time:10.0f} records/s, {diffed} differences')
+    print(f'      compiled: {validate_time:.3f}s, {n / validate_time:10.0f} records/s, {validated} problems, '
+          f'{diff_time / validate_time:.1f}x faster')
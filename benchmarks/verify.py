@@ -0,0 +1,49 @@
+"""
+Equivalence check of a million edges with their reordered copy where edges are reversed, some neighbour edges
+are merged, a few edges are removed and an extra one is added, with and without numpy.
+Usage: python -m benchmarks.verify [rows] [columns]
+"""
+import random
+import sys
+import time
+
+from optimizer.verify import EquivalenceChecker, np
+from parser.io import Point, Edge
+
+
+def grid(rows: int, columns: int) -> list[Edge]:
+    return [Edge(Point(float(column), row * 0.5), Point(column + 1.0, row * 0.5))
+            for row in range(rows) for column in range(columns)]
+
+
+def optimized(edges: list[Edge], columns: int) -> (list[Edge], float):
+    rnd = random.Random(0)
+    result = list()
+    removed = 0.0
+    idx = 0
+    while idx < len(edges):
+        edge = edges[idx]
+        if rnd.random() < 0.01 and (idx + 1) % columns != 0:
+            edge = Edge(edge.point_a, edges[idx + 1].point_b)
+            idx += 1
+        if rnd.random() < 0.0001:
+            removed += edge.length()
+        else:
+            result.append(Edge(edge.point_b, edge.point_a) if rnd.random() < 0.5 else edge)
+        idx += 1
+    result.append(Edge(Point(-5.0, -5.0), Point(-1.0, -2.0)))
+    rnd.shuffle(result)
+    return result, removed
+
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    columns = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    expected = grid(rows, columns)
+    actual, removed = optimized(expected, columns)
+    print(f'removed length: {removed:.3f}, extra length: 5.000')
+    for vectorized in ((True, False) if np is not None else (False,)):
+        checker = EquivalenceChecker(vectorized=vectorized)
+        started = time.perf_counter()
+        report = checker.check(expected, actual)
+        print(f'numpy={str(vectorized):5}: {time.perf_counter() - started:.3f}s, {str(report)}')
@@ -0,0 +1,40 @@
+"""
+Memory and throughput of Stream.zip_stream strategies for every JoinType.
+The right stream holds the keys of the left one in the reversed order, the worst case for the hash join,
+and both streams are ordered for the sort merge join.
+Usage: python -m benchmarks.zip [count]
+"""
+import sys
+import time
+import tracemalloc
+
+from parser.stream import Stream, JoinType, JoinStrategy
+
+
+def left(n: int):
+    return ({'key': f'{idx:09d}', 'value': idx} for idx in range(0, n))
+
+
+def right(n: int, is_ordered: bool):
+    keys = range(n // 2, n + n // 2)
+    return ({'key': f'{idx:09d}', 'price': idx * 0.5} for idx in (keys if is_ordered else reversed(keys)))
+
+
+def join(n: int, join_type: JoinType, strategy: JoinStrategy) -> int:
+    return Stream.zip_stream(left(n), right(n, strategy == JoinStrategy.SORT_MERGE), lambda item: item['key'],
+                             join_type=join_type, strategy=strategy, mem_limit=5_000_000).count()
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    for join_type in JoinType:
+        for strategy in JoinStrategy:
+            started = time.perf_counter()
+            pairs = join(n, join_type, strategy)
+            elapsed = time.perf_counter() - started
+            tracemalloc.start()
+            join(n, join_type, strategy)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f'{join_type.name:>5} {strategy.name:>13}: {pairs:8} pairs, {elapsed:.3f}s, '
+                  f'{n * 2 / elapsed:10.0f} items/s, peak {peak / 1e6:8.2f} MB')
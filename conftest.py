@@ -0,0 +1 @@
+# the modules of the repository are imported by tests as top level packages
@@ -1,92 +1,223 @@
-import re
-
-s_macher = re.compile("(.*)(S[0-9.]+)(.*)")
-x_macher = re.compile("(.*)(X[0-9.]+)(.*)")
-y_macher = re.compile("(.*)(Y[0-9.]+)(.*)")
-f_macher = re.compile("(.*)(F[0-9.]+)(.*)")
-
-
-class Point:
-    _x: float
-    _y: float
-
-    def __init__(self, x: float, y: float):
-        self._x = x
-        self._y = y
-
-    def __str__(self):
-        return f'X{str(self._x)}Y{str(self._y)}'
-
-    @property
-    def x(self) -> float:
-        return self._x
-
-    @property
-    def y(self) -> float:
-        return self._y
-
-    @staticmethod
-    def parse_x(coord: str) -> float:
-        return round(float(x_macher.sub(r"\2", coord)[1:].strip()), 1)
-
-    @staticmethod
-    def parse_y(coord: str) -> float:
-        return round(float(y_macher.sub(r"\2", coord)[1:].strip()), 1)
-
-    @staticmethod
-    def compare(p1, p2) -> float:
-        d = (p1.x + p1.y) - (p2.x + p2.y)
-        return (p1.x - p2.x) if d == 0 else d
-
-    @staticmethod
-    def length(p1, p2):
-        ax = (p1.x - p2.x)
-        ay = (p1.y - p2.y)
-        return (ax * ax + ay * ay) ** 0.5
-
-
-class Edge:
-    _point_a: Point
-    _point_b: Point
-
-    def __init__(self, point_a: Point, point_b: Point = None):
-        self._point_a = point_a
-        self._point_b = point_a if point_b is None else point_b
-
-    def length(self):
-        return Point.length(self._point_b, self._point_a)
-
-    def extend(self, point: Point) -> bool:
-        if not self._is_on_line(point):
-            return False
-        elif self._is_middle(point):
-            return False
-        else:
-            self._point_b = point
-            return True
-
-    def to_plot_points(self):
-        return [[self._point_a.x, self._point_b.x],
-                [self._point_a.y, self._point_b.y]]
-
-    def _is_middle(self, point: Point) -> bool:
-        alpha = 1 if self._point_a.x < self._point_b.x else -1
-        beta = 1 if self._point_a.y < self._point_b.y else -1
-        check_x = (alpha * self._point_a.x <= alpha * point.x <= alpha * self._point_b.x)
-        check_y = (beta * self._point_a.y <= beta * point.y <= beta * self._point_b.y)
-        return check_x and check_y
-
-    def _is_on_line(self, point: Point) -> bool:
-        ax = (self._point_a.x - self._point_b.x)
-        ay = (self._point_a.y - self._point_b.y)
-        bx = (point.x - self._point_b.x)
-        by = (point.y - self._point_b.y)
-        return ax * by - ay * bx == 0
-
-    @property
-    def point_a(self) -> Point:
-        return self._point_a
-
-    @property
-    def point_b(self) -> Point:
-        return self._point_b
+from parser.io import Point, Edge
+
+
+def add_edge(nodes: list[Point], matrix: dict[str, dict[str, float]], edge: Edge):
+    key_a = str(edge.point_a)
+    key_b = str(edge.point_b)
+    nodes.append(edge.point_a)
+    nodes.append(edge.point_b)
+    sub_matrix = matrix.get(key_a, dict())
+    sub_matrix[key_b] = edge.length()
+    matrix[key_a] = sub_matrix
+    sub_matrix = matrix.get(key_b, dict())
+    sub_matrix[key_a] = edge.length()
+    matrix[key_b] = sub_matrix
+
+
+def do_step(matrix: dict[str, dict[str, float]],
+            current: str) -> (str, float):
+    step = None
+    density = None
+    for key, value in matrix.get(current).items():
+        if value > 0:
+            if density is None or density > value:
+                density = value
+                step = key
+    if step is not None:
+        matrix.get(step)[current] = -1
+        matrix.get(current)[step] = -1
+    return step, density
+
+
+class Path:
+    points: list[Point]
+    density: float
+    is_cycled: bool
+    power: float
+    speed: float
+
+    def __init__(self, points: list[Point], density: float, power: float = None, speed: float = None):
+        self.points = points
+        self.density = density
+        self.power = power
+        self.speed = speed
+        # a closed contour ends at its first node, it can be entered at any of its nodes
+        self.is_cycled = len(points) > 3 and str(points[0]) == str(points[-1])
+
+    def entries(self) -> list[Point]:
+        """
+        nodes the path can be started at
+        """
+        if self.is_cycled:
+            return self.points[:-1]
+        return [self.points[0], self.points[-1]]
+
+    def distance(self, point: Point) -> float:
+        return min(Point.length(point, entry) for entry in self.entries())
+
+    def start_at(self, entry: Point):
+        """
+        rotate a cycled path or reverse an open one to start at the entry
+        """
+        points = self.points
+        if self.is_cycled:
+            idx = next(idx for idx, node in enumerate(points) if node is entry)
+            if idx > 0:
+                self.points = points[idx:] + points[1:idx + 1]
+        elif entry is not points[0]:
+            points.reverse()
+
+
+def chain_nodes(matrix: dict[str, dict[str, float]]) -> set[str]:
+    """
+    keys of nodes of degree 2
+    """
+    return set(key for key, neighbours in matrix.items() if len(neighbours) == 2 and key not in neighbours)
+
+
+def contract_chains(nodes: list[Point], matrix: dict[str, dict[str, float]], inner_nodes: set[str] = None) \
+        -> (list[Point], dict[str, dict[str, float]], dict[(str, str), (list[str], float)]):
+    """
+    Nodes and matrix of the graph with maximal chains of nodes of degree 2 contracted to super-edges between
+    their ends, and the inner nodes and the length of the super-edges by their ends in both directions.
+    A node of degree 2 has no choice of the next step, so a chain is walked at once. Walks are not started at inner
+    nodes of chains, so the paths and their count may differ from the walk of the whole graph.
+    A super-edge weighs the length of its first edge from the end it is walked from, so do_step chooses it as it
+    chooses the first edge of the chain, a closed chain of nodes of degree 2 becomes a loop of one of its nodes.
+    A chain parallel to an edge already contracted keeps its last edges, so the matrix has one edge between two nodes.
+    """
+    contracted = dict()
+    chains = dict()
+    if inner_nodes is None:
+        inner_nodes = chain_nodes(matrix)
+
+    def connect(key_a: str, key_b: str, inner: list[str], length: float, weight_a: float, weight_b: float):
+        if inner and key_b in contracted.get(key_a, ()):
+            last = inner.pop()
+            last_length = matrix[last][key_b]
+            # the last edge first, so a loop split at its last node is split again at the node before
+            connect(last, key_b, [], last_length, last_length, last_length)
+            connect(key_a, last, inner, length - last_length, weight_a, matrix[last][inner[-1] if inner else key_a])
+            return
+        contracted.setdefault(key_a, dict())[key_b] = weight_a
+        contracted.setdefault(key_b, dict())[key_a] = weight_a if key_a == key_b else weight_b
+        if inner:
+            chains[(key_a, key_b)] = (inner, length)
+            if key_a != key_b:
+                chains[(key_b, key_a)] = (inner[::-1], length)
+
+    def follow(start: str, step: str) -> (list[str], str, float, float):
+        """
+        inner nodes, the end, the length and the weight at the end of the chain from start through step
+        """
+        inner = list()
+        previous = start
+        current = step
+        length = matrix[start][step]
+        while current != start and current in inner_nodes:
+            inner.append(current)
+            for key, value in matrix[current].items():
+                if key != previous:
+                    previous, current = current, key
+                    length += value
+                    break
+        return inner, current, length, matrix[current][previous]
+
+    # edges between ends of chains first, so a super-edge is the one to be split when it is parallel to an edge
+    branches = [key for key in matrix.keys() if key not in inner_nodes]
+    for key in branches:
+        for neighbour, value in matrix[key].items():
+            if value > 0 and neighbour not in inner_nodes and neighbour not in contracted.get(key, ()):
+                connect(key, neighbour, [], value, value, matrix[neighbour][key])
+    visited = set()
+    for key in branches:
+        for neighbour, value in matrix[key].items():
+            if value > 0 and neighbour in inner_nodes and neighbour not in visited:
+                inner, end, length, weight = follow(key, neighbour)
+                visited.update(inner)
+                connect(key, end, inner, length, value, weight)
+    for key in matrix.keys():
+        if key in visited or key not in inner_nodes:
+            continue
+        # a closed chain is walked from its node to its nearer neighbour
+        step = min(matrix[key].items(), key=lambda item: item[1])[0]
+        inner, end, length, weight = follow(key, step)
+        visited.add(key)
+        visited.update(inner)
+        connect(key, end, inner, length, matrix[key][step], matrix[key][step])
+    points = dict()
+    # ends of edges are mostly shared by the edges, so a node is formatted once
+    formatted = set()
+    for node in nodes:
+        if id(node) in formatted:
+            continue
+        formatted.add(id(node))
+        key = str(node)
+        if key in contracted and key not in points:
+            points[key] = node
+    return list(points.values()), contracted, chains
+
+
+def calculate_paths(nodes: list[Point],
+                    matrix: dict[str, dict[str, float]],
+                    contract: bool = True) -> (list[list[str]], list[float]):
+    """
+    keys of nodes of paths covering the edges and lengths of the paths, the graph is walked with chains of nodes
+    of degree 2 contracted unless contract is False or the most of nodes are not in chains, when the contraction
+    costs more than it saves
+    """
+    inner_nodes = chain_nodes(matrix) if contract else None
+    if not contract or len(inner_nodes) < len(matrix) / 2:
+        return walk_paths(nodes, matrix)
+    nodes, contracted, chains = contract_chains(nodes, matrix, inner_nodes)
+    paths = list()
+    while nodes:
+        paths.extend(walk_paths(nodes, contracted)[0])
+        # a walk leaves edges of its start of degree 3 or more to walks started later, inner nodes of a chain
+        # are not started at, so a loop or a chain left between started nodes is walked again
+        nodes = [node for node in nodes if any(value > 0 for value in contracted[str(node)].values())]
+    densities = list()
+    for idx, path in enumerate(paths):
+        expanded = [path[0]]
+        length = 0.0
+        for key_a, key_b in zip(path, path[1:]):
+            chain = chains.get((key_a, key_b))
+            if chain is None:
+                length += matrix[key_a][key_b]
+            else:
+                expanded.extend(chain[0])
+                length += chain[1]
+            expanded.append(key_b)
+        paths[idx] = expanded
+        densities.append(length)
+    return paths, densities
+
+
+def walk_paths(nodes: list[Point], matrix: dict[str, dict[str, float]]) -> (list[list[str]], list[float]):
+    paths = list()
+    densities = list()
+    path = list()
+    path_length = 0.0
+    sorted_nodes = sorted(nodes, key=lambda itm: itm.x - itm.y)
+    for node in sorted_nodes:
+        curr_step = str(node)
+        path.append(curr_step)
+        is_reversed = False
+        while curr_step is not None:
+            step_key, density = do_step(matrix, curr_step)
+            if step_key is None:
+                if not is_reversed:
+                    step_key = path[0]
+                    path.reverse()
+                    is_reversed = True
+                else:
+                    if len(path) > 1:
+                        paths.append(path)
+                        densities.append(path_length)
+                    path = list()
+                    path_length = 0.0
+            else:
+                path.append(step_key)
+                path_length += density
+            curr_step = step_key
+    return paths, densities
@@ -1,110 +1,109 @@
-import matplotlib.pyplot as plt
-
-from parser.io import GCodeFileReader, Edge, Point
+import argparse
+import logging
+import os
+import sys
+import time
+
+from optimizer.batch import JobReport, find_jobs, optimize_files
+from parser.io import GCodeFileReader
 from parser.stream import Stream
 
 
-def add_edge(nodes: list[Point], matrix: dict[str, dict[str, float]], edge: Edge):
-    key_a = str(edge.point_a)
-    key_b = str(edge.point_b)
-    nodes.append(edge.point_a)
-    nodes.append(edge.point_b)
-    sub_matrix = matrix.get(key_a, dict())
-    sub_matrix[key_b] = edge.length()
-    matrix[key_a] = sub_matrix
-    sub_matrix = matrix.get(key_b, dict())
-    sub_matrix[key_a] = edge.length()
-    matrix[key_b] = sub_matrix
-
-
-def do_step(matrix: dict[str, dict[str, float]],
-            current: str) -> (str, float):
-    step = None
-    density = None
-    for key, value in matrix.get(current).items():
-        if value > 0:
-            if density is None or density > value:
-                density = value
-                step = key
-    if step is not None:
-        matrix.get(step)[current] = -1
-        matrix.get(current)[step] = -1
-    return step, density
-
-
-class Path:
-    points: list[Point]
-    desity: float
-    is_cycled: bool
-
-    def __init__(self, points: list[str], density: float):
-        pass
-
-    def distance(self, point: Point) -> float:
-        if self.is_cycled:
-            pass
-        else:
-            d_1 = Point.length(point, self.points[0])
-            d_1 = Point.length(point, self.points[0])
-
+def parse_args(args: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Optimize the order of cuts of laser G-code files.')
+    parser.add_argument('inputs', nargs='+', help='G-code files or directories with them')
+    parser.add_argument('-o', '--output-dir', default=None,
+                        help='directory of optimized files, they are written next to the inputs by default')
+    parser.add_argument('--pattern', default='*.gcode', help='pattern of files in the input directories')
+    parser.add_argument('--suffix', default='.optimized', help='suffix of names of optimized files')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help='count of worker processes')
+    parser.add_argument('--window-size', type=int, default=100_000, help='count of edges ordered at once')
+    parser.add_argument('--snap', type=float, default=None, metavar='TOLERANCE',
+                        help='merge ends of edges within the tolerance')
+    parser.add_argument('--dedup', action='store_true', help='remove duplicated and overlapping edges')
+    parser.add_argument('--arc-tolerance', type=float, default=None, help='fit G2/G3 arcs with the tolerance')
+    parser.add_argument('--group-order', choices=['file', 'power', 'speed'], default='file',
+                        help='order of groups of cuts with the same power and speed: as in the file, '
+                             'the least power first or the fastest first')
+    parser.add_argument('--repeated-parts', action='store_true',
+                        help='walk copies of the same part once, for nested sheets')
+    parser.add_argument('--incremental', action='store_true',
+                        help='reuse the order of unchanged parts of the previous optimization of a file')
+    parser.add_argument('--background', action='store_true',
+                        help='decompress gzip, bz2 and xz files in a thread while they are parsed')
+    parser.add_argument('--verify', action='store_true', help='check the optimized files cut the same geometry')
+    parser.add_argument('--preview', action='store_true', help='plot the optimized files')
+    parser.add_argument('-v', '--verbose', action='store_true')
+    return parser.parse_args(args)
+
+
+def summary(reports: list[JobReport], wall_time: float) -> list[str]:
+    width = max([len(report.source) for report in reports] + [4])
+    is_verified = any(report.missing_length is not None for report in reports)
+    lines = [f'{"file":<{width}} {"edges":>8} {"paths":>7} {"travel before":>14} {"travel after":>13} '
+             f'{"saved":>7} {"time, s":>8}' + (f' {"missing":>8} {"extra":>8}' if is_verified else '')]
+    for report in reports:
+        if report.error is not None:
+            lines.append(f'{report.source:<{width}} failed: {report.error}')
+            continue
+        saved = report.travel_saved / report.travel_before if report.travel_before else 0.0
+        lines.append(f'{report.source:<{width}} {report.edges:>8} {report.paths:>7} {report.travel_before:>14.1f} '
+                     f'{report.travel_after:>13.1f} {saved:>7.1%} {report.wall_time:>8.2f}'
+                     + (f' {report.missing_length:>8.3f} {report.extra_length:>8.3f}' if is_verified else ''))
+    done = [report for report in reports if report.error is None]
+    before = sum(report.travel_before for report in done)
+    after = sum(report.travel_after for report in done)
+    lines.append(f'{"total":<{width}} {sum(report.edges for report in done):>8} '
+                 f'{sum(report.paths for report in done):>7} {before:>14.1f} {after:>13.1f} '
+                 f'{(before - after) / before if before else 0.0:>7.1%} {wall_time:>8.2f}')
+    return lines
+
+
+def preview(reports: list[JobReport]):
+    # matplotlib is slow to import, so it is imported only when a preview is requested
+    import matplotlib.pyplot as plt
 
-
-def calculate_paths(nodes: list[Point], matrix: dict[str, dict[str, float]]) -> (list[list[str]], list[float]):
-    paths = list()
-    densities = list()
-    path = list()
-    path_length = 0.0
-    sorted_nodes = sorted(nodes, key=lambda itm: itm.x - itm.y)
-    for node in sorted_nodes:
-        curr_step = str(node)
-        path.append(curr_step)
-        is_reversed = False
-        while curr_step is not None:
-            step_key, density = do_step(matrix, curr_step)
-            if step_key is None:
-                if not is_reversed:
-                    step_key = path[0]
-                    path.reverse()
-                    is_reversed = True
-                else:
-                    if len(path) > 1:
-                        paths.append(path)
-                        densities.append(path_length)
-                    path = list()
-                    path_length = 0.0
-            else:
-                path.append(step_key)
-                path_length += density
-            curr_step = step_key
-    return paths, densities
-
-
-if __name__ == '__main__':
-    gcode_reader = GCodeFileReader("0250.NOT_OPPTIMIZE.gcode")
-    matrix = dict()
-    nodes = list()
     plt.close('all')
-    Stream(gcode_reader) \
-        .filter(lambda item: item.length() > 0) \
-        .peek(lambda item: add_edge(nodes, matrix, item)) \
-        .for_each(lambda item: plt.plot(item.to_plot_points()[0], item.to_plot_points()[1], marker='o'))
+    for report in reports:
+        if report.error is not None:
+            continue
+        plt.figure(report.target)
+        Stream(GCodeFileReader(report.target)) \
+            .filter(lambda item: item.length() > 0) \
+            .for_each(lambda item: plt.plot(item.to_plot_points()[0], item.to_plot_points()[1], marker='o'))
+        plt.grid(True)
+    plt.show()
 
-    paths, densities = calculate_paths(nodes, matrix)
 
-    idx = 0
-    for path in paths:
-        print(f'{str(densities[idx])}: {path}')
-        idx += 1
-        xs = [Point.parse_x(itm) for itm in path]
-        ys = [Point.parse_y(itm) for itm in path]
-        plt.plot(xs, ys, marker='o')
-    # plt.plot(item.to_points()[0], item.to_points()[1], marker='o')
+def main(args: list[str]) -> int:
+    options = parse_args(args)
+    logging.basicConfig(level=logging.INFO if options.verbose else logging.WARNING)
+    jobs = find_jobs(options.inputs, output_dir=options.output_dir, pattern=options.pattern, suffix=options.suffix)
+    if not jobs:
+        print('no files to optimize', file=sys.stderr)
+        return 1
+    started = time.perf_counter()
+    reports = list()
+    for report in optimize_files(jobs,
+                                 processes=options.jobs,
+                                 window_size=options.window_size,
+                                 dedup=options.dedup,
+                                 arc_tolerance=options.arc_tolerance,
+                                 verify=options.verify,
+                                 snap_tolerance=options.snap,
+                                 incremental=options.incremental,
+                                 group_order=options.group_order,
+                                 background=options.background,
+                                 repeated_parts=options.repeated_parts):
+        logging.info(str(report))
+        reports.append(report)
+    reports.sort(key=lambda report: report.source)
+    print('\n'.join(summary(reports, time.perf_counter() - started)))
+    if options.preview:
+        preview(reports)
+    is_failed = any(report.error is not None or report.missing_length or report.extra_length for report in reports)
+    return 1 if is_failed else 0
 
-    # plt.xlabel('X-axis')
-    # plt.ylabel('Y-axis')
-    # plt.title('Line by Coordinates')
-    plt.grid(True)
-    # plt.legend()
 
-    # Show the plot
-    plt.show()
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import logging
+import math
+from typing import Iterable, Iterator
+
+from parser.io import Point, Edge, format_number
+
+logger = logging.getLogger(__name__)
+
+EPSILON = 1e-9
+
+
+class Arc:
+    start: Point
+    end: Point
+    center: Point
+    clockwise: bool
+
+    def __init__(self, start: Point, end: Point, center: Point, clockwise: bool):
+        self.start = start
+        self.end = end
+        self.center = center
+        self.clockwise = clockwise
+
+    def to_gcode(self) -> str:
+        return (f'G{2 if self.clockwise else 3}'
+                f'X{format_number(self.end.x)}Y{format_number(self.end.y)}'
+                f'I{format_number(self.center.x - self.start.x)}J{format_number(self.center.y - self.start.y)}')
+
+
+class ArcReport:
+    def __init__(self):
+        self.lines_before = 0
+        self.lines_after = 0
+        self.arcs = 0
+
+    def __str__(self) -> str:
+        reduction = 1 - self.lines_after / self.lines_before if self.lines_before else 0.0
+        return f'lines: {self.lines_before} -> {self.lines_after} ({reduction:.1%} less), arcs: {self.arcs}'
+
+
+class ArcFitter:
+    """
+    Replace runs of polyline points by circular arcs (G2/G3) where all points of the run and all chords
+    between them deviate from the arc no more than tolerance.
+    The fit slides over the points with a window of max_points, so it is linear in the length of a path
+    and keeps only the window in memory.
+    """
+
+    def __init__(self,
+                 tolerance: float = 0.01,
+                 min_points: int = 4,
+                 max_points: int = 64,
+                 max_radius: float = 10_000.0):
+        self._tolerance_ = tolerance
+        self._min_points_ = max(min_points, 3)
+        self._max_points_ = max_points
+        self._max_radius_ = max_radius
+        self.report = ArcReport()
+
+    def fit(self, points: Iterable[Point]) -> Iterator[Edge | Arc]:
+        """
+        moves along the points: Edge for a straight line and Arc for a fitted run
+        """
+        window = list()
+        circle = None
+        for point in points:
+            if window and point.x == window[-1].x and point.y == window[-1].y:
+                continue
+            self.report.lines_before += len(window) > 0
+            if circle is not None and len(window) < self._max_points_ and circle.extend(window[-1], point):
+                window.append(point)
+                continue
+            window.append(point)
+            previous = circle
+            circle = None
+            while len(window) >= 3:
+                circle = self._circle(window) if len(window) <= self._max_points_ else None
+                if circle is not None:
+                    break
+                # the last point breaks the run
+                if previous is not None and len(window) > self._min_points_:
+                    yield from self._run(window[:-1])
+                    window = window[-2:]
+                else:
+                    yield self._emit(Edge(window[0], window[1]))
+                    window = window[1:]
+                previous = None
+        yield from self._run(window)
+
+    def commands(self, points: Iterable[Point]) -> Iterator[str]:
+        """
+        G-code of the moves along the points, the head is expected to be at the first point
+        """
+        for move in self.fit(points):
+            if isinstance(move, Arc):
+                yield move.to_gcode()
+            else:
+                yield f'G1X{format_number(move.point_b.x)}Y{format_number(move.point_b.y)}'
+
+    def _emit(self, move: Edge | Arc) -> Edge | Arc:
+        self.report.lines_after += 1
+        self.report.arcs += isinstance(move, Arc)
+        return move
+
+    def _run(self, points: list[Point]) -> Iterator[Edge | Arc]:
+        """
+        The run was fitted incrementally, the emitted arc has to pass exactly through its start and end,
+        so it is fitted again by the first, the middle and the last points. It is split in halves if it does not fit.
+        """
+        circle = self._circle(points) if len(points) >= self._min_points_ else None
+        if circle is not None:
+            yield self._emit(Arc(points[0], points[-1], Point(circle.x, circle.y), circle.clockwise))
+        elif len(points) >= 2 * self._min_points_ - 1:
+            middle = len(points) // 2
+            yield from self._run(points[:middle + 1])
+            yield from self._run(points[middle:])
+        else:
+            for idx in range(1, len(points)):
+                yield self._emit(Edge(points[idx - 1], points[idx]))
+
+    def _circle(self, points: list[Point]) -> _Circle | None:
+        """
+        circle by the first, the middle and the last points if all points fit it
+        """
+        a = points[0]
+        m = points[len(points) // 2]
+        b = points[-1]
+        d = 2 * (a.x * (m.y - b.y) + m.x * (b.y - a.y) + b.x * (a.y - m.y))
+        if abs(d) < EPSILON:
+            return None
+        sa = a.x * a.x + a.y * a.y
+        sm = m.x * m.x + m.y * m.y
+        sb = b.x * b.x + b.y * b.y
+        cx = (sa * (m.y - b.y) + sm * (b.y - a.y) + sb * (a.y - m.y)) / d
+        cy = (sa * (b.x - m.x) + sm * (a.x - b.x) + sb * (m.x - a.x)) / d
+        radius = math.hypot(a.x - cx, a.y - cy)
+        if radius > self._max_radius_:
+            return None
+        clockwise = (m.x - a.x) * (b.y - m.y) - (m.y - a.y) * (b.x - m.x) < 0
+        circle = _Circle(cx, cy, radius, clockwise, self._tolerance_)
+        for idx in range(1, len(points)):
+            if not circle.extend(points[idx - 1], points[idx]):
+                return None
+        return circle
+
+
+class _Circle:
+    """
+    a candidate circle of the fit, it tracks the swept angle of the points checked so far
+    """
+
+    def __init__(self, x: float, y: float, radius: float, clockwise: bool, tolerance: float):
+        self.x = x
+        self.y = y
+        self.radius = radius
+        self.clockwise = clockwise
+        self.tolerance = tolerance
+        self.sweep = 0.0
+
+    def extend(self, previous: Point, point: Point) -> bool:
+        """
+        check the point and the chord to it lie within the tolerance and go around the center in the same direction
+        """
+        radius = self.radius
+        if abs(math.hypot(point.x - self.x, point.y - self.y) - radius) > self.tolerance:
+            return False
+        chord = Point.length(previous, point)
+        if radius - math.sqrt(max(radius * radius - chord * chord / 4, 0.0)) > self.tolerance:
+            return False
+        cross = (previous.x - self.x) * (point.y - self.y) - (previous.y - self.y) * (point.x - self.x)
+        if (cross < 0) != self.clockwise:
+            return False
+        sweep = self.sweep + 2 * math.asin(min(chord / (2 * radius), 1.0))
+        if sweep >= 2 * math.pi - EPSILON:
+            return False
+        self.sweep = sweep
+        return True
@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import logging
+import os
+import time
+from functools import partial
+from itertools import chain
+from multiprocessing import Pool, current_process
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from optimizer.arcs import ArcFitter
+from optimizer.dedup import SegmentDeduplicator
+from optimizer.incremental import IncrementalOptimizer, IncrementalReport
+from optimizer.output import PROLOGUE, EPILOGUE
+from optimizer.snap import EndpointSnapper
+from optimizer.streaming import StreamingOptimizer, StreamingReport
+from optimizer.verify import EquivalenceChecker
+from parser.compression import COMPRESSIONS, compressed_suffix
+from parser.io import GCodeFileReader, GCodeFileWriter, Point, Edge, format_number
+from parser.stream import Stream
+
+logger = logging.getLogger(__name__)
+
+
+class JobReport:
+    def __init__(self, source: str, target: str):
+        self.source = source
+        self.target = target
+        self.edges = 0
+        self.paths = 0
+        self.groups = 0
+        self.lines = 0
+        self.travel_before = 0.0
+        self.travel_after = 0.0
+        self.wall_time = 0.0
+        self.missing_length = None
+        self.extra_length = None
+        self.reused = None
+        self.time_saved = None
+        self.error = None
+
+    @property
+    def travel_saved(self) -> float:
+        return self.travel_before - self.travel_after
+
+    def __str__(self) -> str:
+        if self.error is not None:
+            return f'{self.source}: failed: {self.error}'
+        return (f'{self.source} -> {self.target}: edges: {self.edges}, paths: {self.paths}, groups: {self.groups}, '
+                f'travel: {self.travel_before:.3f} -> {self.travel_after:.3f}, {self.wall_time:.3f}s'
+                + (f', reused: {self.reused:.1%}' if self.reused is not None else ''))
+
+
+def travel_length(edges: Iterable[Edge]) -> float:
+    """
+    length of moves between the edges cut in the given order from the origin
+    """
+    position = Point(0.0, 0.0)
+    length = 0.0
+    for edge in edges:
+        length += Point.length(position, edge.point_a)
+        position = edge.point_b
+    return length
+
+
+def find_jobs(inputs: Iterable[str],
+              output_dir: str = None,
+              pattern: str = '*.gcode',
+              suffix: str = '.optimized') -> list[(str, str)]:
+    """
+    (source, target) pairs of the files and of the files matching the pattern in the directories,
+    compressed files matching the pattern with a suffix of a compression are found too.
+    A target is written into output_dir or next to its source compressed as its source,
+    files having the suffix are skipped.
+    """
+    jobs = list()
+    for item in inputs:
+        path = Path(item)
+        sources = sorted(set(source for extension in ('', *COMPRESSIONS.keys())
+                         for source in path.rglob(pattern + extension))) if path.is_dir() else [path]
+        for source in sources:
+            compressed = compressed_suffix(source.name)
+            name = Path(source.name[:len(source.name) - len(compressed)])
+            if name.stem.endswith(suffix):
+                continue
+            directory = Path(output_dir) if output_dir is not None else source.parent
+            jobs.append((str(source), str(directory / f'{name.stem}{suffix}{name.suffix}{compressed}')))
+    return jobs
+
+
+GROUP_ORDERS = ('file', 'power', 'speed')
+
+
+def parameter_groups(edges: Iterable[Edge]) -> dict[(float, float), list[Edge]]:
+    """
+    edges by their power and speed in order of the first edge of a group
+    """
+    groups = dict()
+    for edge in edges:
+        groups.setdefault(edge.parameters, list()).append(edge)
+    return groups
+
+
+def order_groups(groups: dict[(float, float), list[Edge]], group_order: str = 'file') -> list[(float, float)]:
+    """
+    parameters of the groups in the order they are cut:
+        file   as they appear in the file
+        power  the least power first, so engraving goes before cutting
+        speed  the fastest first
+    """
+    if group_order == 'power':
+        return sorted(groups.keys(), key=lambda parameters: (parameters[0], -parameters[1]))
+    if group_order == 'speed':
+        return sorted(groups.keys(), key=lambda parameters: (-parameters[1], parameters[0]))
+    if group_order == 'file':
+        return list(groups.keys())
+    raise ValueError(f'Unknown group order {group_order}, one of {", ".join(GROUP_ORDERS)} is expected')
+
+
+def _optimize_group(edges: list[Edge],
+                    parameters: (float, float),
+                    target: str,
+                    window_size: int,
+                    dedup: bool,
+                    arc_tolerance: float,
+                    snap_tolerance: float,
+                    incremental: bool,
+                    repeated_parts: bool) -> (list[str], StreamingReport | IncrementalReport):
+    """
+    G-code of a group of edges cut with the same parameters without the prologue and the epilogue
+    """
+    power, speed = parameters
+    if snap_tolerance:
+        edges = EndpointSnapper(tolerance=snap_tolerance).snap(edges)
+    if dedup:
+        edges = SegmentDeduplicator().deduplicate(edges)
+    arc_fitter = ArcFitter(tolerance=arc_tolerance) if arc_tolerance else None
+    if incremental:
+        state_file = f'{target}.S{format_number(power)}F{format_number(speed)}.tour.json'
+        optimizer = IncrementalOptimizer(edges, power, speed, state_file, arc_fitter=arc_fitter, framed=False)
+    else:
+        optimizer = StreamingOptimizer(edges, power, speed, window_size=window_size, arc_fitter=arc_fitter,
+                                       framed=False, repeated_parts=repeated_parts)
+    return list(optimizer), optimizer.report
+
+
+def optimize_file(source: str,
+                  target: str,
+                  window_size: int = 100_000,
+                  dedup: bool = False,
+                  arc_tolerance: float = None,
+                  verify: bool = False,
+                  snap_tolerance: float = None,
+                  incremental: bool = False,
+                  group_order: str = 'file',
+                  processes: int = 1,
+                  background: bool = False,
+                  repeated_parts: bool = False) -> JobReport:
+    """
+    optimize the order of cuts of a file, errors are reported instead of raised.
+    Edges are grouped by their power and speed, the groups are optimized independently and cut one after another
+    in group_order. Groups are optimized in a pool of processes unless the file is optimized in a pool itself.
+    Ends of edges within snap_tolerance are merged when it is given.
+    Coordinates are read unrounded and written with 4 digits, so the target keeps the coordinates of the source.
+    The source is parsed once: the groups and the travel before are fed by one pass, the edges are cached
+    to be compared with the written file when verify is set.
+    With incremental the tours are stored next to the target and reused for unchanged parts when the job is sent again.
+    Compressed sources are decompressed while they are parsed, in a thread with background.
+    With repeated_parts copies of a part are walked once, it is ignored by incremental.
+    """
+    report = JobReport(source, target)
+    started = time.perf_counter()
+    edges = None
+    try:
+        edges = Stream(GCodeFileReader(source, precision=None, background=background)) \
+            .filter(lambda item: item.length() > 0)
+        if verify:
+            edges = edges.cache()
+        if os.path.dirname(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+        groups, report.travel_before = edges.fan_out(parameter_groups, travel_length)
+        order = order_groups(groups, group_order)
+        tasks = [(groups.pop(parameters), parameters, target, window_size, dedup, arc_tolerance, snap_tolerance,
+                  incremental, repeated_parts) for parameters in order]
+        if processes != 1 and len(tasks) > 1 and not current_process().daemon:
+            with Pool(processes=min(processes or os.cpu_count(), len(tasks))) as pool:
+                results = pool.starmap(_optimize_group, tasks)
+        else:
+            results = [_optimize_group(*task) for task in tasks]
+        report.lines = GCodeFileWriter(target).write(
+            chain(PROLOGUE, chain.from_iterable(commands for commands, _ in results), EPILOGUE))
+        position = Point(0.0, 0.0)
+        for _, group_report in results:
+            report.edges += group_report.edges
+            report.paths += group_report.paths
+            if group_report.start is None:
+                continue
+            # a group is optimized from the origin, it is really cut from the end of the previous group
+            report.travel_after += group_report.travel_length - Point.length(Point(0.0, 0.0), group_report.start) \
+                + Point.length(position, group_report.start)
+            position = group_report.end
+        report.groups = len(results)
+        if incremental:
+            reports = [group_report for _, group_report in results]
+            report.reused = sum(item.reused_edges for item in reports) / report.edges if report.edges else 0.0
+            report.time_saved = sum(item.time_saved for item in reports) \
+                if all(item.time_saved is not None for item in reports) else None
+        if verify:
+            # coordinates are written with 4 digits, fitted arcs deviate up to arc_tolerance,
+            # snapped ends are moved up to snap_tolerance
+            tolerance = 0.05 + (arc_tolerance or 0.0) + (snap_tolerance or 0.0)
+            equivalence = EquivalenceChecker(tolerance=tolerance).check(edges, GCodeFileReader(target, precision=None))
+            report.missing_length = equivalence.missing_length
+            report.extra_length = equivalence.extra_length
+    except Exception as error:
+        logger.exception(f"Optimization of {source} is failed")
+        report.error = f'{type(error).__name__}: {error}'
+    finally:
+        if edges is not None:
+            # the spill file of cached edges
+            edges.close()
+    report.wall_time = time.perf_counter() - started
+    return report
+
+
+def _optimize_job(job: (str, str), options: dict) -> JobReport:
+    return optimize_file(job[0], job[1], **options)
+
+
+def optimize_files(jobs: list[(str, str)], processes: int = None, **options) -> Iterator[JobReport]:
+    """
+    optimize the files in a pool of processes, reports are yielded as the jobs are done
+    """
+    if processes == 1 or len(jobs) <= 1:
+        # a single file is optimized here, so its groups are optimized in parallel
+        for job in jobs:
+            yield _optimize_job(job, dict(options, processes=processes))
+        return
+    with Pool(processes=processes) as pool:
+        yield from pool.imap_unordered(partial(_optimize_job, options=options), jobs)
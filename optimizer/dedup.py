@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import logging
+import math
+from typing import Iterable
+
+from parser.io import Point, Edge
+
+logger = logging.getLogger(__name__)
+
+
+class _Line:
+    """
+    an undirected line with the segments lying on it, a segment is stored as
+    (t_start, t_end, point_start, point_end, order, is_reversed) where t is the position of a point along the line,
+    order is the position of its edge in the input and is_reversed tells the edge runs against the line
+    """
+
+    def __init__(self, edge: Edge):
+        length = edge.length()
+        dx = (edge.point_b.x - edge.point_a.x) / length
+        dy = (edge.point_b.y - edge.point_a.y) / length
+        if dx < 0 or (dx == 0 and dy < 0):
+            dx, dy = -dx, -dy
+        self.dx = dx
+        self.dy = dy
+        self.offset = edge.point_a.y * dx - edge.point_a.x * dy
+        self.segments = list()
+
+    def angle(self) -> float:
+        """
+        direction of the line in [-pi/2, pi/2)
+        """
+        angle = math.atan2(self.dy, self.dx)
+        return -math.pi / 2 if angle >= math.pi / 2 else angle
+
+    def distance(self, point: Point) -> float:
+        return abs(point.y * self.dx - point.x * self.dy - self.offset)
+
+    def add(self, edge: Edge, order: int):
+        t_a = edge.point_a.x * self.dx + edge.point_a.y * self.dy
+        t_b = edge.point_b.x * self.dx + edge.point_b.y * self.dy
+        if t_a <= t_b:
+            self.segments.append((t_a, t_b, edge.point_a, edge.point_b, order, False))
+        else:
+            self.segments.append((t_b, t_a, edge.point_b, edge.point_a, order, True))
+
+    @staticmethod
+    def piece(segment: tuple, point_start: Point, point_end: Point) -> Edge:
+        """
+        a piece of the segment from point_start to point_end along the line in the direction of its edge
+        """
+        return Edge(point_end, point_start) if segment[5] else Edge(point_start, point_end)
+
+
+class DedupReport:
+    def __init__(self):
+        self.edges_before = 0
+        self.edges_after = 0
+        self.length_before = 0.0
+        self.removed_length = 0.0
+        self.overlaps = 0
+
+    def __str__(self) -> str:
+        return (f'edges: {self.edges_before} -> {self.edges_after}, overlaps: {self.overlaps}, '
+                f'removed cut length: {self.removed_length:.3f} of {self.length_before:.3f}')
+
+
+class SegmentDeduplicator:
+    """
+    Remove duplicated edges and cut overlapping collinear edges so every piece of a line is cut once.
+    Edges are hashed by the direction and the offset of their line, an edge joins a line found in the same
+    or a neighbour cell when both its ends lie within tolerance from it. Overlapping segments of a line
+    are split at all their ends, so the nodes where other edges are connected are kept.
+    Pieces are returned in the order and the direction of the first input edge covering them, so the paths
+    are walked from the same nodes as without deduplication.
+    """
+
+    def __init__(self, tolerance: float = 0.05, angle_tolerance: float = 0.01):
+        self._tolerance_ = tolerance
+        self._angle_tolerance_ = angle_tolerance
+        self._angle_cells_ = max(int(math.ceil(math.pi / angle_tolerance)), 1)
+        self.report = DedupReport()
+
+    def deduplicate(self, edges: Iterable[Edge]) -> list[Edge]:
+        """
+        it can be used in a Stream.consume function
+        """
+        self.report = DedupReport()
+        cells = dict()
+        lines = list()
+        for edge in edges:
+            length = edge.length()
+            if length <= 0:
+                continue
+            self.report.edges_before += 1
+            self.report.length_before += length
+            line = self._find(cells, edge)
+            if line is None:
+                line = _Line(edge)
+                lines.append(line)
+                cells.setdefault(self._cell(line.angle(), line.offset), list()).append(line)
+            line.add(edge, self.report.edges_before)
+        pieces = list()
+        for line in lines:
+            self._merge(line, pieces)
+        pieces.sort(key=lambda piece: piece[0])
+        result = [edge for _, edge in pieces]
+        self.report.edges_after = len(result)
+        self.report.removed_length = self.report.length_before - sum(edge.length() for edge in result)
+        logger.info(f"Deduplication: {str(self.report)}")
+        return result
+
+    def _cell(self, angle: float, offset: float) -> (int, int):
+        return (int((angle + math.pi / 2) / self._angle_tolerance_) % self._angle_cells_,
+                int(math.floor(offset / self._tolerance_)))
+
+    def _find(self, cells: dict, edge: Edge) -> _Line | None:
+        probe = _Line(edge)
+        angle_cell, offset_cell = self._cell(probe.angle(), probe.offset)
+        for angle_shift in (0, -1, 1):
+            candidate_angle = angle_cell + angle_shift
+            candidate_offset = offset_cell
+            if candidate_angle < 0 or candidate_angle >= self._angle_cells_:
+                # the direction of a nearly vertical line flips over the boundary, the offset flips with it
+                candidate_angle %= self._angle_cells_
+                candidate_offset = int(math.floor(-probe.offset / self._tolerance_))
+            for offset_shift in (0, -1, 1):
+                for line in cells.get((candidate_angle, candidate_offset + offset_shift), ()):
+                    if line.distance(edge.point_a) <= self._tolerance_ \
+                            and line.distance(edge.point_b) <= self._tolerance_:
+                        return line
+        return None
+
+    def _merge(self, line: _Line, result: list[((int, float), Edge)]):
+        line.segments.sort(key=lambda segment: segment[0])
+        cluster = list()
+        end = None
+        for segment in line.segments:
+            if cluster and segment[0] >= end - self._tolerance_:
+                self._split(cluster, result)
+                cluster = list()
+            if not cluster:
+                end = segment[1]
+            cluster.append(segment)
+            end = max(end, segment[1])
+        if cluster:
+            self._split(cluster, result)
+
+    def _split(self, cluster: list[tuple], result: list[((int, float), Edge)]):
+        """
+        pieces of the cluster with their sort keys: the order of the first segment covering a piece and
+        the position of the piece along that segment
+        """
+        if len(cluster) == 1:
+            result.append(((cluster[0][4], 0.0), _Line.piece(cluster[0], cluster[0][2], cluster[0][3])))
+            return
+        self.report.overlaps += 1
+        ends = sorted([(segment[0], segment[2]) for segment in cluster] + [(segment[1], segment[3]) for segment in cluster],
+                      key=lambda item: item[0])
+        previous_t, previous_point = ends[0]
+        for t, point in ends[1:]:
+            if t - previous_t > self._tolerance_:
+                middle = (previous_t + t) / 2
+                first = min((segment for segment in cluster if segment[0] <= middle <= segment[1]),
+                            key=lambda segment: segment[4])
+                position = first[1] - middle if first[5] else middle - first[0]
+                result.append(((first[4], position), _Line.piece(first, previous_point, point)))
+                previous_t, previous_point = t, point
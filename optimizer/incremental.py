@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Iterable, Iterator
+
+from graph import add_edge, calculate_paths, Path
+from optimizer.arcs import ArcFitter
+from optimizer.output import path_commands, PROLOGUE, EPILOGUE
+from optimizer.spatial import SpatialGrid
+from parser.io import Point, Edge
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalReport:
+    def __init__(self):
+        self.edges = 0
+        self.paths = 0
+        self.travel_length = 0.0
+        self.components = 0
+        self.reused_components = 0
+        self.reused_edges = 0
+        self.removed_components = 0
+        self.wall_time = 0.0
+        self.full_time = None
+        # the first and the last point cut
+        self.start = None
+        self.end = None
+
+    @property
+    def reused(self) -> float:
+        return self.reused_edges / self.edges if self.edges else 0.0
+
+    @property
+    def time_saved(self) -> float:
+        """
+        time of a full optimization estimated by the previous full one less the time spent, None without an estimate
+        """
+        return self.full_time - self.wall_time if self.full_time is not None else None
+
+    def __str__(self) -> str:
+        saved = f'{self.time_saved:.3f}s' if self.time_saved is not None else 'unknown'
+        return (f'edges: {self.edges}, paths: {self.paths}, travel: {self.travel_length:.3f}, '
+                f'components: {self.reused_components} of {self.components} reused '
+                f'({self.reused:.1%} of edges), {self.removed_components} removed, '
+                f'{self.wall_time:.3f}s, saved: {saved}')
+
+
+class IncrementalOptimizer(Iterable):
+    """
+    Optimize edges reusing the tour of the previous optimization of the job stored in state_file.
+    Edges are split to connected components, a component is identified by a hash of its edges.
+    Paths of components found in the previous tour are kept in their order, paths of removed components are dropped.
+    Changed and new components are split to paths ordered by the nearest neighbour, then every component is
+    spliced into the tour where it adds the least travel. Without a stored tour all paths are ordered by the nearest
+    neighbour from the origin as StreamingOptimizer does with a window of the whole job.
+    The tour is stored to state_file when the G-code is emitted.
+    Without framed the G-code is emitted without its prologue and epilogue to be a part of another program.
+    """
+    __VERSION__ = 1
+
+    def __init__(self,
+                 edges: Iterable[Edge],
+                 power: float,
+                 speed: float,
+                 state_file: str,
+                 arc_fitter: ArcFitter = None,
+                 framed: bool = True):
+        self._edges_ = edges
+        self._power_ = power
+        self._speed_ = speed
+        self._state_file_ = state_file
+        self._arc_fitter_ = arc_fitter
+        self._framed_ = framed
+        self.report = IncrementalReport()
+
+    def __iter__(self) -> Iterator[str]:
+        self.report = IncrementalReport()
+        started = time.perf_counter()
+        state = self._load()
+        components = IncrementalOptimizer.components(edge for edge in self._edges_ if edge.length() > 0)
+        self.report.components = len(components)
+        self.report.edges = sum(len(component) for component in components.values())
+        if state is None:
+            tour = [(key, path) for key, path in
+                    IncrementalOptimizer._order([(key, path) for key, component in components.items()
+                                                 for path in IncrementalOptimizer._paths(component)],
+                                                Point(0.0, 0.0))]
+        else:
+            tour = [(key, [Point(x, y) for x, y in zip(points[::2], points[1::2])])
+                    for key, points in state['tour'] if key in components]
+            previous = set(key for key, _ in state['tour'])
+            self.report.removed_components = len(previous - components.keys())
+            self.report.reused_components = len(components.keys() & previous)
+            self.report.reused_edges = sum(len(components[key]) for key in components.keys() & previous)
+            for key, component in components.items():
+                if key not in previous:
+                    self._splice(tour, key, component)
+        self.report.wall_time = time.perf_counter() - started
+        if state is None:
+            full_time_per_edge = self.report.wall_time / self.report.edges if self.report.edges else 0.0
+        else:
+            full_time_per_edge = state['full_time_per_edge']
+            self.report.full_time = full_time_per_edge * self.report.edges
+        if self._framed_:
+            yield from PROLOGUE
+        position = Point(0.0, 0.0)
+        for _, points in tour:
+            self.report.paths += 1
+            self.report.travel_length += Point.length(position, points[0])
+            yield from path_commands(points, self._power_, self._speed_, self._arc_fitter_)
+            position = points[-1]
+        if tour:
+            self.report.start = tour[0][1][0]
+            self.report.end = tour[-1][1][-1]
+        if self._framed_:
+            yield from EPILOGUE
+        self._store(tour, full_time_per_edge)
+        logger.info(f"Incremental optimization: {str(self.report)}")
+
+    def _splice(self, tour: list, key: str, component: list[Edge]):
+        """
+        insert paths of the component ordered by the nearest neighbour where they add the least travel
+        """
+        paths = [path for _, path in IncrementalOptimizer._order([(key, path) for path in
+                                                                  IncrementalOptimizer._paths(component)],
+                                                                 Point(0.0, 0.0))]
+        best = None
+        best_idx = 0
+        is_reversed = False
+        origin = Point(0.0, 0.0)
+        for idx in range(len(tour) + 1):
+            before = tour[idx - 1][1][-1] if idx > 0 else origin
+            after = tour[idx][1][0] if idx < len(tour) else None
+            current = Point.length(before, after) if after is not None else 0.0
+            for reverse in (False, True):
+                start = paths[-1][-1] if reverse else paths[0][0]
+                end = paths[0][0] if reverse else paths[-1][-1]
+                added = Point.length(before, start) + (Point.length(end, after) if after is not None else 0.0) \
+                    - current
+                if best is None or added < best:
+                    best, best_idx, is_reversed = added, idx, reverse
+        if is_reversed:
+            paths = [path[::-1] for path in reversed(paths)]
+        tour[best_idx:best_idx] = [(key, path) for path in paths]
+
+    def _load(self) -> dict | None:
+        if not os.path.exists(self._state_file_):
+            return None
+        try:
+            with open(self._state_file_, 'r') as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            logger.warning(f"State {self._state_file_} is not readable, the job is optimized from scratch")
+            return None
+        if state.get('version') != IncrementalOptimizer.__VERSION__:
+            return None
+        return state
+
+    def _store(self, tour: list, full_time_per_edge: float):
+        state = {'version': IncrementalOptimizer.__VERSION__,
+                 'full_time_per_edge': full_time_per_edge,
+                 'tour': [(key, [coordinate for point in points for coordinate in (point.x, point.y)])
+                          for key, points in tour]}
+        # dumps encodes in C, dump to a file does not
+        with open(self._state_file_, 'w') as file:
+            file.write(json.dumps(state))
+
+    @staticmethod
+    def components(edges: Iterable[Edge]) -> dict[str, list[Edge]]:
+        """
+        connected components of the edges by the hashes of their edges
+        """
+        parents = dict()
+
+        def root(key: tuple) -> tuple:
+            result = key
+            while parents.get(result, result) != result:
+                result = parents[result]
+            while key != result:
+                parents[key], key = result, parents[key]
+            return result
+
+        edges = list(edges)
+        for edge in edges:
+            root_a = root((edge.point_a.x, edge.point_a.y))
+            root_b = root((edge.point_b.x, edge.point_b.y))
+            if root_a != root_b:
+                parents[root_a] = root_b
+        groups = dict()
+        for edge in edges:
+            groups.setdefault(root((edge.point_a.x, edge.point_a.y)), list()).append(edge)
+        return {IncrementalOptimizer.component_key(group): group for group in groups.values()}
+
+    @staticmethod
+    def component_key(edges: list[Edge]) -> str:
+        """
+        hash of the edges regardless of their order and direction
+        """
+        ends = sorted(tuple(sorted(((edge.point_a.x, edge.point_a.y), (edge.point_b.x, edge.point_b.y))))
+                      for edge in edges)
+        return hashlib.sha1(repr(ends).encode()).hexdigest()
+
+    @staticmethod
+    def _paths(edges: list[Edge]) -> list[Path]:
+        nodes = list()
+        matrix = dict()
+        for edge in edges:
+            add_edge(nodes, matrix, edge)
+        points = {str(node): node for node in nodes}
+        paths, densities = calculate_paths(nodes, matrix)
+        return [Path([points[key] for key in path], density) for path, density in zip(paths, densities)]
+
+    @staticmethod
+    def _order(paths: list[(str, Path)], position: Point) -> Iterator[(str, list[Point])]:
+        """
+        points of the paths ordered by the nearest neighbour from the position,
+        closed paths are started at their node nearest to the previous end
+        """
+        entries = SpatialGrid(SpatialGrid.cell_size_for([point for _, path in paths for point in path.entries()]))
+        keys = dict()
+        for key, path in paths:
+            keys[id(path)] = key
+            for entry in path.entries():
+                entries.add(entry, path)
+        while len(entries):
+            point, path = entries.nearest(position)
+            for entry in path.entries():
+                entries.remove(entry, path)
+            path.start_at(point)
+            position = path.points[-1]
+            yield keys[id(path)], path.points
@@ -0,0 +1,27 @@
+from typing import Iterator
+
+from optimizer.arcs import ArcFitter
+from parser.io import Point, format_number
+
+PROLOGUE = ('G21G90', 'M3S0')
+EPILOGUE = ('M5',)
+
+
+def path_commands(points: list[Point],
+                  power: float,
+                  speed: float,
+                  arc_fitter: ArcFitter = None) -> Iterator[str]:
+    """
+    G-code to cut along the points: a rapid to the first point and cutting moves through the rest.
+    Curves are emitted as G2/G3 when an arc_fitter is given.
+    """
+    yield f'G0X{format_number(points[0].x)}Y{format_number(points[0].y)}S0'
+    moves = arc_fitter.commands(points) if arc_fitter is not None \
+        else (f'G1X{format_number(point.x)}Y{format_number(point.y)}' for point in points[1:])
+    first = True
+    for move in moves:
+        if first:
+            yield f'{move}S{format_number(power)}F{format_number(speed)}'
+            first = False
+        else:
+            yield move
@@ -0,0 +1,156 @@
+import logging
+import time
+from typing import Iterable
+
+from graph import add_edge, calculate_paths
+from parser.io import Point, Edge
+
+logger = logging.getLogger(__name__)
+
+
+class PartsReport:
+    def __init__(self):
+        self.edges = 0
+        self.parts = 0
+        self.classes = 0
+        self.repeated_parts = 0
+        self.repeated_edges = 0
+        # time of walking the first parts of the classes and time of the whole stage
+        self.walk_time = 0.0
+        self.wall_time = 0.0
+
+    @property
+    def estimated_speedup(self) -> float:
+        """
+        estimate, not a measurement: time of walking every part estimated by the walk time per edge of the first
+        parts over the time of the whole stage. The rest of the optimizer is not counted, compare runs with and
+        without repeated parts for the speedup of a job
+        """
+        walked = self.edges - self.repeated_edges
+        if not walked or not self.wall_time:
+            return 1.0
+        return self.walk_time / walked * self.edges / self.wall_time
+
+    def __str__(self) -> str:
+        return (f'edges: {self.edges}, parts: {self.parts} of {self.classes} classes, '
+                f'{self.repeated_parts} repeated ({self.repeated_edges} edges), {self.wall_time:.3f}s, '
+                f'estimated walk speedup: {self.estimated_speedup:.2f}x')
+
+
+class PartDetector:
+    """
+    Paths of parts repeated across a nested sheet are walked once.
+    Edges are split to connected parts, a part is fingerprinted by the set of its edges in coordinates relative
+    to the lower left corner of its bounding box rounded to precision digits, regardless of their order and direction.
+    Parts with equal fingerprints are copies of the same shape moved by a translation: the first part of a class is
+    walked by calculate_paths, its paths are kept in relative coordinates and mapped to the nodes of every next copy.
+    A frozenset is the fingerprint, so its hash groups the parts and a collision of hashes is resolved by comparing
+    the edges, no sort is needed.
+    """
+
+    def __init__(self, precision: int = 6):
+        self._precision_ = precision
+        self.report = PartsReport()
+
+    def paths(self, edges: Iterable[Edge]) -> (list[list[Point]], list[float]):
+        """
+        points and lengths of the paths covering the edges as calculate_paths finds them, the report is accumulated
+        """
+        started = time.perf_counter()
+        classes = dict()
+        paths = list()
+        densities = list()
+        for part in PartDetector._parts(edges):
+            self.report.parts += 1
+            self.report.edges += len(part)
+            nodes, fingerprint = self._fingerprint(part)
+            walked = classes.get(fingerprint)
+            if walked is None:
+                walked = self._walk(part)
+                classes[fingerprint] = walked
+            else:
+                self.report.repeated_parts += 1
+                self.report.repeated_edges += len(part)
+            for path, density in walked:
+                paths.append([nodes[key] for key in path])
+                densities.append(density)
+        self.report.classes += len(classes)
+        self.report.wall_time += time.perf_counter() - started
+        return paths, densities
+
+    @staticmethod
+    def _parts(edges: Iterable[Edge]) -> list[list[(Edge, tuple, tuple)]]:
+        """
+        connected parts of the edges with coordinates of their ends
+        """
+        parents = dict()
+
+        def root(key: tuple) -> tuple:
+            result = key
+            while result in parents:
+                result = parents[result]
+            while key != result:
+                parents[key], key = result, parents[key]
+            return result
+
+        ends = list()
+        for edge in edges:
+            point_a = edge.point_a
+            point_b = edge.point_b
+            key_a = (point_a.x, point_a.y)
+            key_b = (point_b.x, point_b.y)
+            if key_a == key_b:
+                continue
+            ends.append((edge, key_a, key_b))
+            root_a = root(key_a) if key_a in parents else key_a
+            root_b = root(key_b) if key_b in parents else key_b
+            if root_a != root_b:
+                parents[root_a] = root_b
+        parts = dict()
+        for item in ends:
+            key_a = item[1]
+            parts.setdefault(root(key_a) if key_a in parents else key_a, list()).append(item)
+        return list(parts.values())
+
+    def _relative(self, part: list[(Edge, tuple, tuple)]):
+        """
+        function of coordinates relative to the lower left corner of the part in units of precision
+        """
+        min_x = min(min(key_a[0], key_b[0]) for _, key_a, key_b in part)
+        min_y = min(min(key_a[1], key_b[1]) for _, key_a, key_b in part)
+        scale = 10 ** self._precision_
+
+        def relative(key: tuple) -> tuple:
+            return int((key[0] - min_x) * scale + 0.5), int((key[1] - min_y) * scale + 0.5)
+
+        return relative
+
+    def _fingerprint(self, part: list[(Edge, tuple, tuple)]) -> (dict[tuple, Point], frozenset):
+        """
+        nodes of the part by their relative coordinates and the fingerprint of the part
+        """
+        relative = self._relative(part)
+        nodes = dict()
+        ends = set()
+        for edge, key_a, key_b in part:
+            key_a = relative(key_a)
+            key_b = relative(key_b)
+            nodes[key_a] = edge.point_a
+            nodes[key_b] = edge.point_b
+            ends.add((key_a, key_b) if key_a <= key_b else (key_b, key_a))
+        return nodes, frozenset(ends)
+
+    def _walk(self, part: list[(Edge, tuple, tuple)]) -> list[(list[tuple], float)]:
+        """
+        paths of the part in relative coordinates
+        """
+        started = time.perf_counter()
+        relative = self._relative(part)
+        nodes = list()
+        matrix = dict()
+        for edge, _, _ in part:
+            add_edge(nodes, matrix, edge)
+        keys = {str(point): relative((point.x, point.y)) for point in nodes}
+        paths, densities = calculate_paths(nodes, matrix)
+        self.report.walk_time += time.perf_counter() - started
+        return [([keys[key] for key in path], density) for path, density in zip(paths, densities)]
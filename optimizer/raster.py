@@ -0,0 +1,192 @@
+import logging
+import re
+from typing import Iterable, Iterator
+
+from parser.io import GCodeMachine, Point, RAPID, format_number
+
+logger = logging.getLogger(__name__)
+
+# words interpreted by the optimizer itself, the rest of a line is passed through
+absorbed_macher = re.compile(r"G0*([0-3]|2[01]|9[01](\.1)?)(?![0-9.])|[XYIJRSF]\s*[-+0-9.]+|\([^)]*\)|;.*",
+                             re.IGNORECASE)
+
+EPSILON = 1e-6
+
+
+class Run:
+    """
+    a straight move of the laser head with a constant power
+    """
+    start: Point
+    end: Point
+    power: float
+    speed: float
+    is_rapid: bool
+
+    def __init__(self, start: Point, end: Point, power: float, speed: float, is_rapid: bool = False):
+        self.start = start
+        self.end = end
+        self.power = 0.0 if is_rapid else power
+        self.speed = speed
+        self.is_rapid = is_rapid
+
+    def length(self) -> float:
+        return Point.length(self.start, self.end)
+
+    def is_blank(self) -> bool:
+        return self.is_rapid or self.power <= 0
+
+    def reverse(self):
+        return Run(self.end, self.start, self.power, self.speed, self.is_rapid)
+
+    def direction(self) -> (float, float):
+        length = self.length()
+        return (self.end.x - self.start.x) / length, (self.end.y - self.start.y) / length
+
+    def is_continued_by(self, run) -> bool:
+        """
+        check that the run starts at the end of this one and goes in the same direction
+        """
+        if run.is_rapid or self.is_rapid or Point.length(self.end, run.start) > EPSILON:
+            return False
+        ax, ay = self.direction()
+        bx, by = run.direction()
+        return abs(ax * by - ay * bx) <= EPSILON and ax * bx + ay * by > 0
+
+
+class RasterReport:
+    def __init__(self):
+        self.lines_before = 0
+        self.lines_after = 0
+        self.time_before = 0.0
+        self.time_after = 0.0
+        self.scanlines = 0
+        self.reversed_scanlines = 0
+
+    def __str__(self) -> str:
+        return (f'lines: {self.lines_before} -> {self.lines_after}, '
+                f'estimated time: {self.time_before:.1f}s -> {self.time_after:.1f}s, '
+                f'scanlines: {self.scanlines} (reversed {self.reversed_scanlines})')
+
+
+class RasterOptimizer(Iterable):
+    """
+    Compress raster engraving: consecutive collinear moves are grouped to scanlines,
+    adjacent moves with the same power are merged, long blank (S0) stretches are replaced by G0 rapids
+    and, optionally, every other scanline is reversed to alternate the scan direction.
+    Blank stretches shorter than min_blank_length stay as G1 S0 moves, so the head keeps its speed
+    over small gaps and the overscan is not lost.
+    Iterating emits optimized G-code commands, the report is complete when the iteration is finished.
+    """
+
+    def __init__(self,
+                 commands: Iterable[str],
+                 min_blank_length: float = 2.0,
+                 bidirectional: bool = False,
+                 rapid_speed: float = 3000.0,
+                 min_scanline_moves: int = 3,
+                 arc_tolerance: float = 0.01):
+        self._commands_ = commands
+        self._min_blank_length_ = min_blank_length
+        self._bidirectional_ = bidirectional
+        self._rapid_speed_ = rapid_speed
+        self._min_scanline_moves_ = min_scanline_moves
+        self._arc_tolerance_ = arc_tolerance
+        self.report = RasterReport()
+
+    def __iter__(self) -> Iterator[str]:
+        self.report = RasterReport()
+        machine = GCodeMachine()
+        self._position_ = machine.position
+        self._state_ = dict()
+        self._direction_ = None
+        is_parked = False
+        scanline = list()
+        # the emitted coordinates are always absolute millimeters
+        self.report.lines_after += 1
+        yield 'G21G90'
+        for command in self._commands_:
+            command = command.strip()
+            if not command:
+                continue
+            self.report.lines_before += 1
+            is_moved = machine.command(command)
+            rest = absorbed_macher.sub('', command).strip()
+            if is_moved:
+                start = machine.start
+                power = machine.power if machine.is_on() else 0.0
+                for point in machine.points(self._arc_tolerance_):
+                    run = Run(start, point, power, machine.speed, machine.motion == RAPID)
+                    start = point
+                    self.report.time_before += self._duration(run)
+                    is_parked = run.is_blank()
+                    if scanline and scanline[-1].is_continued_by(run):
+                        scanline.append(run)
+                    else:
+                        yield from self._flush(scanline)
+                        scanline = [run] if not run.is_rapid else list()
+            if rest:
+                # not a motion command, keep it at the same place of the program
+                yield from self._flush(scanline)
+                scanline = list()
+                self._state_.pop('S', None)
+                self.report.lines_after += 1
+                yield rest
+        yield from self._flush(scanline)
+        if is_parked:
+            # the program ends with a travel, e.g. to a home position
+            yield from self._travel(machine.position)
+        logger.info(f"Raster optimization: {str(self.report)}")
+
+    def _duration(self, run: Run) -> float:
+        speed = self._rapid_speed_ if run.is_rapid else run.speed
+        return run.length() / speed * 60 if speed > 0 else 0.0
+
+    def _flush(self, scanline: list[Run]) -> Iterator[str]:
+        if not scanline:
+            return
+        is_raster = len(scanline) >= self._min_scanline_moves_
+        merged = [scanline[0]]
+        for run in scanline[1:]:
+            last = merged[-1]
+            if last.power == run.power and last.speed == run.speed:
+                merged[-1] = Run(last.start, run.end, last.power, last.speed)
+            else:
+                merged.append(run)
+        if is_raster:
+            self.report.scanlines += 1
+            direction = merged[0].direction()
+            if self._bidirectional_ and self._direction_ is not None \
+                    and abs(direction[0] - self._direction_[0]) <= EPSILON \
+                    and abs(direction[1] - self._direction_[1]) <= EPSILON:
+                merged = [run.reverse() for run in reversed(merged)]
+                direction = (-direction[0], -direction[1])
+                self.report.reversed_scanlines += 1
+            self._direction_ = direction
+        for run in merged:
+            if not run.is_blank() or (is_raster and run.length() < self._min_blank_length_):
+                yield from self._travel(run.start)
+                yield self._move(run)
+
+    def _travel(self, point: Point) -> Iterator[str]:
+        if Point.length(self._position_, point) > EPSILON:
+            yield self._move(Run(self._position_, point, 0.0, 0.0, is_rapid=True))
+
+    def _move(self, run: Run) -> str:
+        """
+        modal G-code of the move: only changed words are written
+        """
+        words = list()
+        state = self._state_
+        for word, value in (('G', '0' if run.is_rapid else '1'),
+                            ('X', format_number(run.end.x)),
+                            ('Y', format_number(run.end.y)),
+                            ('S', format_number(run.power)),
+                            ('F', None if run.is_rapid else format_number(run.speed))):
+            if value is not None and state.get(word) != value:
+                state[word] = value
+                words.append(word + value)
+        self._position_ = run.end
+        self.report.lines_after += 1
+        self.report.time_after += self._duration(run)
+        return ''.join(words)
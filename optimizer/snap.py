@@ -0,0 +1,152 @@
+import logging
+import math
+from typing import Iterable
+
+from parser.io import Point, Edge
+
+logger = logging.getLogger(__name__)
+
+
+class SnapReport:
+    def __init__(self):
+        self.edges_before = 0
+        self.edges_after = 0
+        self.nodes_before = 0
+        self.nodes_after = 0
+        self.paths_before = 0
+        self.paths_after = 0
+
+    @property
+    def nodes_eliminated(self) -> int:
+        return self.nodes_before - self.nodes_after
+
+    @property
+    def paths_eliminated(self) -> int:
+        return self.paths_before - self.paths_after
+
+    def __str__(self) -> str:
+        return (f'edges: {self.edges_before} -> {self.edges_after}, nodes: {self.nodes_before} -> {self.nodes_after} '
+                f'({self.nodes_eliminated} eliminated), paths: {self.paths_before} -> {self.paths_after} '
+                f'({self.paths_eliminated} eliminated)')
+
+
+class EndpointSnapper:
+    """
+    Merge ends of edges lying within tolerance from each other, so strokes broken by rounding are cut as one path.
+    Nodes are hashed into a grid of cells of two tolerances, so the nodes within tolerance lie in the cell of a node
+    or in the three neighbour cells on the side of its quarter of the cell. A node is snapped to the first kept node
+    found within tolerance, otherwise it is kept. Edges collapsed to a node are removed.
+    Paths are counted as the least count of paths covering the edges: a half of odd nodes of every connected part,
+    at least one for a part.
+    """
+
+    def __init__(self, tolerance: float = 0.05):
+        self._tolerance_ = tolerance
+        self.report = SnapReport()
+
+    def snap(self, edges: Iterable[Edge]) -> list[Edge]:
+        """
+        it can be used in a Stream.consume function
+        """
+        self.report = SnapReport()
+        cells = dict()
+        # ids of the nodes before and of the kept nodes by coordinates of the nodes
+        nodes = dict()
+        kept = list()
+        result = list()
+        before = _Graph()
+        after = _Graph()
+        for edge in edges:
+            if edge.length() <= 0:
+                continue
+            self.report.edges_before += 1
+            point_a = edge.point_a
+            point_b = edge.point_b
+            id_a, snapped_a = self._node(nodes, cells, kept, point_a)
+            id_b, snapped_b = self._node(nodes, cells, kept, point_b)
+            before.add(id_a, id_b)
+            if snapped_a == snapped_b:
+                continue
+            after.add(snapped_a, snapped_b)
+            node_a = kept[snapped_a]
+            node_b = kept[snapped_b]
+            result.append(edge if node_a is point_a and node_b is point_b
+                          else Edge(node_a, node_b, power=edge.power, speed=edge.speed))
+        self.report.edges_after = len(result)
+        self.report.nodes_before, self.report.paths_before = len(nodes), before.paths()
+        self.report.nodes_after, self.report.paths_after = after.nodes(), after.paths()
+        logger.info(f"Snapping: {str(self.report)}")
+        return result
+
+    def _node(self, nodes: dict, cells: dict, kept: list[Point], point: Point) -> (int, int):
+        """
+        id of the node and id of the kept node within tolerance from it, the node is kept when there is no one
+        """
+        x = point.x
+        y = point.y
+        key = (x, y)
+        found = nodes.get(key)
+        if found is not None:
+            return found
+        tolerance = self._tolerance_
+        fx = x / (2 * tolerance)
+        fy = y / (2 * tolerance)
+        cx = math.floor(fx)
+        cy = math.floor(fy)
+        sx = cx - 1 if fx - cx < 0.5 else cx + 1
+        sy = cy - 1 if fy - cy < 0.5 else cy + 1
+        snapped = None
+        for cell in ((cx, cy), (sx, cy), (cx, sy), (sx, sy)):
+            for idx in cells.get(cell, ()):
+                node = kept[idx]
+                if math.hypot(node.x - x, node.y - y) <= tolerance:
+                    snapped = idx
+                    break
+            if snapped is not None:
+                break
+        if snapped is None:
+            snapped = len(kept)
+            kept.append(point)
+            cells.setdefault((cx, cy), list()).append(snapped)
+        found = (len(nodes), snapped)
+        nodes[key] = found
+        return found
+
+
+class _Graph:
+    """
+    degrees of nodes and connected parts of an undirected graph of nodes given by ids
+    """
+
+    def __init__(self):
+        self._degrees_ = dict()
+        self._parents_ = dict()
+
+    def add(self, node_a: int, node_b: int):
+        degrees = self._degrees_
+        degrees[node_a] = degrees.get(node_a, 0) + 1
+        degrees[node_b] = degrees.get(node_b, 0) + 1
+        root_a = self._root(node_a)
+        root_b = self._root(node_b)
+        if root_a != root_b:
+            self._parents_[root_a] = root_b
+
+    def nodes(self) -> int:
+        return len(self._degrees_)
+
+    def paths(self) -> int:
+        odd = dict()
+        for node, degree in self._degrees_.items():
+            root = self._root(node)
+            odd[root] = odd.get(root, 0) + degree % 2
+        return sum(max(count // 2, 1) for count in odd.values())
+
+    def _root(self, node: int) -> int:
+        parents = self._parents_
+        root = node
+        while root in parents:
+            root = parents[root]
+        # the path to the root is compressed
+        while node != root:
+            parents[node], node = root, parents[node]
+        return root
@@ -0,0 +1,140 @@
+import math
+from typing import Any, Iterator
+
+from parser.io import Point
+
+
+class SpatialGrid:
+    """
+    Uniform grid hash of points with items attached to them.
+    Neighbour queries look only into the cells around a point, so they cost O(1) for evenly spread points.
+    """
+
+    def __init__(self, cell_size: float):
+        self._cell_size_ = cell_size
+        self._cells_ = dict()
+        self._size_ = 0
+        self._bounds_ = None
+
+    def __len__(self) -> int:
+        return self._size_
+
+    def cell(self, point: Point) -> (int, int):
+        return math.floor(point.x / self._cell_size_), math.floor(point.y / self._cell_size_)
+
+    def add(self, point: Point, item: Any):
+        cell = self.cell(point)
+        self._cells_.setdefault(cell, list()).append((point, item))
+        self._size_ += 1
+        if self._bounds_ is None:
+            self._bounds_ = [cell[0], cell[1], cell[0], cell[1]]
+        else:
+            bounds = self._bounds_
+            x, y = cell
+            if x < bounds[0]:
+                bounds[0] = x
+            elif x > bounds[2]:
+                bounds[2] = x
+            if y < bounds[1]:
+                bounds[1] = y
+            elif y > bounds[3]:
+                bounds[3] = y
+
+    def remove(self, point: Point, item: Any):
+        cell = self.cell(point)
+        entries = self._cells_.get(cell)
+        for idx, entry in enumerate(entries):
+            if entry[1] is item:
+                entries.pop(idx)
+                self._size_ -= 1
+                break
+        if not entries:
+            self._cells_.pop(cell)
+
+    def near(self, point: Point, radius: float) -> Iterator[tuple]:
+        """
+        all entries within the radius from the point
+        """
+        cx, cy = self.cell(point)
+        reach = int(math.ceil(radius / self._cell_size_))
+        for x in range(cx - reach, cx + reach + 1):
+            for y in range(cy - reach, cy + reach + 1):
+                for entry in self._cells_.get((x, y), ()):
+                    if Point.length(point, entry[0]) <= radius:
+                        yield entry
+
+    def nearest(self, point: Point) -> (Point, Any):
+        """
+        the nearest entry to the point or None if the grid is empty. Cells are searched ring by ring
+        until the found entry is nearer than any entry of the next ring can be. The search starts at the first ring
+        reaching the bounds of the grid and looks only at the cells of a ring within the bounds, so a point far
+        from the grid looks at a few rings.
+        When more cells are looked at than there are occupied cells, the occupied cells are scanned instead,
+        so a far point or a sparse grid costs no more than a scan.
+        """
+        if self._size_ == 0:
+            return None
+        cx, cy = self.cell(point)
+        min_x, min_y, max_x, max_y = self._bounds_
+        gap_x = max(min_x - cx, cx - max_x, 0)
+        gap_y = max(min_y - cy, cy - max_y, 0)
+        # a cell of a ring within the bounds is at least the ring away along one axis and the gap along the other
+        gap = max(min(gap_x, gap_y) - 1, 0)
+        max_ring = max(abs(cx - min_x), abs(cx - max_x), abs(cy - min_y), abs(cy - max_y))
+        result = None
+        distance = None
+        looked = 0
+        for ring in range(max(gap_x, gap_y), max_ring + 1):
+            if distance is not None and distance <= math.hypot(ring - 1, gap) * self._cell_size_:
+                break
+            for cell in self._ring(cx, cy, ring, self._bounds_):
+                looked += 1
+                if looked > len(self._cells_):
+                    return self._scan(point)
+                for entry in self._cells_.get(cell, ()):
+                    candidate = Point.length(point, entry[0])
+                    if distance is None or candidate < distance:
+                        distance = candidate
+                        result = entry
+        return result
+
+    def _scan(self, point: Point) -> (Point, Any):
+        result = None
+        distance = None
+        for entries in self._cells_.values():
+            for entry in entries:
+                candidate = Point.length(point, entry[0])
+                if distance is None or candidate < distance:
+                    distance = candidate
+                    result = entry
+        return result
+
+    @staticmethod
+    def _ring(cx: int, cy: int, ring: int, bounds: list[int]) -> Iterator[tuple]:
+        """
+        cells of the ring around the cell within the bounds
+        """
+        min_x, min_y, max_x, max_y = bounds
+        if ring == 0:
+            yield cx, cy
+            return
+        for y in (cy - ring, cy + ring):
+            if min_y <= y <= max_y:
+                for x in range(max(cx - ring, min_x), min(cx + ring, max_x) + 1):
+                    yield x, y
+        for x in (cx - ring, cx + ring):
+            if min_x <= x <= max_x:
+                for y in range(max(cy - ring + 1, min_y), min(cy + ring - 1, max_y) + 1):
+                    yield x, y
+
+    @staticmethod
+    def cell_size_for(points: list[Point], per_cell: float = 2.0) -> float:
+        """
+        cell size to keep about per_cell points in a cell of the bounding box of the points
+        """
+        if not points:
+            return 1.0
+        width = max(point.x for point in points) - min(point.x for point in points)
+        height = max(point.y for point in points) - min(point.y for point in points)
+        area = max(width, 1e-6) * max(height, 1e-6)
+        return max(math.sqrt(area * per_cell / len(points)), 1e-3)
@@ -0,0 +1,134 @@
+import logging
+from typing import Iterable, Iterator
+
+from graph import add_edge, calculate_paths, Path
+from optimizer.arcs import ArcFitter
+from optimizer.output import path_commands, PROLOGUE, EPILOGUE
+from optimizer.parts import PartDetector
+from optimizer.spatial import SpatialGrid
+from parser.io import Point, Edge
+
+logger = logging.getLogger(__name__)
+
+
+class StreamingReport:
+    def __init__(self):
+        self.edges = 0
+        self.paths = 0
+        self.windows = 0
+        self.max_window = 0
+        self.travel_length = 0.0
+        self.cycles = 0
+        self.cycles_saved = 0.0
+        # the first and the last point cut
+        self.start = None
+        self.end = None
+        self.parts = None
+
+    def __str__(self) -> str:
+        return (f'edges: {self.edges}, paths: {self.paths}, windows: {self.windows} '
+                f'(max {self.max_window} edges), travel: {self.travel_length:.3f}, '
+                f'cycles: {self.cycles} (saved {self.cycles_saved:.3f})')
+
+
+class StreamingOptimizer(Iterable):
+    """
+    Optimize a stream of edges (e.g. GCodeFileReader) within a sliding window and emit G-code incrementally.
+    When window_size edges are collected, the window is split to paths and the paths are ordered by
+    the nearest neighbour from the current position of the head. A closed contour can be entered at any of its nodes,
+    so it is started at its node nearest to the head. Paths are emitted until a half of the window
+    is cut, the rest of the edges stays in the window to be joined with the next edges of the stream.
+    Memory is bounded by window_size regardless of the size of the input.
+    Without framed the G-code is emitted without its prologue and epilogue to be a part of another program.
+    With repeated_parts the paths of copies of a part in a window are walked once by PartDetector.
+    """
+
+    def __init__(self,
+                 edges: Iterable[Edge],
+                 power: float,
+                 speed: float,
+                 window_size: int = 5000,
+                 arc_fitter: ArcFitter = None,
+                 framed: bool = True,
+                 repeated_parts: bool = False):
+        self._edges_ = edges
+        self._power_ = power
+        self._speed_ = speed
+        self._window_size_ = max(window_size, 2)
+        self._arc_fitter_ = arc_fitter
+        self._framed_ = framed
+        self._repeated_parts_ = repeated_parts
+        self._parts_ = None
+        self.report = StreamingReport()
+
+    def __iter__(self) -> Iterator[str]:
+        self.report = StreamingReport()
+        self._parts_ = PartDetector() if self._repeated_parts_ else None
+        self.report.parts = self._parts_.report if self._parts_ is not None else None
+        self._position_ = Point(0.0, 0.0)
+        if self._framed_:
+            yield from PROLOGUE
+        window = list()
+        for edge in self._edges_:
+            if edge.length() <= 0:
+                continue
+            self.report.edges += 1
+            window.append(edge)
+            if len(window) >= self._window_size_:
+                window = yield from self._slide(window, len(window) // 2)
+        while window:
+            window = yield from self._slide(window, len(window))
+        if self._framed_:
+            yield from EPILOGUE
+        logger.info(f"Streaming optimization: {str(self.report)}")
+        if self._parts_ is not None:
+            logger.info(f"Repeated parts: {str(self._parts_.report)}")
+
+    def _slide(self, window: list[Edge], size: int):
+        """
+        emit nearest paths of the window until size edges are cut, returns edges of the rest paths
+        """
+        self.report.windows += 1
+        self.report.max_window = max(self.report.max_window, len(window))
+        if self._parts_ is not None:
+            paths, densities = self._parts_.paths(window)
+            paths = [Path(points, density, power=self._power_, speed=self._speed_)
+                     for points, density in zip(paths, densities)]
+            nodes = [point for path in paths for point in path.points]
+        else:
+            nodes = list()
+            matrix = dict()
+            for edge in window:
+                add_edge(nodes, matrix, edge)
+            points = {str(node): node for node in nodes}
+            paths, densities = calculate_paths(nodes, matrix)
+            paths = [Path([points[key] for key in path], density, power=self._power_, speed=self._speed_)
+                     for path, density in zip(paths, densities)]
+        entries = SpatialGrid(SpatialGrid.cell_size_for(nodes))
+        for path in paths:
+            for entry in path.entries():
+                entries.add(entry, path)
+        rest = len(paths)
+        emitted = 0
+        while rest and emitted < size:
+            point, path = entries.nearest(self._position_)
+            for entry in path.entries():
+                entries.remove(entry, path)
+            rest -= 1
+            if path.is_cycled:
+                self.report.cycles += 1
+                self.report.cycles_saved += Point.length(self._position_, path.points[0]) \
+                    - Point.length(self._position_, point)
+            path.start_at(point)
+            points = path.points
+            self.report.paths += 1
+            self.report.travel_length += Point.length(self._position_, points[0])
+            if self.report.start is None:
+                self.report.start = points[0]
+            self.report.end = points[-1]
+            yield from path_commands(points, path.power, path.speed, self._arc_fitter_)
+            self._position_ = points[-1]
+            emitted += len(points) - 1
+            # the path is marked as emitted
+            points.clear()
+        return [Edge(path.points[idx - 1], path.points[idx]) for path in paths for idx in range(1, len(path.points))]
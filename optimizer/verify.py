@@ -0,0 +1,269 @@
+import logging
+import math
+from typing import Iterable
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from parser.io import Edge
+
+logger = logging.getLogger(__name__)
+
+
+class EquivalenceReport:
+    def __init__(self):
+        self.edges_expected = 0
+        self.edges_actual = 0
+        self.matched = 0
+        self.rasterized = 0
+        self.length_expected = 0.0
+        self.length_actual = 0.0
+        self.missing_length = 0.0
+        self.extra_length = 0.0
+
+    @property
+    def is_equivalent(self) -> bool:
+        return self.missing_length == 0 and self.extra_length == 0
+
+    def __str__(self) -> str:
+        return (f'edges: {self.edges_expected} -> {self.edges_actual}, matched exactly: {self.matched}, '
+                f'rasterized: {self.rasterized}, cut length: {self.length_expected:.3f} -> {self.length_actual:.3f}, '
+                f'missing: {self.missing_length:.3f}, extra: {self.extra_length:.3f}')
+
+
+class EquivalenceChecker:
+    """
+    Check that two sets of edges cut the same geometry regardless of the order, the direction and splits of edges.
+    Edges are matched exactly by a hash of their ends snapped to a grid of tolerance, ordered so the direction
+    does not matter. Edges left unmatched are sampled and the samples are looked up in a sparse bitmap
+    of the other set with pixels of tolerance, only edges around the unmatched ones are rasterized.
+    The bitmap only decides whether an unmatched edge is covered by the other set along its whole length,
+    an uncovered edge is counted with its whole length, so a short gap is not shrunk by the pixels around it
+    and a partly covered edge is counted whole. A gap shorter than about four pixels is within reach of the cuts
+    at its ends, so it is taken as covered.
+    The bitmap is built by numpy when it is installed, both ways sample edges and key pixels the same way,
+    so they report the same lengths.
+    """
+    __REGION_SCALE__ = 16
+    __CHUNK_SIZE__ = 100_000
+
+    def __init__(self, tolerance: float = 0.05, vectorized: bool = True):
+        self._tolerance_ = tolerance
+        self._vectorized_ = vectorized and np is not None
+        self.report = EquivalenceReport()
+
+    def check(self, expected: Iterable[Edge], actual: Iterable[Edge]) -> EquivalenceReport:
+        self.report = EquivalenceReport()
+        if self._vectorized_:
+            self._check_numpy(EquivalenceChecker._ends(expected), EquivalenceChecker._ends(actual))
+            logger.info(f"Equivalence: {str(self.report)}")
+            return self.report
+        expected_keys = self._hash(expected, True)
+        actual_keys = self._hash(actual, False)
+        self.report.matched = len(expected_keys.keys() & actual_keys.keys())
+        missed = [edge for key, edge in expected_keys.items() if key not in actual_keys]
+        added = [edge for key, edge in actual_keys.items() if key not in expected_keys]
+        self.report.rasterized = len(missed) + len(added)
+        if missed:
+            self.report.missing_length = self._uncovered_length(missed, actual_keys.values())
+        if added:
+            self.report.extra_length = self._uncovered_length(added, expected_keys.values())
+        logger.info(f"Equivalence: {str(self.report)}")
+        return self.report
+
+    def _hash(self, edges: Iterable[Edge], is_expected: bool) -> dict:
+        """
+        edges by their canonical keys, duplicates cut the same geometry so they are kept once
+        """
+        tolerance = self._tolerance_
+        result = dict()
+        count = 0
+        length = 0.0
+        for edge in edges:
+            point_a = edge.point_a
+            point_b = edge.point_b
+            ax, ay, bx, by = point_a.x, point_a.y, point_b.x, point_b.y
+            edge_length = math.hypot(bx - ax, by - ay)
+            if edge_length <= 0:
+                continue
+            count += 1
+            length += edge_length
+            a = (round(ax / tolerance), round(ay / tolerance))
+            b = (round(bx / tolerance), round(by / tolerance))
+            result[(a, b) if a <= b else (b, a)] = edge
+        if is_expected:
+            self.report.edges_expected = count
+            self.report.length_expected = length
+        else:
+            self.report.edges_actual = count
+            self.report.length_actual = length
+        return result
+
+    def _near(self, edges: Iterable[Edge], probes: list[Edge]) -> list[Edge]:
+        """
+        edges passing through the coarse cells around the probes
+        """
+        size = self._tolerance_ * EquivalenceChecker.__REGION_SCALE__
+        region = set()
+        for edge in probes:
+            for x, y in EquivalenceChecker._samples(edge, size):
+                cx = math.floor(x / size)
+                cy = math.floor(y / size)
+                for dx in (-1, 0, 1):
+                    for dy in (-1, 0, 1):
+                        region.add((cx + dx, cy + dy))
+        return [edge for edge in edges
+                if any((math.floor(x / size), math.floor(y / size)) in region
+                       for x, y in EquivalenceChecker._samples(edge, size))]
+
+    def _uncovered_length(self, edges: list[Edge], others: Iterable[Edge]) -> float:
+        """
+        length of the edges not covered along their whole length by the others within about tolerance
+        """
+        size = self._tolerance_
+        cells = set()
+        for edge in self._near(others, edges):
+            for x, y in EquivalenceChecker._samples(edge, size):
+                cells.add((math.floor(x / size), math.floor(y / size)))
+        length = 0.0
+        for edge in edges:
+            for x, y in EquivalenceChecker._samples(edge, size):
+                cx = math.floor(x / size)
+                cy = math.floor(y / size)
+                if not any((cx + dx, cy + dy) in cells for dx in (-1, 0, 1) for dy in (-1, 0, 1)):
+                    length += edge.length()
+                    break
+        return length
+
+    def _check_numpy(self, expected, actual):
+        """
+        the same check for edges given by arrays of their ends
+        """
+        expected = expected[(expected[:, 0] != expected[:, 2]) | (expected[:, 1] != expected[:, 3])]
+        actual = actual[(actual[:, 0] != actual[:, 2]) | (actual[:, 1] != actual[:, 3])]
+        self.report.edges_expected = len(expected)
+        self.report.edges_actual = len(actual)
+        self.report.length_expected = float(np.hypot(expected[:, 2] - expected[:, 0],
+                                                     expected[:, 3] - expected[:, 1]).sum())
+        self.report.length_actual = float(np.hypot(actual[:, 2] - actual[:, 0], actual[:, 3] - actual[:, 1]).sum())
+        keys = self._keys_numpy(np.concatenate((expected, actual)))
+        order = np.lexsort((keys[:, 1], keys[:, 0]))
+        keys = keys[order]
+        is_first = np.concatenate(([True], (keys[1:] != keys[:-1]).any(axis=1)))
+        group = np.cumsum(is_first) - 1
+        is_expected = order < len(expected)
+        # the first edge of every group of each set represents the group, duplicates are checked once
+        first_expected = np.full(group[-1] + 1 if len(group) else 0, -1, dtype=np.int64)
+        first_actual = first_expected.copy()
+        first_expected[group[is_expected][::-1]] = order[is_expected][::-1]
+        first_actual[group[~is_expected][::-1]] = order[~is_expected][::-1] - len(expected)
+        self.report.matched = int(np.count_nonzero((first_expected >= 0) & (first_actual >= 0)))
+        missed = expected[first_expected[(first_expected >= 0) & (first_actual < 0)]]
+        added = actual[first_actual[(first_actual >= 0) & (first_expected < 0)]]
+        self.report.rasterized = len(missed) + len(added)
+        if len(missed):
+            self.report.missing_length = self._uncovered_length_numpy(missed, actual)
+        if len(added):
+            self.report.extra_length = self._uncovered_length_numpy(added, expected)
+
+    def _keys_numpy(self, ends):
+        """
+        canonical keys of edges: their ends snapped to the grid of tolerance, the lesser end goes first,
+        every end is packed to an int64
+        """
+        snapped = np.round(ends / self._tolerance_).astype(np.int64)
+        is_swapped = (snapped[:, 2] < snapped[:, 0]) | ((snapped[:, 2] == snapped[:, 0]) & (snapped[:, 3] < snapped[:, 1]))
+        snapped[is_swapped] = snapped[is_swapped][:, [2, 3, 0, 1]]
+        min_y = min(snapped[:, 1].min(), snapped[:, 3].min()) if len(snapped) else 0
+        height = max(snapped[:, 1].max(), snapped[:, 3].max()) - min_y + 1 if len(snapped) else 1
+        return np.stack((snapped[:, 0] * height + snapped[:, 1] - min_y,
+                         snapped[:, 2] * height + snapped[:, 3] - min_y), axis=1)
+
+    def _uncovered_length_numpy(self, probes, ends) -> float:
+        size = self._tolerance_
+        region_size = size * EquivalenceChecker.__REGION_SCALE__
+        both = np.concatenate((probes, ends))
+        min_x = both[:, [0, 2]].min()
+        min_y = both[:, [1, 3]].min()
+        max_y = both[:, [1, 3]].max()
+        # a margin of a cell keeps keys of neighbour cells within the columns
+        height = math.floor(max_y / size) - math.floor(min_y / size) + 3
+        region_height = math.floor(max_y / region_size) - math.floor(min_y / region_size) + 3
+
+        def keys(x, y, cell_size: float, cell_height: int):
+            # cells of absolute coordinates as _uncovered_length has them, shifted to non-negative keys
+            return (np.floor(x / cell_size).astype(np.int64) - math.floor(min_x / cell_size) + 1) * cell_height \
+                + np.floor(y / cell_size).astype(np.int64) - math.floor(min_y / cell_size) + 1
+
+        def neighbours(cell_height: int):
+            return np.array([dx * cell_height + dy for dx in (-1, 0, 1) for dy in (-1, 0, 1)], dtype=np.int64)
+
+        x, y, index, counts, lengths = EquivalenceChecker._samples_numpy(probes, size)
+        region = EquivalenceChecker._unique((keys(x, y, region_size, region_height)[:, None] + neighbours(region_height)).ravel())
+        cells = [np.empty(0, dtype=np.int64)]
+        for start in range(0, len(ends), EquivalenceChecker.__CHUNK_SIZE__):
+            chunk = ends[start:start + EquivalenceChecker.__CHUNK_SIZE__]
+            # only edges passing through the region around the probes are rasterized
+            other_x, other_y, other_index, _, _ = EquivalenceChecker._samples_numpy(chunk, region_size)
+            mask = EquivalenceChecker._contains(region, keys(other_x, other_y, region_size, region_height))
+            chunk = chunk[np.bincount(other_index, weights=mask, minlength=len(chunk)) > 0]
+            other_x, other_y, _, _, _ = EquivalenceChecker._samples_numpy(chunk, size)
+            cells.append(EquivalenceChecker._unique(keys(other_x, other_y, size, height)))
+        cells = EquivalenceChecker._unique(np.concatenate(cells))
+        probe_keys = keys(x, y, size, height)
+        covered = np.zeros(len(probe_keys), dtype=bool)
+        for shift in neighbours(height):
+            covered |= EquivalenceChecker._contains(cells, probe_keys + shift)
+        uncovered = np.bincount(index, weights=~covered, minlength=len(probes))
+        return float(np.sum(lengths[uncovered > 0]))
+
+    @staticmethod
+    def _samples(edge: Edge, step: float) -> list[(float, float)]:
+        """
+        evenly spaced points of the edge including its ends, no further than step from each other
+        """
+        a = edge.point_a
+        b = edge.point_b
+        n = max(int(math.ceil(math.hypot(b.x - a.x, b.y - a.y) / step)), 1)
+        return [(a.x + (b.x - a.x) * idx / n, a.y + (b.y - a.y) * idx / n) for idx in range(n + 1)]
+
+    @staticmethod
+    def _ends(edges: Iterable[Edge]):
+        return np.array([(edge.point_a.x, edge.point_a.y, edge.point_b.x, edge.point_b.y) for edge in edges],
+                        dtype=np.float64).reshape(-1, 4)
+
+    @staticmethod
+    def _samples_numpy(ends, step: float):
+        """
+        the same samples as _samples for edges given by an array of their ends: coordinates,
+        indexes of edges of the samples, counts of samples of edges and lengths of edges
+        """
+        ax, ay, bx, by = ends.T
+        lengths = np.hypot(bx - ax, by - ay)
+        n = np.maximum(np.ceil(lengths / step), 1).astype(np.int64)
+        counts = n + 1
+        index = np.repeat(np.arange(len(ends)), counts)
+        idx = np.arange(len(index)) - np.repeat(np.cumsum(counts) - counts, counts)
+        n = n[index]
+        # evaluated in the order of _samples, so the samples are equal to the last bit
+        return ax[index] + (bx - ax)[index] * idx / n, ay[index] + (by - ay)[index] * idx / n, index, counts, lengths
+
+    @staticmethod
+    def _unique(values):
+        """
+        sorted unique values, sorting is faster than np.unique for int64 keys
+        """
+        values = np.sort(values)
+        return values[np.concatenate(([True], values[1:] != values[:-1]))] if len(values) else values
+
+    @staticmethod
+    def _contains(values, probes):
+        """
+        mask of the probes found in the sorted values
+        """
+        if len(values) == 0:
+            return np.zeros(len(probes), dtype=bool)
+        position = np.minimum(np.searchsorted(values, probes), len(values) - 1)
+        return values[position] == probes
@@ -0,0 +1,124 @@
+import bz2
+import gzip
+import io
+import logging
+import lzma
+import os
+import threading
+from queue import Queue
+from typing import TextIO
+
+logger = logging.getLogger(__name__)
+
+# compressions written by the suffix of a file
+COMPRESSIONS = {'.gz': gzip, '.bz2': bz2, '.xz': lzma}
+# compressions read by the first bytes of a file
+MAGICS = ((b'\x1f\x8b', gzip), (b'BZh', bz2), (b'\xfd7zXZ\x00', lzma))
+
+BUFFER_SIZE = 1024 * 1024
+
+
+def compression(filename: str):
+    """
+    module of the compression of the file by its first bytes, None for a plain file
+    """
+    with open(filename, 'rb') as file:
+        head = file.read(max(len(magic) for magic, _ in MAGICS))
+    for magic, module in MAGICS:
+        if head.startswith(magic):
+            return module
+    return None
+
+
+def compressed_suffix(filename: str) -> str:
+    """
+    suffix of the compression of the file by its name, '' for a plain file
+    """
+    suffix = os.path.splitext(filename)[1].lower()
+    return suffix if suffix in COMPRESSIONS else ''
+
+
+class BackgroundReader(io.RawIOBase):
+    """
+    Bytes of a binary file read by chunks of chunk_size in a thread, so decompression runs while the reader parses.
+    The thread keeps at most chunks chunks ahead of the reader. zlib, bz2 and lzma release the GIL while they
+    decompress, so it runs in parallel with parsing when there is a free core.
+    """
+
+    def __init__(self, file, chunk_size: int = BUFFER_SIZE, chunks: int = 4):
+        super().__init__()
+        self._file_ = file
+        self._chunk_size_ = chunk_size
+        self._queue_ = Queue(maxsize=chunks)
+        self._chunk_ = b''
+        self._offset_ = 0
+        self._is_stopped_ = threading.Event()
+        self._is_eof_ = False
+        self._thread_ = threading.Thread(target=self._read, name=f'decompress {getattr(file, "name", "")}',
+                                         daemon=True)
+        self._thread_.start()
+
+    def _read(self):
+        try:
+            while not self._is_stopped_.is_set():
+                chunk = self._file_.read(self._chunk_size_)
+                self._queue_.put(chunk)
+                if not chunk:
+                    return
+        except Exception as error:
+            self._queue_.put(error)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._offset_ >= len(self._chunk_):
+            if self._is_eof_:
+                return 0
+            chunk = self._queue_.get()
+            if isinstance(chunk, Exception):
+                self._is_eof_ = True
+                raise chunk
+            if not chunk:
+                self._is_eof_ = True
+                return 0
+            self._chunk_ = chunk
+            self._offset_ = 0
+        size = min(len(buffer), len(self._chunk_) - self._offset_)
+        buffer[:size] = self._chunk_[self._offset_:self._offset_ + size]
+        self._offset_ += size
+        return size
+
+    def close(self):
+        if self.closed:
+            return
+        self._is_stopped_.set()
+        # the thread is released from a full queue
+        while self._thread_.is_alive():
+            while not self._queue_.empty():
+                self._queue_.get_nowait()
+            self._thread_.join(0.01)
+        self._file_.close()
+        super().close()
+
+
+def open_gcode(filename: str, mode: str = 'r', buffer_size: int = BUFFER_SIZE, background: bool = False) -> TextIO:
+    """
+    open a G-code file as text. Compressed files are read by their first bytes and written by their suffix
+    (.gz, .bz2, .xz), so they are streamed without being decompressed to the disk.
+    A compressed file is decompressed in a thread with background.
+    """
+    if 'w' in mode:
+        module = COMPRESSIONS.get(compressed_suffix(filename))
+        if module is None:
+            return open(filename, mode, buffering=buffer_size)
+        # the compressor is called once per buffer instead of once per command
+        return io.TextIOWrapper(io.BufferedWriter(module.open(filename, 'wb'), buffer_size))
+    module = compression(filename)
+    if module is None:
+        return open(filename, mode, buffering=buffer_size)
+    file = module.open(filename, 'rb')
+    if background:
+        logger.debug(f"{filename} is decompressed by {module.__name__} in a thread")
+        return io.TextIOWrapper(io.BufferedReader(BackgroundReader(file, buffer_size), buffer_size))
+    return io.TextIOWrapper(io.BufferedReader(file, buffer_size))
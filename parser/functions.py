@@ -1,5 +1,26 @@
+import heapq
+import math
+import pickle
 import sys
-from typing import Iterable, Any
+import tempfile
+import threading
+import tracemalloc
+from itertools import chain, islice, zip_longest, compress
+from operator import attrgetter, itemgetter, length_hint
+from queue import Queue
+from types import ModuleType, FunctionType, BuiltinFunctionType, MethodType
+from typing import Iterable, Any, Callable, Iterator, IO
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+__FLAT_TYPES__ = (str, bytes, int, float, bool, complex, type(None))
+__NOT_FOLLOWED_TYPES__ = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType)
+# a partition still larger than the memory limit is split again up to this depth, keys repeated in a partition
+# cannot be split by any hash
+__PARTITION_DEPTH__ = 4
 
 
 def echo(item: Any) -> Any:
@@ -38,25 +59,131 @@ def put_if_not_exists(d: dict, key: Any, init_value: Any = None):
     return d
 
 
-def deep_getsizeof(obj) -> int:
-    result = 0
+def deep_getsizeof(obj, seen: set = None) -> int:
+    """
+    size of the object with everything it refers to: items of containers, attributes of objects.
+    Shared objects are counted once, classes, modules and functions are not followed
+    """
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    result = sys.getsizeof(obj)
+    if isinstance(obj, __FLAT_TYPES__) or isinstance(obj, __NOT_FOLLOWED_TYPES__):
+        return result
     if isinstance(obj, dict):
         for key, value in obj.items():
-            result += deep_getsizeof(key) + deep_getsizeof(value)
-    elif isinstance(obj, list):
+            result += deep_getsizeof(key, seen) + deep_getsizeof(value, seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
         for value in obj:
-            result += deep_getsizeof(value)
-    else:
-        result += sys.getsizeof(obj)
+            result += deep_getsizeof(value, seen)
+    if hasattr(obj, '__dict__'):
+        # names of attributes are shared by all instances of a class
+        attributes = vars(obj)
+        result += sys.getsizeof(attributes)
+        for value in attributes.values():
+            result += deep_getsizeof(value, seen)
+    for cls in type(obj).__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            if hasattr(obj, name):
+                result += deep_getsizeof(getattr(obj, name), seen)
     return result
 
 
-def group_by_memory_limit(data: Iterable, memory_limit_size=5_000_000):
+class SizeEstimator:
+    """
+    Estimate sizes of elements without measuring each of them: the first sample_size elements of every type
+    are measured by deep_getsizeof and the average is used for the next ones, every resample_rate-th element
+    of a type is measured again to follow changes of the data. Flat values (str, bytes, numbers) are measured directly.
+    With calibrate=True the memory really retained by a window of the first calibration_size elements is traced
+    by tracemalloc, the estimates of their types are corrected by it.
+    """
+    __NO_VALUE__ = object()
+
+    def __init__(self,
+                 sample_size: int = 16,
+                 resample_rate: int = 256,
+                 calibrate: bool = False,
+                 calibration_size: int = 256):
+        self._sample_size_ = sample_size
+        self._resample_rate_ = resample_rate
+        self._calibration_size_ = calibration_size if calibrate else 0
+        # type -> [samples count, samples total size, count of estimated elements]
+        self._stats_ = dict()
+        # type -> ratio of traced to measured sizes
+        self._factors_ = dict()
+
+    def track(self, data: Iterable) -> Iterator:
+        """
+        pass the elements of data through, the first of them are traced if the estimator is calibrated
+        """
+        iterator = iter(data)
+        if self._calibration_size_ > 0:
+            # the first element may pay for buffers of the supplier, it is not traced
+            element = next(iterator, self.__NO_VALUE__)
+            if element is self.__NO_VALUE__:
+                return
+            yield element
+            is_tracing = tracemalloc.is_tracing()
+            if not is_tracing:
+                tracemalloc.start()
+            try:
+                before = tracemalloc.get_traced_memory()[0]
+                # the window keeps the elements as a chunk of the consumer would do, they are passed on
+                # when the estimates are calibrated, so the consumer measures them calibrated too
+                window = list(islice(iterator, self._calibration_size_))
+                traced = tracemalloc.get_traced_memory()[0] - before
+            finally:
+                if not is_tracing:
+                    tracemalloc.stop()
+            # the samples are taken from the window, deep_getsizeof measures the first elements of a class
+            # larger than the rest in a fresh process
+            samples = dict()
+            flat = 0
+            for element in window:
+                kind = type(element)
+                if kind in __FLAT_TYPES__:
+                    flat += sys.getsizeof(element)
+                else:
+                    sample = samples.setdefault(kind, [0, 0])
+                    sample[0] += 1
+                    sample[1] += deep_getsizeof(element)
+            measured = sum(total for _, total in samples.values())
+            if measured > 0 and traced > flat:
+                factor = (traced - flat) / measured
+                for kind, (count, total) in samples.items():
+                    self._factors_[kind] = factor
+                    stats = self._stats_.setdefault(kind, [0, 0, 0])
+                    stats[0] = count
+                    stats[1] = total
+            yield from window
+        yield from iterator
+
+    def size(self, obj) -> int:
+        kind = type(obj)
+        if kind in __FLAT_TYPES__:
+            return sys.getsizeof(obj)
+        stats = self._stats_.get(kind)
+        if stats is None:
+            stats = [0, 0, 0]
+            self._stats_[kind] = stats
+        stats[2] += 1
+        if stats[0] < self._sample_size_ or stats[2] % self._resample_rate_ == 0:
+            stats[0] += 1
+            stats[1] += deep_getsizeof(obj)
+        factor = self._factors_.get(kind)
+        if factor is not None:
+            return int(stats[1] * factor / stats[0])
+        return stats[1] // stats[0]
+
+
+def group_by_memory_limit(data: Iterable, memory_limit_size=5_000_000, estimator: SizeEstimator = None):
+    estimator = SizeEstimator() if estimator is None else estimator
     current_chunk = []
     chunk_size = 0
-    for element in data:
+    for element in estimator.track(data):
         current_chunk.append(element)
-        chunk_size += deep_getsizeof(element)
+        chunk_size += estimator.size(element)
         if chunk_size >= memory_limit_size:
             result = current_chunk
             current_chunk = []
@@ -76,3 +203,488 @@ def group_by_limit(data: Iterable, limit_size=16):
             yield result
     if current_chunk:
         yield current_chunk
+
+
+def to_columns(items: list, columns: dict[str, str], to_row: Callable[[Any], tuple] = None) -> dict:
+    """
+    columnar batch of the items: a column per name of columns read by its attribute path ('point_a.x')
+    or by its key for dict items, to_row reads values of all columns of an item at once instead.
+    Columns are numpy arrays when numpy is installed and lists otherwise
+    """
+    if to_row is None:
+        paths = list(columns.values())
+        to_row = itemgetter(*paths) if isinstance(items[0], dict) else attrgetter(*paths)
+        if len(paths) == 1:
+            # a single getter returns a value instead of a row
+            single = to_row
+            to_row = lambda item: (single(item),)
+    rows = list(map(to_row, items))
+    if np is None:
+        return {name: list(value) for name, value in zip(columns, zip(*rows))}
+    # a single table is built only when every value is of the same kind, a column of its own kind otherwise
+    kinds = set(map(type, chain.from_iterable(rows)))
+    dtype = np.float64 if kinds <= {float} else np.int64 if kinds <= {int} else None
+    table = None
+    if dtype is not None:
+        try:
+            table = np.fromiter(chain.from_iterable(rows), dtype=dtype, count=len(rows) * len(columns)) \
+                .reshape(len(rows), len(columns))
+        except (TypeError, ValueError, OverflowError):
+            table = None
+    if table is None:
+        return {name: np.asarray(value) for name, value in zip(columns, zip(*rows))}
+    return {name: table[:, idx] for idx, name in enumerate(columns)}
+
+
+def from_columns(result: Any, to_item: Callable[..., Any] = None) -> Iterator:
+    """
+    items of a result of a batch function: a column of values or a dict of columns converted to items
+    by to_item(**row) (to dicts by default)
+    """
+    if isinstance(result, dict):
+        names = list(result.keys())
+        values = [value.tolist() if hasattr(value, 'tolist') else value for value in result.values()]
+        for row in zip(*values):
+            item = dict(zip(names, row))
+            yield item if to_item is None else to_item(**item)
+    else:
+        yield from (result.tolist() if hasattr(result, 'tolist') else result)
+
+
+def _batches(data: Iterable,
+             columns: Iterable[str] | dict[str, str] | None,
+             batch_size: int,
+             to_row: Callable[[Any], tuple] = None) -> Iterator:
+    columns = columns if columns is None or isinstance(columns, dict) else {name: name for name in columns}
+    iterator = iter(data)
+    while True:
+        items = list(islice(iterator, batch_size))
+        if not items:
+            break
+        yield items, items if columns is None else to_columns(items, columns, to_row)
+
+
+def map_batches(data: Iterable,
+                function: Callable[[Any], Any],
+                columns: Iterable[str] | dict[str, str] = None,
+                batch_size: int = 4096,
+                to_row: Callable[[Any], tuple] = None,
+                to_item: Callable[..., Any] = None) -> Iterator:
+    for _, batch in _batches(data, columns, batch_size, to_row):
+        yield from from_columns(function(batch), to_item)
+
+
+def filter_batches(data: Iterable,
+                   predicate: Callable[[Any], Any],
+                   columns: Iterable[str] | dict[str, str] = None,
+                   batch_size: int = 4096,
+                   to_row: Callable[[Any], tuple] = None) -> Iterator:
+    for items, batch in _batches(data, columns, batch_size, to_row):
+        yield from compress(items, predicate(batch))
+
+
+def spill(data: Iterable, block_size: int = 1024) -> IO:
+    """
+    write items to an anonymous temporary file by pickled blocks, the file is removed when it is closed
+    """
+    file = tempfile.TemporaryFile()
+    for block in group_by_limit(data, limit_size=block_size):
+        pickle.dump(block, file, protocol=pickle.HIGHEST_PROTOCOL)
+    file.seek(0)
+    return file
+
+
+def unspill(file: IO) -> Iterator:
+    """
+    read items written by spill and close the file
+    """
+    try:
+        while True:
+            try:
+                block = pickle.load(file)
+            except EOFError:
+                break
+            yield from block
+    finally:
+        file.close()
+
+
+def fan_out(data: Iterable,
+            consumers: list[Callable[[Iterable], Any]],
+            buffer_size: int = 1024,
+            chunk_size: int = 64) -> list:
+    """
+    results of the consumers fed by one pass over data. The first consumer runs in the calling thread,
+    the others run in threads reading chunks of items from queues of about buffer_size items, so a slow consumer
+    holds the pass back instead of items piling up in memory. Items left by a consumer which is ended early
+    are skipped, the first error of the consumers is raised when all of them are ended.
+    """
+    queues = [Queue(max(buffer_size // chunk_size, 1)) for _ in consumers[1:]]
+    results = [None] * len(consumers)
+    errors = list()
+
+    def drain(queue: Queue) -> Iterator:
+        while True:
+            chunk = queue.get()
+            if chunk is None:
+                return
+            yield from chunk
+
+    def run(idx: int, queue: Queue):
+        items = drain(queue)
+        try:
+            results[idx] = consumers[idx](items)
+        except BaseException as error:
+            errors.append(error)
+        # the rest of the items are taken, so the pass is not blocked by the ended consumer
+        for _ in items:
+            pass
+
+    def feed(iterator: Iterator) -> Iterator:
+        for chunk in group_by_limit(iterator, limit_size=chunk_size):
+            for queue in queues:
+                queue.put(chunk)
+            yield from chunk
+
+    threads = [threading.Thread(target=run, args=(idx + 1, queue), daemon=True) for idx, queue in enumerate(queues)]
+    for thread in threads:
+        thread.start()
+    iterator = iter(data)
+    items = feed(iterator)
+    try:
+        results[0] = consumers[0](items)
+        for _ in items:
+            pass
+    except BaseException as error:
+        errors.insert(0, error)
+    finally:
+        for queue in queues:
+            queue.put(None)
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+    return results
+
+
+class SpillingCache(Iterable):
+    """
+    Items of data memoized while they are read for the first time, so they are replayed without reading data again.
+    Items are kept in memory up to memory_limit_size bytes, the next ones are spilled to an anonymous temporary file
+    by pickled blocks. Several iterators can read the cache at once, data is read further by the one ahead of others.
+    The file is removed by close, the cache can be used as a context manager, so it is removed whenever
+    an iteration is stopped early.
+    """
+
+    def __init__(self, data: Iterable, memory_limit_size: int = 50_000_000, block_size: int = 1024):
+        self._iterator_ = iter(data)
+        self._memory_limit_size_ = memory_limit_size
+        self._block_size_ = block_size
+        self._estimator_ = SizeEstimator()
+        self._items_ = list()
+        self._size_ = 0
+        self._file_ = None
+        # offsets of the spilled blocks in the file and the block being filled
+        self._offsets_ = list()
+        self._tail_ = list()
+        self._is_complete_ = False
+
+    def __iter__(self) -> Iterator:
+        idx = 0
+        block = None
+        block_idx = -1
+        while True:
+            if idx < len(self._items_):
+                yield self._items_[idx]
+                idx += 1
+                continue
+            if self._file_ is not None:
+                # positions are computed again every time, another iterator may have flushed the tail meanwhile
+                spilled_idx = idx - len(self._items_)
+                if spilled_idx // self._block_size_ < len(self._offsets_):
+                    if block_idx != spilled_idx // self._block_size_:
+                        block_idx = spilled_idx // self._block_size_
+                        block = self._load(block_idx)
+                    yield block[spilled_idx % self._block_size_]
+                    idx += 1
+                    continue
+                tail_idx = spilled_idx - len(self._offsets_) * self._block_size_
+                if tail_idx < len(self._tail_):
+                    yield self._tail_[tail_idx]
+                    idx += 1
+                    continue
+            if not self._read():
+                return
+
+    def close(self):
+        if self._file_ is not None:
+            self._file_.close()
+
+    def __enter__(self) -> 'SpillingCache':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _read(self) -> bool:
+        """
+        read the next item of data to the cache, returns False at the end of data
+        """
+        if self._is_complete_:
+            return False
+        try:
+            item = next(self._iterator_)
+        except StopIteration:
+            self._is_complete_ = True
+            return False
+        if self._file_ is None:
+            self._items_.append(item)
+            self._size_ += self._estimator_.size(item)
+            if self._size_ >= self._memory_limit_size_:
+                self._file_ = tempfile.TemporaryFile()
+            return True
+        self._tail_.append(item)
+        if len(self._tail_) >= self._block_size_:
+            self._file_.seek(0, 2)
+            self._offsets_.append(self._file_.tell())
+            pickle.dump(self._tail_, self._file_, protocol=pickle.HIGHEST_PROTOCOL)
+            self._tail_ = list()
+        return True
+
+    def _load(self, block_idx: int) -> list:
+        self._file_.seek(self._offsets_[block_idx])
+        return pickle.load(self._file_)
+
+
+def external_sort(data: Iterable,
+                  key_function: Callable[[Any], Any],
+                  memory_limit_size: int = 50_000_000,
+                  reverse: bool = False) -> Iterator:
+    """
+    external merge sort: sorted runs of memory_limit_size bytes are spilled to disk and merged lazily
+    """
+    chunks = group_by_memory_limit(data, memory_limit_size=memory_limit_size)
+    first = next(chunks, None)
+    second = next(chunks, None)
+    if second is None:
+        # everything fits to memory
+        yield from sorted(first or [], key=key_function, reverse=reverse)
+        return
+    runs = list()
+    try:
+        for chunk in chain((first, second), chunks):
+            chunk.sort(key=key_function, reverse=reverse)
+            runs.append(spill(chunk))
+        yield from heapq.merge(*[unspill(run) for run in runs], key=key_function, reverse=reverse)
+    finally:
+        for run in runs:
+            run.close()
+
+
+def external_distinct(data: Iterable, memory_limit_size: int = 50_000_000, partitions: int = None) -> Iterator:
+    """
+    distinct items in order of the first appearance while the seen items fit to memory_limit_size bytes.
+    Then the seen items and the rest of the data are spilled to disk partitioned by hash
+    and each partition is deduplicated separately. The count of partitions is sized from the seen items
+    and the length hint of the rest unless it is given, a partition larger than memory_limit_size is split again.
+    """
+    estimator = SizeEstimator()
+    seen = set()
+    seen_size = 0
+    iterator = iter(data)
+    for item in iterator:
+        if item not in seen:
+            seen.add(item)
+            seen_size += estimator.size(item)
+            yield item
+            if seen_size >= memory_limit_size:
+                break
+    else:
+        return
+    if partitions is None:
+        partitions = _partitions_for(seen_size + length_hint(iterator) * seen_size // len(seen), memory_limit_size)
+    seen_files, seen_sizes = _partition(seen, partitions)
+    seen = None
+    rest_files, rest_sizes = _partition(iterator, partitions)
+    yield from _distinct_partitions(seen_files, rest_files, [sum(pair) for pair in zip(seen_sizes, rest_sizes)],
+                                    memory_limit_size)
+
+
+def _distinct_partitions(seen_files: list[IO], rest_files: list[IO], sizes: list[int], memory_limit_size: int,
+                         depth: int = 0) -> Iterator:
+    """
+    items of the rest files not seen before, partitions larger than memory_limit_size are split again
+    """
+    try:
+        for idx in range(len(seen_files)):
+            if sizes[idx] > memory_limit_size and depth + 1 < __PARTITION_DEPTH__:
+                partitions = _partitions_for(sizes[idx], memory_limit_size)
+                sub_seen_files, seen_sizes = _partition(unspill(seen_files[idx]), partitions, depth=depth + 1)
+                sub_rest_files, rest_sizes = _partition(unspill(rest_files[idx]), partitions, depth=depth + 1)
+                yield from _distinct_partitions(sub_seen_files, sub_rest_files,
+                                                [sum(pair) for pair in zip(seen_sizes, rest_sizes)],
+                                                memory_limit_size, depth + 1)
+                continue
+            partition_seen = set(unspill(seen_files[idx]))
+            for item in unspill(rest_files[idx]):
+                if item not in partition_seen:
+                    partition_seen.add(item)
+                    yield item
+    finally:
+        for file in seen_files + rest_files:
+            file.close()
+
+
+def merge_join(data1: Iterable,
+               data2: Iterable,
+               key_function: Callable[[Any], Any],
+               keep_left: bool,
+               keep_right: bool) -> Iterator[tuple]:
+    """
+    join of two iterables ordered by the keys, pairs are emitted in order of the keys
+    with O(1) extra memory. Items with None keys are ignored.
+    """
+    no_value = object()
+    iterator1 = (item for item in data1 if item and key_function(item) is not None)
+    iterator2 = (item for item in data2 if item and key_function(item) is not None)
+    item1 = next(iterator1, no_value)
+    item2 = next(iterator2, no_value)
+    while item1 is not no_value and item2 is not no_value:
+        key1 = key_function(item1)
+        key2 = key_function(item2)
+        if key1 == key2:
+            yield item1, item2
+            item1 = next(iterator1, no_value)
+            item2 = next(iterator2, no_value)
+        elif key1 < key2:
+            if keep_left:
+                yield item1, None
+            item1 = next(iterator1, no_value)
+        else:
+            if keep_right:
+                yield None, item2
+            item2 = next(iterator2, no_value)
+    if keep_left and item1 is not no_value:
+        yield item1, None
+        yield from ((item, None) for item in iterator1)
+    if keep_right and item2 is not no_value:
+        yield None, item2
+        yield from ((None, item) for item in iterator2)
+
+
+def spilling_hash_join(data1: Iterable,
+                       data2: Iterable,
+                       key_function: Callable[[Any], Any],
+                       keep_left: bool,
+                       keep_right: bool,
+                       memory_limit_size: int = 50_000_000,
+                       partitions: int = None) -> Iterator[tuple]:
+    """
+    join of two iterables by the keys. Unmatched items are kept in memory while they fit to memory_limit_size bytes,
+    then they and the rest of both iterables are spilled to disk partitioned by hash of the keys
+    and each partition is joined separately. The count of partitions is sized from the unmatched items and
+    the length hints of the iterables unless it is given, a partition of the first iterable larger than
+    memory_limit_size is split again with its partition of the second one. Items with None keys are ignored.
+    """
+    hint = length_hint(data1) + length_hint(data2)
+    estimator = SizeEstimator()
+    objects1 = dict()
+    objects2 = dict()
+    size = 0
+    iterator1 = (item for item in data1 if item and key_function(item) is not None)
+    iterator2 = (item for item in data2 if item and key_function(item) is not None)
+    for item1, item2 in zip_longest(iterator1, iterator2):
+        for item, objects, others, is_left in ((item1, objects1, objects2, True), (item2, objects2, objects1, False)):
+            if item is None:
+                continue
+            key = key_function(item)
+            other = others.pop(key, None)
+            if other is not None:
+                size -= estimator.size(other)
+                yield (item, other) if is_left else (other, item)
+            else:
+                objects[key] = item
+                size += estimator.size(item)
+        if size >= memory_limit_size:
+            break
+    else:
+        if keep_left:
+            yield from ((item, None) for item in objects1.values())
+        if keep_right:
+            yield from ((None, item) for item in objects2.values())
+        return
+    if partitions is None:
+        count = len(objects1) + len(objects2)
+        partitions = _partitions_for(size + hint * size // max(count, 1), memory_limit_size)
+    files1, sizes = _partition(chain(objects1.values(), iterator1), partitions, key_function)
+    objects1 = None
+    files2, _ = _partition(chain(objects2.values(), iterator2), partitions, key_function)
+    objects2 = None
+    yield from _join_partitions(files1, files2, sizes, key_function, keep_left, keep_right, memory_limit_size)
+
+
+def _join_partitions(files1: list[IO],
+                     files2: list[IO],
+                     sizes: list[int],
+                     key_function: Callable[[Any], Any],
+                     keep_left: bool,
+                     keep_right: bool,
+                     memory_limit_size: int,
+                     depth: int = 0) -> Iterator[tuple]:
+    """
+    pairs of the partitions joined one by one, the items of the first partition are kept in memory,
+    partitions of them larger than memory_limit_size are split again
+    """
+    try:
+        for idx in range(len(files1)):
+            if sizes[idx] > memory_limit_size and depth + 1 < __PARTITION_DEPTH__:
+                partitions = _partitions_for(sizes[idx], memory_limit_size)
+                sub_files1, sub_sizes = _partition(unspill(files1[idx]), partitions, key_function, depth=depth + 1)
+                sub_files2, _ = _partition(unspill(files2[idx]), partitions, key_function, depth=depth + 1)
+                yield from _join_partitions(sub_files1, sub_files2, sub_sizes, key_function, keep_left, keep_right,
+                                            memory_limit_size, depth + 1)
+                continue
+            objects = {key_function(item): item for item in unspill(files1[idx])}
+            for item in unspill(files2[idx]):
+                other = objects.pop(key_function(item), None)
+                if other is not None:
+                    yield other, item
+                elif keep_right:
+                    yield None, item
+            if keep_left:
+                yield from ((item, None) for item in objects.values())
+    finally:
+        for file in files1 + files2:
+            file.close()
+
+
+def _partitions_for(size: int, memory_limit_size: int) -> int:
+    """
+    count of partitions of size bytes, so a partition of evenly spread keys takes half of memory_limit_size
+    """
+    return max(2, math.ceil(2 * size / memory_limit_size))
+
+
+def _partition(data: Iterable, partitions: int, key_function: Callable[[Any], Any] = echo, depth: int = 0,
+               block_size: int = 1024) -> (list[IO], list[int]):
+    """
+    items spilled to partitions by hash of the keys, the hash depends on the depth, so a partition is split again
+    by another hash. Returns the files and the estimated sizes of the partitions
+    """
+    estimator = SizeEstimator()
+    files = [tempfile.TemporaryFile() for _ in range(partitions)]
+    sizes = [0] * partitions
+    blocks = [list() for _ in range(partitions)]
+    for item in data:
+        idx = hash((depth, key_function(item))) % partitions
+        block = blocks[idx]
+        block.append(item)
+        sizes[idx] += estimator.size(item)
+        if len(block) >= block_size:
+            pickle.dump(block, files[idx], protocol=pickle.HIGHEST_PROTOCOL)
+            block.clear()
+    for idx in range(partitions):
+        if blocks[idx]:
+            pickle.dump(blocks[idx], files[idx], protocol=pickle.HIGHEST_PROTOCOL)
+        files[idx].seek(0)
+    return files, sizes
@@ -1,58 +1,21 @@
+import math
 import re
 from typing import Iterable
 from typing import Iterator
 
-s_macher = re.compile("(.*)(S[0-9.]+)(.*)")
+from parser.compression import open_gcode, BUFFER_SIZE
+
 x_macher = re.compile("(.*)(X[0-9.]+)(.*)")
 y_macher = re.compile("(.*)(Y[0-9.]+)(.*)")
-f_macher = re.compile("(.*)(F[0-9.]+)(.*)")
+word_macher = re.compile(r"([A-Z])\s*([-+]?(?:[0-9]+\.?[0-9]*|\.[0-9]+))")
+comment_macher = re.compile(r"\([^)]*\)|;.*")
 
+RAPID = 0
+LINEAR = 1
+CW_ARC = 2
+CCW_ARC = 3
 
-class Laser:
-    def __init__(self):
-        self._x = 0.0
-        self._y = 0.0
-        self._power = 0.0
-        self._speed = 0.0
-        self._is_moved = False
-
-    def is_on(self) -> bool:
-        return self._power > 0
-
-    def command(self, command: str):
-        self._is_moved = False
-        if s_macher.match(command):
-            self._power = float(s_macher.sub(r"\2", command)[1:].strip())
-        if x_macher.match(command):
-            x = round(float(x_macher.sub(r"\2", command)[1:].strip()), 1)
-            self._is_moved = self._is_moved or x != self._x
-            self._x = x
-        if y_macher.match(command):
-            y = round(float(y_macher.sub(r"\2", command)[1:].strip()), 1)
-            self._is_moved = self._is_moved or y != self._y
-            self._y = y
-        if f_macher.match(command):
-            self._speed = float(f_macher.sub(r"\2", command)[1:].strip())
-
-    @property
-    def x(self) -> float:
-        return self._x
-
-    @property
-    def y(self) -> float:
-        return self._y
-
-    @property
-    def power(self) -> float:
-        return self._power
-
-    @property
-    def speed(self) -> float:
-        return self._speed
-
-    @property
-    def is_moved(self) -> bool:
-        return self._is_moved
+MM_PER_INCH = 25.4
 
 
 class Point:
@@ -97,10 +60,15 @@ class Point:
 class Edge:
     _point_a: Point
     _point_b: Point
+    _power: float
+    _speed: float
+    COLUMNS = ('ax', 'ay', 'bx', 'by')
 
-    def __init__(self, point_a: Point, point_b: Point = None):
+    def __init__(self, point_a: Point, point_b: Point = None, power: float = None, speed: float = None):
         self._point_a = point_a
         self._point_b = point_a if point_b is None else point_b
+        self._power = power
+        self._speed = speed
 
     def length(self):
         return Point.length(self._point_b, self._point_a)
@@ -108,22 +76,33 @@ class Edge:
     def extend(self, point: Point) -> bool:
         if not self._is_on_line(point):
             return False
-        elif self._is_middle(point):
+        elif not self._is_ahead(point):
             return False
         else:
             self._point_b = point
             return True
 
+    def to_row(self) -> (float, float, float, float):
+        """
+        coordinates of the ends in the order of Edge.COLUMNS, it is used to make columnar batches of edges
+        """
+        point_a = self._point_a
+        point_b = self._point_b
+        return point_a._x, point_a._y, point_b._x, point_b._y
+
     def to_plot_points(self):
         return [[self._point_a.x, self._point_b.x],
                 [self._point_a.y, self._point_b.y]]
 
-    def _is_middle(self, point: Point) -> bool:
-        alpha = 1 if self._point_a.x < self._point_b.x else -1
-        beta = 1 if self._point_a.y < self._point_b.y else -1
-        check_x = (alpha * self._point_a.x <= alpha * point.x <= alpha * self._point_b.x)
-        check_y = (beta * self._point_a.y <= beta * point.y <= beta * self._point_b.y)
-        return check_x and check_y
+    def _is_ahead(self, point: Point) -> bool:
+        """
+        the point continues the edge beyond its end, a point turning back would hide a part of the edge
+        """
+        ax = (self._point_b.x - self._point_a.x)
+        ay = (self._point_b.y - self._point_a.y)
+        if ax == 0 and ay == 0:
+            return True
+        return ax * (point.x - self._point_b.x) + ay * (point.y - self._point_b.y) > 0
 
     def _is_on_line(self, point: Point) -> bool:
         ax = (self._point_a.x - self._point_b.x)
@@ -140,30 +119,268 @@ class Edge:
     def point_b(self) -> Point:
         return self._point_b
 
+    @property
+    def power(self) -> float:
+        return self._power
+
+    @property
+    def speed(self) -> float:
+        return self._speed
 
-class GCodeFileReader(Iterable):
+    @property
+    def parameters(self) -> (float, float):
+        """
+        power (S) and speed (F) the edge is cut with, None when they are unknown
+        """
+        return self._power, self._speed
+
+
+class GCodeMachine:
+    """
+    Table driven modal state machine of a laser controller.
+    Supported modal groups:
+        motion   G0, G1, G2, G3 (arcs by I/J offsets or by R)
+        distance G90, G91 (and G90.1, G91.1 for arc centers)
+        units    G20, G21
+        spindle  M3, M4, M5
+    All coordinates are kept absolute and in millimeters.
+    Arcs are linearized on demand by GCodeMachine.points() with a chord tolerance.
+    """
+    __G_CODES__ = {
+        0.0: ('_motion_', RAPID),
+        1.0: ('_motion_', LINEAR),
+        2.0: ('_motion_', CW_ARC),
+        3.0: ('_motion_', CCW_ARC),
+        20.0: ('_scale_', MM_PER_INCH),
+        21.0: ('_scale_', 1.0),
+        90.0: ('_is_absolute_', True),
+        91.0: ('_is_absolute_', False),
+        90.1: ('_is_arc_absolute_', True),
+        91.1: ('_is_arc_absolute_', False),
+    }
+    __M_CODES__ = {
+        3.0: ('_spindle_', 3),
+        4.0: ('_spindle_', 4),
+        5.0: ('_spindle_', 5),
+    }
+    __PARAMETERS__ = frozenset('XYIJRSF')
+
+    def __init__(self, precision: int = None):
+        self._precision_ = precision
+        self._motion_ = RAPID
+        self._scale_ = 1.0
+        self._is_absolute_ = True
+        self._is_arc_absolute_ = False
+        self._spindle_ = None
+        self._x_ = 0.0
+        self._y_ = 0.0
+        self._start_x_ = 0.0
+        self._start_y_ = 0.0
+        self._center_ = None
+        self._power_ = 0.0
+        self._speed_ = 0.0
+        self._is_moved_ = False
+
+    def command(self, command: str) -> bool:
+        """
+        apply a line of G-code to the state, returns True if the head was moved
+        """
+        self._is_moved_ = False
+        self._start_x_ = self._x_
+        self._start_y_ = self._y_
+        params = dict()
+        for letter, value in word_macher.findall(comment_macher.sub('', command).upper()):
+            if letter == 'G':
+                action = self.__G_CODES__.get(float(value))
+                if action is not None:
+                    setattr(self, action[0], action[1])
+            elif letter == 'M':
+                action = self.__M_CODES__.get(float(value))
+                if action is not None:
+                    setattr(self, action[0], action[1])
+            elif letter in self.__PARAMETERS__:
+                params[letter] = float(value)
+        if not params:
+            return False
+        if 'S' in params:
+            self._power_ = params['S']
+        if 'F' in params:
+            self._speed_ = params['F'] * self._scale_
+        if 'X' in params or 'Y' in params:
+            self._move(params)
+        return self._is_moved_
+
+    def _move(self, params: dict):
+        scale = self._scale_
+        x, y = self._x_, self._y_
+        if self._is_absolute_:
+            x = params['X'] * scale if 'X' in params else x
+            y = params['Y'] * scale if 'Y' in params else y
+        else:
+            x += params.get('X', 0.0) * scale
+            y += params.get('Y', 0.0) * scale
+        self._center_ = None
+        if self._motion_ in (CW_ARC, CCW_ARC):
+            if 'R' in params:
+                self._center_ = self._radius_center(x, y, params['R'] * scale)
+            elif self._is_arc_absolute_:
+                self._center_ = (params.get('I', 0.0) * scale, params.get('J', 0.0) * scale)
+            else:
+                self._center_ = (self._x_ + params.get('I', 0.0) * scale, self._y_ + params.get('J', 0.0) * scale)
+        # a full circle starts and ends at the same point
+        self._is_moved_ = x != self._x_ or y != self._y_ or self._center_ is not None
+        self._x_ = x
+        self._y_ = y
+
+    def _radius_center(self, x: float, y: float, radius: float) -> (float, float):
+        dx = x - self._x_
+        dy = y - self._y_
+        distance = math.hypot(dx, dy)
+        if distance == 0:
+            return None
+        h = -math.sqrt(max(4.0 * radius * radius - dx * dx - dy * dy, 0.0)) / distance
+        if self._motion_ == CCW_ARC:
+            h = -h
+        if radius < 0:
+            h = -h
+        return self._x_ + 0.5 * (dx - dy * h), self._y_ + 0.5 * (dy + dx * h)
+
+    def points(self, tolerance: float = None) -> Iterator[Point]:
+        """
+        points passed by the head during the last command. An arc is linearized to chords
+        that deviate from the arc no more than tolerance, without tolerance only the end point is returned.
+        """
+        if not self._is_moved_:
+            return
+        if self._center_ is not None and tolerance is not None:
+            cx, cy = self._center_
+            radius = math.hypot(self._start_x_ - cx, self._start_y_ - cy)
+            start_angle = math.atan2(self._start_y_ - cy, self._start_x_ - cx)
+            end_angle = math.atan2(self._y_ - cy, self._x_ - cx)
+            if self._motion_ == CW_ARC:
+                sweep = (start_angle - end_angle) % (2 * math.pi)
+            else:
+                sweep = (end_angle - start_angle) % (2 * math.pi)
+            sweep = sweep if sweep > 0 else 2 * math.pi
+            direction = -1 if self._motion_ == CW_ARC else 1
+            if radius > tolerance:
+                steps = math.ceil(sweep / (2 * math.acos(1 - tolerance / radius)))
+            else:
+                steps = 1
+            for step in range(1, steps):
+                angle = start_angle + direction * sweep * step / steps
+                yield self._point(cx + radius * math.cos(angle), cy + radius * math.sin(angle))
+        yield self._point(self._x_, self._y_)
+
+    def _point(self, x: float, y: float) -> Point:
+        if self._precision_ is None:
+            return Point(x, y)
+        return Point(round(x, self._precision_), round(y, self._precision_))
 
-    def __init__(self, filename: str):
+    def is_on(self) -> bool:
+        return self._power_ > 0 and self._spindle_ != 5 and self._motion_ != RAPID
+
+    @property
+    def start(self) -> Point:
+        return self._point(self._start_x_, self._start_y_)
+
+    @property
+    def position(self) -> Point:
+        return self._point(self._x_, self._y_)
+
+    @property
+    def x(self) -> float:
+        return self._x_
+
+    @property
+    def y(self) -> float:
+        return self._y_
+
+    @property
+    def motion(self) -> int:
+        return self._motion_
+
+    @property
+    def power(self) -> float:
+        return self._power_
+
+    @property
+    def speed(self) -> float:
+        return self._speed_
+
+    @property
+    def is_moved(self) -> bool:
+        return self._is_moved_
+
+
+class GCodeFileReader(Iterable):
+    """
+    edges cut by a G-code file, gzip, bz2 and xz files are decompressed while they are read,
+    in a thread with background
+    """
+
+    def __init__(self,
+                 filename: str,
+                 precision: int = 1,
+                 arc_tolerance: float = 0.01,
+                 buffer_size: int = BUFFER_SIZE,
+                 background: bool = False):
         self._filename_ = filename
-        self._laser = Laser()
+        self._precision_ = precision
+        self._arc_tolerance_ = arc_tolerance
+        self._buffer_size_ = buffer_size
+        self._background_ = background
 
     def __iter__(self) -> Iterator[Edge]:
-        with open(self._filename_, 'r') as gcode:
-            command = gcode.readline().strip()
+        machine = GCodeMachine(precision=self._precision_)
+        with open_gcode(self._filename_, 'r', buffer_size=self._buffer_size_, background=self._background_) as gcode:
             line = None
-            while command:
-                self._laser.command(command)
-                if self._laser.is_on():
-                    x = self._laser.x
-                    y = self._laser.y
-                    point = Point(x, y)
+            for command in gcode:
+                machine.command(command)
+                if machine.is_on():
+                    power, speed = machine.power, machine.speed
+                    if line is not None and (line.power != power or line.speed != speed):
+                        # an edge is cut with one power and speed
+                        yield line
+                        line = None
                     if line is None:
-                        line = Edge(point)
-                    elif not line.extend(point):
-                        break_line = line
-                        line = Edge(line.point_b, point)
-                        yield break_line
+                        line = Edge(machine.start, power=power, speed=speed)
+                    for point in machine.points(self._arc_tolerance_):
+                        if point.x == line.point_b.x and point.y == line.point_b.y:
+                            continue
+                        elif not line.extend(point):
+                            break_line = line
+                            line = Edge(line.point_b, point, power=power, speed=speed)
+                            yield break_line
                 elif line is not None:
                     yield line
                     line = None
-                command = gcode.readline()
+            if line is not None:
+                yield line
+
+
+def format_number(value: float, digits: int = 4) -> str:
+    text = f'{value:.{digits}f}'.rstrip('0').rstrip('.')
+    return '0' if text in ('', '-0') else text
+
+
+class GCodeFileWriter:
+    """
+    G-code file, it is compressed by the suffix of its name: .gz, .bz2 or .xz
+    """
+
+    def __init__(self, filename: str, buffer_size: int = BUFFER_SIZE):
+        self._filename_ = filename
+        self._buffer_size_ = buffer_size
+
+    def write(self, commands: Iterable[str]) -> int:
+        """
+        write the commands line by line and return the count of written lines
+        """
+        lines = 0
+        with open_gcode(self._filename_, 'w', buffer_size=self._buffer_size_) as gcode:
+            for command in commands:
+                gcode.write(command)
+                gcode.write('\n')
+                lines += 1
+        return lines
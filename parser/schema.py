@@ -2,15 +2,50 @@ from __future__ import annotations
 
 import json
 import logging
+import os
 import re
+from functools import partial
+from itertools import chain, islice
 from json import JSONEncoder
-from typing import Any
+from typing import Any, Iterable, Callable
 
 from parser.stream import Stream
 
 logger = logging.getLogger(__name__)
 
 
+__ITEM__ = object()
+__LIST__ = object()
+__DICT__ = object()
+__NESTED_TYPES__ = (None, 'list', 'dict')
+
+__TYPE_NAMES__ = dict()
+
+
+def type_name(obj: Any) -> str:
+    """
+    name of the class of the object, it is computed once per class
+    """
+    cls = type(obj)
+    name = __TYPE_NAMES__.get(cls)
+    if name is None:
+        name = re.sub(r"<class '(.+)'>", r'\1', str(cls))
+        __TYPE_NAMES__[cls] = name
+    return name
+
+
+def sample(items: list, sample_size: int = None) -> list:
+    """
+    evenly spaced items of the list including the first and the last ones
+    """
+    if sample_size is None or len(items) <= sample_size:
+        return items
+    if sample_size < 2:
+        return items[:sample_size]
+    step = (len(items) - 1) / (sample_size - 1)
+    return [items[round(idx * step)] for idx in range(sample_size)]
+
+
 class ClassJSONEncoder(JSONEncoder):
     def default(self, obj):
         return obj.__dict__
@@ -48,40 +83,73 @@ class Metadata:
         self.nullable = nullable
 
     @staticmethod
-    def compute(obj: Any) -> Metadata:
-        obj_type = re.sub(r"<class '(.+)'>", r'\1', str(type(obj)))
-        if obj is None:
-            '''
-                <class 'NoneType'>
-            '''
-            return Metadata(obj_type=obj_type, schema=None, nullable=True)
-        else:
-            if isinstance(obj, list):
-                '''
-                    <class 'list'>
-                '''
-                if len(obj) == 0:
-                    return Metadata(obj_type=obj_type, schema=None)
+    def compute(obj: Any, sample_size: int = None) -> Metadata:
+        """
+        Iterative schema inference. Lists longer than sample_size are inferred from
+        sample_size evenly spaced items (the first and the last ones included).
+        """
+        results = list()
+        stack = [(__ITEM__, obj)]
+        while stack:
+            kind, value = stack.pop()
+            if kind is __ITEM__:
+                obj_type = type_name(value)
+                if value is None:
+                    '''
+                        <class 'NoneType'>
+                    '''
+                    results.append(Metadata(obj_type=obj_type, schema=None, nullable=True))
+                elif isinstance(value, list):
+                    '''
+                        <class 'list'>
+                    '''
+                    if len(value) == 0:
+                        results.append(Metadata(obj_type=obj_type, schema=None))
+                    else:
+                        # [type name, items iterator, merged schema of items, is first item]
+                        stack.append((__LIST__, [obj_type, iter(sample(value, sample_size)), None, True]))
+                elif isinstance(value, dict):
+                    '''
+                        <class 'dict'>
+                    '''
+                    # [type name, items iterator, schema, key of computing value]
+                    stack.append((__DICT__, [obj_type, iter(value.items()), dict(), None]))
                 else:
-                    schema = Stream(obj).map(lambda item: Metadata.compute(item)) \
-                        .reduce(Metadata.merge)
-                    return Metadata(obj_type=obj_type, schema=schema)
-            elif isinstance(obj, dict):
-                '''
-                    <class 'dict'>
-                '''
-                schema = dict()
-                for key, value in obj.items():
-                    schema[key] = Metadata.compute(value)
-                return Metadata(obj_type=obj_type, schema=schema)
+                    '''
+                        <class 'int'>
+                        <class 'float'>
+                        <class 'str'>
+                    '''
+                    schema = value if isinstance(value, str) and len(value) <= Metadata.__BLOB_MIN_SIZE__ else None
+                    results.append(Metadata(obj_type=obj_type, schema=schema))
+            elif kind is __LIST__:
+                if value[3]:
+                    value[3] = False
+                else:
+                    value[2] = Metadata.merge(value[2], results.pop())
+                item = next(value[1], __ITEM__)
+                schema = value[2]
+                if schema is not None and schema.obj_type not in __NESTED_TYPES__ \
+                        and (schema.obj_type != 'str' or schema.schema is None):
+                    # items of the same plain type can not change the schema of items
+                    while item is not __ITEM__ and type_name(item) == schema.obj_type:
+                        item = next(value[1], __ITEM__)
+                if item is __ITEM__:
+                    results.append(Metadata(obj_type=value[0], schema=value[2]))
+                else:
+                    stack.append((kind, value))
+                    stack.append((__ITEM__, item))
             else:
-                '''
-                    <class 'int'>
-                    <class 'float'>
-                    <class 'str'>
-                '''
-                schema = obj if isinstance(obj, str) and len(obj) <= Metadata.__BLOB_MIN_SIZE__ else None
-                return Metadata(obj_type=obj_type, schema=schema)
+                if value[3] is not None:
+                    value[2][value[3]] = results.pop()
+                item = next(value[1], None)
+                if item is None:
+                    results.append(Metadata(obj_type=value[0], schema=value[2]))
+                else:
+                    value[3] = item[0]
+                    stack.append((kind, value))
+                    stack.append((__ITEM__, item[1]))
+        return results.pop()
 
     def to_dict(self) -> dict:
         if isinstance(self.schema, Metadata):
@@ -201,8 +269,8 @@ class Metadata:
         if self.obj_type != obj.obj_type:
             result.append(f"!type: {obj.obj_type} -> {self.obj_type}")
         else:
-            stype_1 = re.sub(r"<class '(.+)'>", r'\1', str(type(self.schema)))
-            stype_2 = re.sub(r"<class '(.+)'>", r'\1', str(type(obj.schema)))
+            stype_1 = type_name(self.schema)
+            stype_2 = type_name(obj.schema)
             if stype_1 != stype_2:
                 result.append(f"!schema type:{stype_2}->{stype_1}")
             elif "list" == stype_1:
@@ -234,14 +302,186 @@ class Metadata:
 
         return result
 
+    def compile(self) -> Callable[[Any], list[str]]:
+        """
+        Validator of objects against the schema, it returns problems of an object in the diff notation
+        (an empty list for a valid object). The schema is compiled once into a tree of closures,
+        so an object is checked in a single pass without computing its Metadata.
+        """
+        check = Metadata._compile(self, '')
+
+        def validate(obj: Any) -> list[str]:
+            errors = list()
+            check(obj, errors)
+            return errors
+
+        return validate
+
+    @staticmethod
+    def _compile(metadata: Metadata, path: str) -> Callable[[Any, list], None]:
+        """
+        Closure checking an object against the metadata. Every closure keeps classes of checked objects
+        having the expected type name, so the type of an object is usually checked by a set lookup.
+        """
+        obj_type = metadata.obj_type
+        nullable = metadata.nullable
+        schema = metadata.schema
+        classes = set()
+
+        def is_mismatched(obj: Any, errors: list) -> bool:
+            if type_name(obj) == obj_type:
+                classes.add(type(obj))
+                return False
+            if obj is None:
+                if not nullable:
+                    errors.append(f"{path}!nullable: True -> {str(nullable)}")
+            else:
+                errors.append(f"{path}!type: {obj_type} -> {type_name(obj)}")
+            return True
+
+        if obj_type is None:
+            types = frozenset(schema)
+
+            def check(obj: Any, errors: list):
+                if type_name(obj) not in types and not (obj is None and nullable):
+                    errors.append(f"{path}!type: {str(sorted(types))} -> {type_name(obj)}")
+        elif isinstance(schema, dict):
+            checks = tuple((key, Metadata._compile(value, f"{path}.{key}")) for key, value in schema.items())
+            required = frozenset(key for key, value in schema.items() if not value.optional)
+
+            def check(obj: Any, errors: list):
+                if type(obj) not in classes and is_mismatched(obj, errors):
+                    return
+                found = 0
+                for key, key_check in checks:
+                    value = obj.get(key, __ITEM__)
+                    if value is __ITEM__:
+                        if key in required:
+                            errors.append(f"{path}.{key}!deprecated")
+                    else:
+                        found += 1
+                        key_check(value, errors)
+                if found < len(obj):
+                    for key in obj.keys() - schema.keys():
+                        errors.append(f"{path}.{key}!new")
+        elif isinstance(schema, Metadata) or "list" == obj_type:
+            item_check = Metadata._compile(schema, f"{path}.item") if schema is not None else None
+            is_empty_allowed = schema is None or schema.optional
+            # items of a plain type are checked inline by their classes
+            item_type = schema.obj_type if schema is not None and not schema.nullable and schema.schema is None \
+                and schema.obj_type not in __NESTED_TYPES__ else None
+            item_classes = set()
+
+            def check(obj: Any, errors: list):
+                if type(obj) not in classes and is_mismatched(obj, errors):
+                    return
+                if len(obj) == 0:
+                    if not is_empty_allowed:
+                        errors.append(f"{path}!schema type:{type_name(metadata)}->NoneType")
+                elif item_check is None:
+                    errors.append(f"{path}!schema type:NoneType->{type_name(metadata)}")
+                elif item_type is None:
+                    for item in obj:
+                        item_check(item, errors)
+                else:
+                    for item in obj:
+                        if type(item) not in item_classes:
+                            if type_name(item) == item_type:
+                                item_classes.add(type(item))
+                            else:
+                                item_check(item, errors)
+        elif "str" == obj_type and schema is not None:
+            values = frozenset([schema] if isinstance(schema, str) else schema)
+
+            def check(obj: Any, errors: list):
+                if type(obj) not in classes and is_mismatched(obj, errors):
+                    return
+                if obj not in values:
+                    errors.append(f"{path}!added:{str({obj})}")
+        else:
+            def check(obj: Any, errors: list):
+                if type(obj) not in classes:
+                    is_mismatched(obj, errors)
+        return check
+
 
 class MetadataAggregator:
-    def __init__(self):
+    """
+    Collect a common schema of objects. Partial schemas of several workers are combined by a tree reduce:
+        schema = MetadataAggregator.aggregate_parallel(objects, n=4)
+    Workers get batches of objects, so an object costs a pickling instead of a put to a queue with its metrics.
+    Pickling still costs about a quarter of the schema of an object, so the parallel mode cannot win on one core
+    and it is not worth the processes on a few objects: below min_size objects or on one core they are
+    aggregated in the calling process.
+    """
+
+    def __init__(self, sample_size: int = None):
         self.schema = None
+        self._sample_size_ = sample_size
 
     def merge(self, other):
-        metadata = Metadata.compute(other)
+        metadata = Metadata.compute(other, sample_size=self._sample_size_)
         self.schema = metadata if not self.schema else Metadata.merge(self.schema, metadata)
 
+    def combine(self, other: MetadataAggregator | Metadata) -> MetadataAggregator:
+        """
+        merge a partial schema of another aggregator
+        """
+        schema = other.get() if isinstance(other, MetadataAggregator) else other
+        self.schema = Metadata.merge(self.schema, schema)
+        return self
+
     def get(self) -> Metadata:
         return self.schema
+
+    @staticmethod
+    def aggregate(objects: Iterable, sample_size: int = None) -> Metadata:
+        aggregator = MetadataAggregator(sample_size=sample_size)
+        for obj in objects:
+            aggregator.merge(obj)
+        return aggregator.get()
+
+    @staticmethod
+    def aggregate_batches(batches: Iterable[Iterable], sample_size: int = None) -> Metadata:
+        return MetadataAggregator.aggregate(chain.from_iterable(batches), sample_size=sample_size)
+
+    @staticmethod
+    def worker(idx: int, sample_size: int = None) -> Callable[[Iterable], Metadata]:
+        """
+        combiner factory for ParallelStream.consume, every worker returns a partial schema of its batches of objects
+        """
+        return partial(MetadataAggregator.aggregate_batches, sample_size=sample_size)
+
+    @staticmethod
+    def aggregate_parallel(objects: Iterable,
+                           n: int = 4,
+                           sample_size: int = None,
+                           batch_size: int = 512,
+                           min_size: int = 50_000) -> Metadata:
+        """
+        schema of the objects aggregated by n workers, the first min_size objects are read ahead to decide
+        whether the parallel mode pays off
+        """
+        iterator = iter(objects)
+        head = list(islice(iterator, min_size))
+        n = min(n, os.cpu_count() or 1)
+        if len(head) < min_size or n < 2:
+            return MetadataAggregator.aggregate(chain(head, iterator), sample_size=sample_size)
+        partials = Stream(chain(head, iterator)) \
+            .to_buckets(batch_size) \
+            .parallelize(n=n) \
+            .consume(partial(MetadataAggregator.worker, sample_size=sample_size))
+        return MetadataAggregator.tree_reduce(partials)
+
+    @staticmethod
+    def tree_reduce(schemas: Iterable[Metadata]) -> Metadata:
+        """
+        merge partial schemas pairwise level by level
+        """
+        level = [schema for schema in schemas if schema is not None]
+        if not level:
+            return None
+        while len(level) > 1:
+            level = [Metadata.merge(level[idx], level[idx + 1]) if idx + 1 < len(level) else level[idx]
+                     for idx in range(0, len(level), 2)]
+        return level[0]
@@ -0,0 +1,106 @@
+import logging
+import os
+from multiprocessing import Value, resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+
+class SharedArray:
+    """
+    descriptor of a numpy array placed in a block of shared memory, it is sent to other processes instead of the array
+    """
+
+    def __init__(self, name: str, offset: int, shape: tuple, dtype: str):
+        self.name = name
+        self.offset = offset
+        self.shape = shape
+        self.dtype = dtype
+
+
+class SharedBlock:
+    """
+    Owner of an opened block, it is the base of the views of its array, so the block is closed with the last of them.
+    SharedMemory.close would unmap the block under the views, numpy holds no buffer export on it
+    """
+
+    def __init__(self, block: SharedMemory, descriptor: SharedArray):
+        self._block_ = block
+        view = np.ndarray(descriptor.shape, dtype=np.dtype(descriptor.dtype), buffer=block.buf,
+                          offset=descriptor.offset)
+        self.__array_interface__ = view.__array_interface__
+
+
+class SharedArrays:
+    """
+    Numpy arrays of a job placed into blocks of shared memory named by the prefix of the job and a number.
+    A process puts an array into a block of its own and sends its SharedArray, another process gets a view
+    of the array without a copy and unlinks the block at once. The memory of a block is freed with the last view
+    of it, so blocks in use are bounded by the arrays in the queues and in the hands of consumers.
+    Blocks are numbered by a counter shared by the processes of the job, so the owner of the job unlinks the blocks
+    never got by SharedArrays.unlink when the job is ended or failed.
+    The owner starts the resource tracker by SharedArrays.track before it starts the processes, so they share it
+    and the tracker unlinks blocks left by a killed job when the last process of the job exits.
+    """
+
+    def __init__(self, prefix: str, counter: Value):
+        self._prefix_ = prefix
+        self._counter_ = counter
+
+    @staticmethod
+    def is_shareable(item: Any) -> bool:
+        return np is not None and isinstance(item, np.ndarray) and not item.dtype.hasobject
+
+    def put(self, array) -> SharedArray:
+        array = np.ascontiguousarray(array)
+        block = self._create(max(array.nbytes, 1))
+        target = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+        target[...] = array
+        del target
+        # the block lives until it is unlinked by the process getting it
+        block.close()
+        return SharedArray(block.name, 0, array.shape, array.dtype.str)
+
+    def get(self, descriptor: SharedArray):
+        """
+        a view of the array in the shared block, the block is unlinked, so an array is got once
+        """
+        block = SharedMemory(name=descriptor.name)
+        block.unlink()
+        return np.asarray(SharedBlock(block, descriptor))
+
+    def _create(self, size: int) -> SharedMemory:
+        with self._counter_.get_lock():
+            number = self._counter_.value
+            self._counter_.value += 1
+        block = SharedMemory(name=f'{self._prefix_}{number}', create=True, size=size)
+        logger.debug(f"Shared block {block.name} of {size} bytes is created")
+        return block
+
+    @staticmethod
+    def track():
+        if os.name == 'posix':
+            resource_tracker.ensure_running()
+
+    @staticmethod
+    def unlink(prefix: str, counter: Value) -> int:
+        """
+        unlink the blocks of the job left by processes, it can be called several times.
+        Returns the count of unlinked blocks
+        """
+        unlinked = 0
+        for number in range(counter.value):
+            try:
+                block = SharedMemory(name=f'{prefix}{number}')
+            except FileNotFoundError:
+                continue
+            block.close()
+            block.unlink()
+            unlinked += 1
+        return unlinked
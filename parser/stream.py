@@ -1,16 +1,22 @@
 from __future__ import annotations
 
 import logging
+import os
+import threading
+import time
 from enum import Enum
 from functools import reduce
 from itertools import chain, dropwhile, count, takewhile, zip_longest
-from multiprocessing import current_process, Queue, Process
-from queue import Empty
+from multiprocessing import current_process, Queue, Process, Array, Value, Lock
+from queue import Empty, Full
 from typing import Iterable, Any, Iterator, Callable
 
 from more_itertools import pairwise
 
-from parser.functions import group_by_limit, group_by_memory_limit, echo, append_to_list
+from parser.functions import group_by_limit, group_by_memory_limit, echo, append_to_list, external_sort, \
+    external_distinct, SizeEstimator, merge_join, spilling_hash_join, map_batches, filter_batches, fan_out, \
+    SpillingCache
+from parser.shared import SharedArray, SharedArrays
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +31,12 @@ class JoinType(Enum):
     INNER = 3
 
 
+class JoinStrategy(Enum):
+    HASH = 0
+    SORT_MERGE = 1
+    SPILLING_HASH = 2
+
+
 class Optional:
     __NO_VALUE__ = object()
 
@@ -32,10 +44,10 @@ class Optional:
         self._value_ = value
 
     def is_empty(self):
-        return self._value_ == Optional.__NO_VALUE__
+        return self._value_ is Optional.__NO_VALUE__
 
     def get(self, default_value=None):
-        return self._value_ if self._value_ != Optional.__NO_VALUE__ else default_value
+        return self._value_ if self._value_ is not Optional.__NO_VALUE__ else default_value
 
     @staticmethod
     def empty() -> Optional:
@@ -49,6 +61,20 @@ class Stream(Iterable):
     def __iter__(self) -> Iterator:
         return iter(self._iter_)
 
+    def __enter__(self) -> Stream:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """
+        releases the resources of the underlying iterable, e.g. the spill file of a cache
+        """
+        close = getattr(self._iter_, 'close', None)
+        if close is not None:
+            close()
+
     def filter(self, predicate: Callable[[Any], bool]) -> Stream:
         """
         Returns a parser consisting of the elements of this parser that match the given predicate.
@@ -63,6 +89,31 @@ class Stream(Iterable):
         """
         return Stream(map(function, self))
 
+    def map_batches(self, function: Callable[[Any], Any], columns: Iterable[str] | dict[str, str] = None,
+                    batch_size: int = 4096, to_row: Callable[[Any], tuple] = None,
+                    to_item: Callable[..., Any] = None) -> Stream:
+        """
+        Return a parser of results of applying the vectorized function to batches of batch_size elements.
+        A batch is a dict of columns (numpy arrays when numpy is installed) read from the elements by columns:
+        names of attributes (keys of dict elements) or a dict of names of columns to attribute paths like
+        'point_a.x', to_row reads all columns of an element at once (e.g. Edge.COLUMNS and Edge.to_row).
+        A batch is the list of elements when columns is None.
+        The function returns a column of results or a dict of columns, the results are emitted element
+        by element, rows of a dict of columns are converted by to_item(**row) or emitted as dicts.
+        NOT TERMINATED
+        """
+        return Stream(map_batches(self, function, columns=columns, batch_size=batch_size,
+                                  to_row=to_row, to_item=to_item))
+
+    def filter_batches(self, predicate: Callable[[Any], Any], columns: Iterable[str] | dict[str, str] = None,
+                       batch_size: int = 4096, to_row: Callable[[Any], tuple] = None) -> Stream:
+        """
+        Returns a parser consisting of the elements of this parser selected by the vectorized predicate.
+        The predicate gets batches as in map_batches and returns a mask of the elements of a batch to keep.
+        NOT TERMINATED
+        """
+        return Stream(filter_batches(self, predicate, columns=columns, batch_size=batch_size, to_row=to_row))
+
     def flat_map(self) -> Stream:
         """
         Gets chained inputs from a single iterable argument that is evaluated lazily
@@ -76,7 +127,7 @@ class Stream(Iterable):
         !!! WARNING operation store all data to memory !!!
         TERMINATED
         """
-        logger.warning("Stream distinct was used")
+        logger.warning("Stream distinct was used, external_distinct keeps memory bounded")
         return Stream(self.to_set())
 
     def sorted(self, key_function: Callable[[Any], Any]) -> list:
@@ -87,6 +138,35 @@ class Stream(Iterable):
         """
         return sorted(self, key=key_function)
 
+    def external_distinct(self, mem_limit: int = 50_000_000, partitions: int = None) -> Stream:
+        """
+        Returns a parser consisting of the distinct elements according to '==' of this parser.
+        Elements are emitted lazily, seen elements are kept in memory up to mem_limit bytes and then
+        spilled to disk by hash partitions. Elements have to be hashable and picklable.
+        The count of partitions is sized from mem_limit unless it is given, too large partitions are split again.
+        NOT TERMINATED
+        """
+        return Stream(external_distinct(self, memory_limit_size=mem_limit, partitions=partitions))
+
+    def external_sorted(self, key_function: Callable[[Any], Any], mem_limit: int = 50_000_000,
+                        reverse: bool = False) -> Stream:
+        """
+        Returns a parser consisting of the elements of this parser, sorted according to the provided key_function.
+        Sorted runs of mem_limit bytes are spilled to disk and merged lazily. Elements have to be picklable.
+        NOT TERMINATED
+        """
+        return Stream(external_sort(self, key_function, memory_limit_size=mem_limit, reverse=reverse))
+
+    def cache(self, mem_limit: int = 50_000_000) -> Stream:
+        """
+        Returns a parser which can be consumed several times, the elements of this parser are read once.
+        They are kept in memory up to mem_limit bytes and then spilled to disk, so they have to be picklable.
+        The spill file is removed by close or at the end of a with block, also when the elements are not read
+        to the end.
+        NOT TERMINATED
+        """
+        return Stream(SpillingCache(self, memory_limit_size=mem_limit))
+
     def to_buckets(self, size_limit: int) -> Stream[tuple]:
         """
         split the parser to a buckets parser by a buckets size
@@ -95,12 +175,17 @@ class Stream(Iterable):
         groupped = group_by_limit(self, limit_size=size_limit)
         return Stream(iter(groupped))
 
-    def to_pockets(self, mem_limit: int) -> Stream[list]:
+    def to_pockets(self, mem_limit: int, calibrate: bool = False) -> Stream[list]:
         """
-        split the parser to a pockets parser by a memory size in bytes
+        split the parser to a pockets parser by a memory size in bytes.
+        Sizes are sampled per type and extrapolated. Sizes found by sys.getsizeof miss the overhead of the allocator,
+        so pockets are about a third smaller than mem_limit. calibrate=True corrects them by the memory traced
+        by tracemalloc for the first elements, tracing slows down the whole process for a while and tracemalloc
+        is stopped after it unless it was started by the caller.
         NOT TERMINATED
         """
-        groupped = group_by_memory_limit(self, memory_limit_size=mem_limit)
+        groupped = group_by_memory_limit(self, memory_limit_size=mem_limit,
+                                         estimator=SizeEstimator(calibrate=calibrate))
         return Stream(iter(groupped))
 
     def peek(self, function: Callable[[Any], Any]) -> Stream:
@@ -160,12 +245,15 @@ class Stream(Iterable):
         else:
             return reduce(function, self, initial)
 
-    def parallelize(self, n: int = 4, max_queue_size: int = 5000) -> ParallelStream:
+    def parallelize(self, n: int = 4, max_queue_size: int = 5000, min_n: int = None, max_n: int = None,
+                    scale_interval: float = 1.0, shared_memory: bool = False) -> ParallelStream:
         """
-        To parallelize some work
+        To parallelize some work. The count of workers is scaled between min_n and max_n when they are given,
+        numpy arrays are passed to workers through shared memory with shared_memory
         NOT TERMINATED
         """
-        return ParallelStream(self, n=n, max_queue_size=max_queue_size)
+        return ParallelStream(self, n=n, max_queue_size=max_queue_size, min_n=min_n, max_n=max_n,
+                              scale_interval=scale_interval, shared_memory=shared_memory)
 
     def to_list(self) -> list:
         """
@@ -304,6 +392,14 @@ class Stream(Iterable):
         """
         return consumer(self)
 
+    def fan_out(self, *consumers: Callable[[Iterable], Any], buffer_size: int = 1024) -> list:
+        """
+        consume all items by several consumers in one pass, returns their results.
+        The first consumer runs in the calling thread, the others in threads fed with up to buffer_size items
+        TERMINATED
+        """
+        return fan_out(self, list(consumers), buffer_size=buffer_size)
+
     @classmethod
     def stream_of(cls, *suppliers: Iterable) -> Stream:
         """
@@ -315,21 +411,31 @@ class Stream(Iterable):
     def zip_stream(stream1: Iterable,
                    stream2: Iterable,
                    key_func: Callable[[Any], str],
-                   join_type: JoinType = JoinType.FULL) -> Stream:
+                   join_type: JoinType = JoinType.FULL,
+                   strategy: JoinStrategy = JoinStrategy.HASH,
+                   mem_limit: int = 50_000_000) -> Stream:
         """
         zip items of several streams to one parser of pair items. Items bind by key_func!
         if one of parser not contain item then in pair their item will be None.
+        Strategies:
+            HASH          unmatched items of both streams are kept in memory
+            SORT_MERGE    both streams have to be ordered by key_func, O(1) extra memory
+            SPILLING_HASH unmatched items are spilled to disk after mem_limit bytes
         !!! None keys ignored !!!
         """
+        keep_left = join_type in (JoinType.FULL, JoinType.LEFT)
+        keep_right = join_type in (JoinType.FULL, JoinType.RIGHT)
+        if strategy == JoinStrategy.SORT_MERGE:
+            return Stream(merge_join(stream1, stream2, key_func, keep_left, keep_right))
+        elif strategy == JoinStrategy.SPILLING_HASH:
+            return Stream(spilling_hash_join(stream1, stream2, key_func, keep_left, keep_right,
+                                             memory_limit_size=mem_limit))
         stream1_objects = dict()
         stream2_objects = dict()
 
         def find_pairs(obj1, obj2, func_key: Callable[[Any], str]) -> list[tuple]:
             key_obj1 = func_key(obj1) if obj1 else None
             key_obj2 = func_key(obj2) if obj2 else None
-            if key_obj1 == "7c3cab01-9c25-4843-b38a-ff5f9ea90643" or key_obj2 == "7c3cab01-9c25-4843-b38a-ff5f9ea90643":
-                print(str(key_obj1) + " : "+ str(key_obj2))
-
             if not key_obj2 and not key_obj1:
                 return []
             elif key_obj1 != key_obj2:
@@ -376,22 +482,30 @@ class Stream(Iterable):
 
 class QueueReader(Iterable):
 
-    def __init__(self, n: int, queue: Queue):
+    def __init__(self, n: int, queue: Queue, metrics: ParallelStreamMetrics = None, slot: int = None):
         self._queue_ = queue
         self._n_ = n
+        self._metrics_ = metrics
+        self._slot_ = slot
 
     def __iter__(self) -> Any:
         process = current_process()
         logger.info(
             f"Consumer is started in {str(process.pid)}.{process.name}. Demon {str(process.daemon)}")
         task_count = 0
-        total_wait_time = 0
+        total_wait_time = 0.0
         while True:
             # If the queue is empty, queue.get() will block until the queue has data
+            started = time.perf_counter()
             try:
                 task = self._queue_.get(block=True, timeout=10)
             except Empty:
-                total_wait_time += 10
+                task = Empty
+            wait_time = time.perf_counter() - started
+            total_wait_time += wait_time
+            if self._metrics_ is not None:
+                self._metrics_.on_wait(self._slot_, wait_time)
+            if task is Empty:
                 continue
             task_count += 1
             if task is None:
@@ -399,61 +513,295 @@ class QueueReader(Iterable):
                 if self._n_ <= 0:
                     break
             else:
+                if self._metrics_ is not None:
+                    self._metrics_.on_item(self._slot_)
                 yield task
         logger.info(
-            f"Consumer is end {str(process.pid)}.{process.name}. Total consumed: {str(task_count)}. Total wait time: {str(total_wait_time)}s")
+            f"Consumer is end {str(process.pid)}.{process.name}. Total consumed: {str(task_count)}. "
+            f"Total wait time: {total_wait_time:.3f}s")
+
+
+class ParallelStreamMetrics:
+    """
+    Live counters of a ParallelStream shared by its processes, every process writes only its own counters:
+        queue_depth          tasks waiting in the queue
+        items                items consumed by every worker
+        idle_times           seconds every worker waited for tasks
+        supplier_stall_time  seconds the supplier waited for a place in the full queue
+    """
+
+    def __init__(self, max_workers: int, tasks: Queue):
+        self._tasks_ = tasks
+        self._items_ = Array('q', max_workers, lock=False)
+        self._idle_times_ = Array('d', max_workers, lock=False)
+        self._supplied_ = Value('q', 0, lock=False)
+        self._stall_time_ = Value('d', 0.0, lock=False)
+        self._workers_ = Value('i', 0, lock=False)
+        self._started_workers_ = Value('i', 0, lock=False)
+        self._is_supplied_ = Value('b', False, lock=False)
+
+    def on_item(self, slot: int):
+        self._items_[slot] += 1
+
+    def on_wait(self, slot: int, wait_time: float):
+        self._idle_times_[slot] += wait_time
+
+    def on_supply(self, stall_time: float):
+        self._supplied_.value += 1
+        self._stall_time_.value += stall_time
+
+    @property
+    def queue_depth(self) -> int:
+        try:
+            return self._tasks_.qsize()
+        except NotImplementedError:
+            # qsize is not implemented on macOS
+            return self._supplied_.value - self.consumed
+
+    @property
+    def items(self) -> list[int]:
+        return self._items_[:self._started_workers_.value]
+
+    @property
+    def idle_times(self) -> list[float]:
+        return self._idle_times_[:self._started_workers_.value]
+
+    @property
+    def consumed(self) -> int:
+        return sum(self.items)
+
+    @property
+    def supplied(self) -> int:
+        return self._supplied_.value
+
+    @property
+    def supplier_stall_time(self) -> float:
+        return self._stall_time_.value
+
+    @property
+    def workers(self) -> int:
+        return self._workers_.value
+
+    @property
+    def is_supplied(self) -> bool:
+        return bool(self._is_supplied_.value)
+
+    def __str__(self) -> str:
+        return (f'workers: {self.workers}, queue depth: {self.queue_depth}, supplied: {self.supplied}, '
+                f'supplier stall: {self.supplier_stall_time:.3f}s, items per worker: {self.items}, '
+                f'idle per worker: {[round(idle_time, 3) for idle_time in self.idle_times]}')
+
+
+class Failure:
+    """
+    an exception raised in a process of a parallel stream, it is sent with the results and raised by the reader
+    """
+
+    def __init__(self, error: Exception, process: str):
+        self.error = error
+        self.process = process
 
 
 class ParallelStream:
     __END_OF_STREAM__ = None
+    __JOBS__ = count()
 
-    def __init__(self, iterable: Iterable, n: int, max_queue_size: int = 5000):
+    def __init__(self, iterable: Iterable, n: int, max_queue_size: int = 5000, min_n: int = None, max_n: int = None,
+                 scale_interval: float = 1.0, shared_memory: bool = False):
         self.__inner_iterable__ = iterable
         self.__n__ = n
         self.__max_queue_size__ = max_queue_size
+        self.__min_n__ = max(min(n, min_n if min_n is not None else n), 1)
+        self.__max_n__ = max(n, max_n if max_n is not None else n)
+        self.__scale_interval__ = scale_interval
+        self.__shared_memory__ = shared_memory
+        self.metrics = None
+
+    @property
+    def is_autoscaled(self) -> bool:
+        return self.__min_n__ < self.__n__ or self.__max_n__ > self.__n__
 
     def consume(self, factory_combiner: Callable[[int], Callable[[Iterable], Any]]) -> Stream:
         """
+        every worker consumes its part of items by a combiner made by factory_combiner(idx of the worker),
+        the result is a parser of results of the combiners. ParallelStream.metrics shows the progress.
+        With shared_memory numpy arrays are placed into shared memory and workers get views of them instead of copies,
+        arrays returned by combiners are sent back the same way. A block is unlinked when its array is got and freed
+        with the last view of it, blocks never got are unlinked when the results are read or the reading is stopped.
         TERMINATED
         """
 
         def consumer(idx: int,
                      tasks: Queue,
                      results: Queue,
-                     factory: Callable[[int], Callable[[Iterable], Any]]):
+                     factory: Callable[[int], Callable[[Iterable], Any]],
+                     metrics: ParallelStreamMetrics,
+                     blocks: (str, Value)):
             process = current_process()
             print(f"Consumer is started in {str(process.pid)}.{process.name}. Demon {str(process.daemon)}", flush=True)
-            combiner = factory(idx)
-            res = Stream(QueueReader(1, tasks)) \
-                .map(lambda item: item.get()) \
-                .consume(combiner)
+            try:
+                combiner = factory(idx)
+                arrays = SharedArrays(*blocks) if blocks is not None else None
+                res = Stream(QueueReader(1, tasks, metrics=metrics, slot=idx)) \
+                    .map(lambda item: item.get()) \
+                    .map(lambda value: arrays.get(value) if isinstance(value, SharedArray) else value) \
+                    .consume(combiner)
+                if arrays is not None and SharedArrays.is_shareable(res):
+                    res = arrays.put(res)
+            except Exception as error:
+                # the process still fails, so the reader finds it by the exit code if the error is not picklable
+                results.put(Failure(error, process.name))
+                raise
             results.put(res)
             results.put(ParallelStream.__END_OF_STREAM__)
             print(f"Consumer is ended in {str(process.pid)}.{process.name}. Demon {str(process.daemon)}", flush=True)
             return
 
-        def supply(iterable: Iterable, tasks: Queue, parallelism):
+        def supply(iterable: Iterable, tasks: Queue, results: Queue, metrics: ParallelStreamMetrics, lock: Lock,
+                   blocks: (str, Value)):
             process = current_process()
             print(f"Supplier is started in {str(process.pid)}.{process.name}. Demon {str(process.daemon)}", flush=True)
-            Stream(iterable).map(lambda item: Optional(item)) \
-                .for_each(lambda item: tasks.put(item, block=True))
+            arrays = SharedArrays(*blocks) if blocks is not None else None
+            try:
+                for item in Stream(iterable) \
+                        .map(lambda value: arrays.put(value) if arrays is not None and SharedArrays.is_shareable(value)
+                             else value) \
+                        .map(lambda value: Optional(value)):
+                    try:
+                        tasks.put_nowait(item)
+                        metrics.on_supply(0.0)
+                    except Full:
+                        started = time.perf_counter()
+                        tasks.put(item, block=True)
+                        metrics.on_supply(time.perf_counter() - started)
+            except Exception as error:
+                results.put(Failure(error, process.name))
+                raise
+            with lock:
+                # workers are not added after the end of the supply, so every live worker gets its end
+                metrics._is_supplied_.value = True
+                parallelism = metrics.workers
             Stream(range(parallelism)).for_each(lambda item: tasks.put(ParallelStream.__END_OF_STREAM__, block=True))
             print(f"Supplier is ended in {str(process.pid)}.{process.name}. Demon {str(process.daemon)}", flush=True)
             return
 
-        tasks_queue = Queue(self.__max_queue_size__)
-        results_queue = Queue()
-        for i in range(self.__n__):
+        def start_consumer():
+            idx = metrics._started_workers_.value
             p = Process(
                 target=consumer,
-                args=(i, tasks_queue, results_queue, factory_combiner)
+                args=(idx, tasks_queue, results_queue, factory_combiner, metrics, blocks)
             )
             # This is critical! The consumer function has an infinite loop
             # Which means it will never exit unless we set daemon to true
             p.daemon = True
             p.start()
+            processes.append(p)
+            metrics._started_workers_.value += 1
+            metrics._workers_.value += 1
+
+        tasks_queue = Queue(self.__max_queue_size__)
+        results_queue = Queue()
+        lock = Lock()
+        metrics = ParallelStreamMetrics(self.__max_n__ if self.is_autoscaled else self.__n__, tasks_queue)
+        self.metrics = metrics
+        processes = list()
+        blocks = None
+        if self.__shared_memory__:
+            blocks = (f'ps{os.getpid()}x{next(ParallelStream.__JOBS__)}_', Value('i', 0))
+            # blocks of results never read are unlinked by the resource tracker when the processes exit
+            SharedArrays.track()
+        for _ in range(self.__n__):
+            start_consumer()
         p = Process(target=supply,
-                    args=(self.__inner_iterable__, tasks_queue, self.__n__))
+                    args=(self.__inner_iterable__, tasks_queue, results_queue, metrics, lock, blocks))
         p.daemon = True
         p.start()
-        return Stream(QueueReader(self.__n__, results_queue))
+        processes.append(p)
+        if self.is_autoscaled:
+            threading.Thread(target=self._scale, args=(metrics, lock, start_consumer, tasks_queue),
+                             daemon=True).start()
+        return Stream(self._results(results_queue, metrics, processes, blocks))
+
+    def _scale(self, metrics: ParallelStreamMetrics, lock: Lock, start_consumer: Callable[[], None], tasks: Queue):
+        """
+        A worker is added while tasks pile up in the queue or the supplier stalls on the full queue, workers waiting
+        for a full queue wait for the lock of the queue or for a CPU, so their idle time is not taken into account.
+        A worker is stopped while the workers wait for tasks and the queue is nearly empty.
+        The count of workers is changed once per scale_interval seconds.
+        """
+        idle_time = sum(metrics.idle_times)
+        stall_time = metrics.supplier_stall_time
+        while not metrics.is_supplied:
+            time.sleep(self.__scale_interval__)
+            workers = metrics.workers
+            idle_share = (sum(metrics.idle_times) - idle_time) / (self.__scale_interval__ * max(workers, 1))
+            stall_share = (metrics.supplier_stall_time - stall_time) / self.__scale_interval__
+            depth_share = metrics.queue_depth / self.__max_queue_size__
+            idle_time = sum(metrics.idle_times)
+            stall_time = metrics.supplier_stall_time
+            logger.debug(f"ParallelStream load: idle {idle_share:.2f}, stall {stall_share:.2f}, "
+                         f"depth {depth_share:.2f}")
+            with lock:
+                if metrics.is_supplied:
+                    break
+                if (depth_share > 0.5 or stall_share > 0.2) and workers < self.__max_n__:
+                    start_consumer()
+                    logger.info(f"ParallelStream is scaled up: {str(metrics)}")
+                elif idle_share > 0.5 and depth_share < 0.1 and workers > self.__min_n__:
+                    metrics._workers_.value -= 1
+                    tasks.put(ParallelStream.__END_OF_STREAM__, block=True)
+                    logger.info(f"ParallelStream is scaled down: {str(metrics)}")
+
+    @staticmethod
+    def _results(results: Queue, metrics: ParallelStreamMetrics, processes: list[Process],
+                 blocks: (str, Value)) -> Iterator:
+        """
+        results of all workers, started ones are final when the supply is ended.
+        An exception of the supplier or of a worker is raised here, a process that has died without sending
+        its exception is found by its exit code while the results are awaited, the other processes are terminated.
+        Shared arrays are copied out of the blocks, the blocks are unlinked at the end
+        """
+        arrays = SharedArrays(*blocks) if blocks is not None else None
+        try:
+            ended = 0
+            while not metrics.is_supplied or ended < metrics._started_workers_.value:
+                try:
+                    result = results.get(block=True, timeout=1)
+                except Empty:
+                    failed = [process for process in processes if process.exitcode]
+                    if not failed:
+                        continue
+                    result = ParallelStream._failure(results, failed[0])
+                if isinstance(result, Failure):
+                    ParallelStream._terminate(processes)
+                    logger.error(f"ParallelStream process {result.process} is failed: {str(metrics)}")
+                    raise result.error
+                if result is ParallelStream.__END_OF_STREAM__:
+                    ended += 1
+                elif isinstance(result, SharedArray):
+                    yield arrays.get(result).copy()
+                else:
+                    yield result
+            logger.info(f"ParallelStream is ended: {str(metrics)}")
+        finally:
+            if blocks is not None:
+                SharedArrays.unlink(*blocks)
+
+    @staticmethod
+    def _failure(results: Queue, process: Process) -> Failure:
+        """
+        the exception of the failed process, it is sent before the process exits, so it is already in the queue
+        """
+        while not results.empty():
+            result = results.get()
+            if isinstance(result, Failure):
+                return result
+        return Failure(ChildProcessError(f"{process.name} is exited with code {process.exitcode}"), process.name)
+
+    @staticmethod
+    def _terminate(processes: list[Process]):
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join()
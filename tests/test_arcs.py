@@ -0,0 +1,41 @@
+import math
+
+import pytest
+
+from optimizer.arcs import ArcFitter
+from parser.io import GCodeMachine, Point, format_number
+
+
+def distance(point: (float, float), polyline: list[(float, float)]) -> float:
+    """
+    the distance from the point to the nearest segment of the polyline
+    """
+    nearest = math.inf
+    for (ax, ay), (bx, by) in zip(polyline, polyline[1:]):
+        dx, dy = bx - ax, by - ay
+        ratio = ((point[0] - ax) * dx + (point[1] - ay) * dy) / (dx * dx + dy * dy) if dx or dy else 0.0
+        ratio = min(max(ratio, 0.0), 1.0)
+        nearest = min(nearest, math.hypot(point[0] - ax - ratio * dx, point[1] - ay - ratio * dy))
+    return nearest
+
+
+@pytest.mark.parametrize('tolerance', [0.01, 0.05])
+def test_fitted_arcs_stay_within_tolerance(tolerance):
+    # a slot: two half circles joined by straight lines
+    points = [Point(round(cx + 20 * math.cos(start + math.pi * idx / 60), 4),
+                    round(20 * math.sin(start + math.pi * idx / 60), 4))
+              for cx, start in ((0.0, math.pi / 2), (100.0, -math.pi / 2)) for idx in range(61)]
+    points.append(points[0])
+    fitter = ArcFitter(tolerance=tolerance)
+    machine = GCodeMachine()
+    traced = list()
+    for command in ['G90', f'G0X{format_number(points[0].x)}Y{format_number(points[0].y)}'] + list(
+            fitter.commands(points)):
+        machine.command(command)
+        traced.extend((point.x, point.y) for point in machine.points(tolerance / 10))
+    assert fitter.report.arcs > 0
+    assert fitter.report.lines_after < fitter.report.lines_before
+    expected = [(point.x, point.y) for point in points]
+    assert traced[0] == pytest.approx(expected[0]) and traced[-1] == pytest.approx(expected[-1])
+    assert all(distance(point, expected) <= 2 * tolerance for point in traced)
+    assert all(distance(point, traced) <= 2 * tolerance for point in expected)
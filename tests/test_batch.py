@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+from optimizer.batch import find_jobs, optimize_file, optimize_files
+from parser.io import GCodeFileReader, GCodeFileWriter
+
+
+def coordinates(filename: str) -> set:
+    return set((point.x, point.y) for edge in GCodeFileReader(filename, precision=None)
+               for point in (edge.point_a, edge.point_b))
+
+
+def test_jobs_are_optimized_in_a_pool(tmp_path):
+    rnd = random.Random(0)
+    for job in range(3):
+        commands = ['G21G90', 'M3S0']
+        for _ in range(100):
+            x, y = round(rnd.uniform(0, 100), 1), round(rnd.uniform(0, 100), 1)
+            commands.append(f'G0X{x}Y{y}S0')
+            commands.append(f'G1X{round(x + 2.5, 1)}Y{round(y + rnd.uniform(-5, 5), 1)}S800F1200')
+        GCodeFileWriter(str(tmp_path / f'job{job}.gcode')).write(commands + ['M5'])
+    jobs = find_jobs([str(tmp_path)], output_dir=str(tmp_path / 'optimized'))
+    reports = list(optimize_files(jobs, processes=2))
+    assert sorted((report.source, report.target) for report in reports) == sorted(jobs)
+    for report in reports:
+        assert report.error is None and report.edges > 0
+        assert report.travel_after < report.travel_before
+        assert coordinates(report.target) == coordinates(report.source)
+
+
+@pytest.mark.parametrize('options', [dict(), dict(dedup=True), dict(repeated_parts=True)])
+def test_coordinates_are_kept(tmp_path, options):
+    rnd = random.Random(0)
+    source = str(tmp_path / 'source.gcode')
+    target = str(tmp_path / 'target.gcode')
+    commands = ['G21G90', 'M3S0']
+    for _ in range(200):
+        x, y = round(rnd.uniform(0, 100), 3), round(rnd.uniform(0, 100), 3)
+        commands.append(f'G0X{x}Y{y}S0')
+        commands.append(f'G1X{round(x + rnd.uniform(-5, 5), 3)}Y{round(y + rnd.uniform(-5, 5), 3)}S800F1200')
+    commands.append('M5')
+    GCodeFileWriter(source).write(commands)
+    report = optimize_file(source, target, verify=True, **options)
+    assert report.error is None
+    assert coordinates(target) == coordinates(source)
+    assert report.missing_length == 0 and report.extra_length == 0
+
+
+def test_groups_are_cut_in_their_order(tmp_path):
+    source = str(tmp_path / 'source.gcode')
+    target = str(tmp_path / 'target.gcode')
+    commands = ['G21G90', 'M3S0']
+    for idx in range(30):
+        power, speed = ((1000, 300), (200, 3000), (500, 1000))[idx % 3]
+        commands += [f'G0X{idx}Y0S0', f'G1X{idx}Y10S{power}F{speed}']
+    GCodeFileWriter(source).write(commands + ['M5'])
+    for group_order, expected in (('file', [1000, 200, 500]), ('power', [200, 500, 1000]),
+                                  ('speed', [200, 500, 1000])):
+        report = optimize_file(source, target, group_order=group_order, verify=True)
+        assert report.groups == 3 and report.missing_length == 0 and report.extra_length == 0
+        powers = [edge.power for edge in GCodeFileReader(target)]
+        assert [power for idx, power in enumerate(powers) if idx == 0 or powers[idx - 1] != power] == expected
+
+
+def test_resent_job_reuses_its_tours(tmp_path):
+    rnd = random.Random(0)
+    source = str(tmp_path / 'source.gcode')
+    target = str(tmp_path / 'target.gcode')
+    commands = ['G21G90', 'M3S0']
+    for _ in range(50):
+        x, y = round(rnd.uniform(0, 100), 3), round(rnd.uniform(0, 100), 3)
+        commands += [f'G0X{x}Y{y}S0', f'G1X{x + 2}Y{y}S800F1200', f'G1X{x + 2}Y{y + 2}']
+    GCodeFileWriter(source).write(commands + ['M5'])
+    first = optimize_file(source, target, incremental=True, verify=True)
+    second = optimize_file(source, target, incremental=True, verify=True)
+    assert first.error is None and second.error is None
+    assert second.reused == 1.0
+    assert second.travel_after == pytest.approx(first.travel_after)
+    assert second.missing_length == 0 and second.extra_length == 0
@@ -0,0 +1,25 @@
+import pytest
+
+from parser.compression import COMPRESSIONS, compression
+from parser.io import GCodeFileReader, GCodeFileWriter
+
+COMMANDS = ['G21G90', 'M3S0'] + [command for idx in range(2000) for command in (
+    f'G0X{idx % 100}.25Y{idx // 100}.5S0', f'G1X{idx % 100 + 0.75}Y{idx // 100}.5S800F1200')] + ['M5']
+
+
+def ends(filename: str, background: bool = False) -> list:
+    return [(edge.point_a.x, edge.point_a.y, edge.point_b.x, edge.point_b.y)
+            for edge in GCodeFileReader(filename, precision=None, background=background)]
+
+
+@pytest.mark.parametrize('suffix', list(COMPRESSIONS.keys()))
+@pytest.mark.parametrize('background', [False, True])
+def test_compressed_files_read_as_plain(tmp_path, suffix, background):
+    plain = str(tmp_path / 'plain.gcode')
+    packed = str(tmp_path / f'packed.gcode{suffix}')
+    assert GCodeFileWriter(plain).write(COMMANDS) == GCodeFileWriter(packed).write(COMMANDS)
+    assert compression(plain) is None
+    assert compression(packed) is COMPRESSIONS[suffix]
+    expected = ends(plain)
+    assert len(expected) == 2000
+    assert ends(packed, background) == expected
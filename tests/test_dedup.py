@@ -0,0 +1,31 @@
+from optimizer.dedup import SegmentDeduplicator
+from parser.io import Point, Edge
+
+
+def ends(edges: list[Edge]) -> list[(str, str)]:
+    return [(str(edge.point_a), str(edge.point_b)) for edge in edges]
+
+
+def test_order_and_direction_are_kept():
+    edges = [Edge(Point(5.0, 0.0), Point(0.0, 0.0)),
+             Edge(Point(0.0, 0.0), Point(0.0, 5.0)),
+             Edge(Point(3.0, 3.0), Point(1.0, 1.0)),
+             Edge(Point(9.0, 1.0), Point(9.0, 7.0))]
+    assert ends(SegmentDeduplicator().deduplicate(edges)) == ends(edges)
+
+
+def test_duplicates_are_cut_once():
+    edges = [Edge(Point(0.0, 0.0), Point(4.0, 0.0)),
+             Edge(Point(4.0, 0.0), Point(4.0, 4.0)),
+             Edge(Point(4.0, 0.0), Point(0.0, 0.0))]
+    deduplicator = SegmentDeduplicator()
+    assert ends(deduplicator.deduplicate(edges)) == ends(edges[:2])
+    assert abs(deduplicator.report.removed_length - 4.0) < 1e-9
+
+
+def test_overlaps_are_split_in_the_order_of_the_first_edge():
+    edges = [Edge(Point(2.0, 0.0), Point(8.0, 0.0)),
+             Edge(Point(0.0, 0.0), Point(6.0, 0.0))]
+    result = SegmentDeduplicator().deduplicate(edges)
+    assert ends(result) == [('X2.0Y0.0', 'X6.0Y0.0'), ('X6.0Y0.0', 'X8.0Y0.0'), ('X0.0Y0.0', 'X2.0Y0.0')]
+    assert abs(sum(edge.length() for edge in result) - 8.0) < 1e-9
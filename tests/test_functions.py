@@ -0,0 +1,85 @@
+import random
+
+import pytest
+
+from parser import functions
+from parser.functions import to_columns
+from parser.io import Edge, Point
+from parser.stream import Stream
+
+
+@pytest.mark.parametrize('vectorized', [True, False])
+def test_batches_agree_with_elements(monkeypatch, vectorized):
+    if not vectorized:
+        monkeypatch.setattr(functions, 'np', None)
+    elif functions.np is None:
+        pytest.skip('numpy is not installed')
+    rnd = random.Random(0)
+    edges = [Edge(Point(rnd.random(), rnd.random()), Point(rnd.random(), rnd.random())) for _ in range(1000)]
+
+    def lengths(batch: dict):
+        return [((ax - bx) ** 2 + (ay - by) ** 2) ** 0.5
+                for ax, ay, bx, by in zip(batch['ax'], batch['ay'], batch['bx'], batch['by'])]
+
+    result = Stream(edges).map_batches(lengths, Edge.COLUMNS, batch_size=64, to_row=Edge.to_row).to_list()
+    assert result == pytest.approx([edge.length() for edge in edges])
+    kept = Stream(edges).filter_batches(lambda batch: [length > 0.5 for length in lengths(batch)], Edge.COLUMNS,
+                                        batch_size=64, to_row=Edge.to_row).to_list()
+    assert kept == [edge for edge in edges if edge.length() > 0.5]
+
+
+@pytest.mark.parametrize('vectorized', [True, False])
+def test_columns_keep_values_of_every_row(monkeypatch, vectorized):
+    if not vectorized:
+        monkeypatch.setattr(functions, 'np', None)
+    elif functions.np is None:
+        pytest.skip('numpy is not installed')
+    items = [{'a': 1, 'b': 2}, {'a': 3, 'b': 4.5}, {'a': 5, 'b': 6}]
+    columns = to_columns(items, {'a': 'a', 'b': 'b'})
+    assert list(columns['a']) == [1, 3, 5]
+    assert list(columns['b']) == [2, 4.5, 6]
+
+
+def test_distinct_partitions_are_sized_and_split_again(monkeypatch):
+    rnd = random.Random(0)
+    values = list(range(20_000)) * 2
+    rnd.shuffle(values)
+    depths = list()
+    partition = functions._partition
+
+    def recorded(data, partitions, *args, **kwargs):
+        files, sizes = partition(data, partitions, *args, **kwargs)
+        depths.append((kwargs.get('depth', 0), partitions))
+        return files, sizes
+
+    monkeypatch.setattr(functions, '_partition', recorded)
+    # the length of a list is known, so the partitions are sized from it
+    distinct = list(functions.external_distinct(values, memory_limit_size=50_000))
+    assert sorted(distinct) == list(range(20_000))
+    assert depths and all(depth == 0 and partitions > 16 for depth, partitions in depths)
+    depths.clear()
+    # too few partitions for the length of a generator are split again
+    distinct = list(functions.external_distinct(iter(values), memory_limit_size=50_000, partitions=2))
+    assert sorted(distinct) == list(range(20_000))
+    assert max(depth for depth, _ in depths) > 0
+
+
+def test_join_partitions_are_split_again(monkeypatch):
+    left = [{'key': idx, 'side': 'left'} for idx in range(0, 30_000, 2)]
+    right = [{'key': idx, 'side': 'right'} for idx in range(0, 30_000, 3)]
+    depths = list()
+    partition = functions._partition
+
+    def recorded(data, partitions, *args, **kwargs):
+        files, sizes = partition(data, partitions, *args, **kwargs)
+        depths.append(kwargs.get('depth', 0))
+        return files, sizes
+
+    monkeypatch.setattr(functions, '_partition', recorded)
+    pairs = list(functions.spilling_hash_join(iter(left), iter(right), lambda item: item['key'], True, True,
+                                              memory_limit_size=100_000, partitions=2))
+    assert all(pair[0]['key'] == pair[1]['key'] for pair in pairs if pair[0] and pair[1])
+    assert sum(1 for pair in pairs if pair[0] and pair[1]) == len(range(0, 30_000, 6))
+    keys = sorted((pair[0] or pair[1])['key'] for pair in pairs)
+    assert keys == sorted(set(range(0, 30_000, 2)) | set(range(0, 30_000, 3)))
+    assert max(depths) > 0
@@ -0,0 +1,69 @@
+import copy
+import random
+from collections import Counter
+
+import pytest
+
+from graph import Path, add_edge, calculate_paths
+from parser.io import Point, Edge
+
+
+def random_edges(rnd: random.Random) -> list[Edge]:
+    """
+    random edges on a small grid, so nodes are shared, with chains and closed chains of nodes of degree 2
+    """
+    points = [Point(float(rnd.randint(0, 6)), float(rnd.randint(0, 6))) for _ in range(rnd.randint(2, 30))]
+    edges = list()
+    for _ in range(rnd.randint(1, 40)):
+        point_a, point_b = rnd.sample(points, 2)
+        if str(point_a) != str(point_b):
+            edges.append(Edge(point_a, point_b))
+    for _ in range(rnd.randint(0, 3)):
+        x, y = rnd.uniform(0, 6), rnd.uniform(0, 6)
+        chain = [Point(round(x + idx * 0.37, 3), round(y + idx % 2 * 0.5, 3)) for idx in range(rnd.randint(3, 8))]
+        if rnd.random() < 0.5:
+            chain.append(chain[0])
+        else:
+            chain = [rnd.choice(points)] + chain + [rnd.choice(points)]
+        edges.extend(Edge(chain[idx - 1], chain[idx]) for idx in range(1, len(chain))
+                     if str(chain[idx - 1]) != str(chain[idx]))
+    return edges
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_every_edge_is_walked_once(seed):
+    rnd = random.Random(seed)
+    for _ in range(100):
+        edges = random_edges(rnd)
+        nodes = list()
+        matrix = dict()
+        for edge in edges:
+            add_edge(nodes, matrix, edge)
+        expected = Counter(set(frozenset((key_a, key_b)) for key_a in matrix for key_b in matrix[key_a]))
+        for contract in (False, True):
+            paths, densities = calculate_paths(nodes, copy.deepcopy(matrix), contract=contract)
+            walked = Counter()
+            for path, density in zip(paths, densities):
+                length = 0.0
+                for key_a, key_b in zip(path, path[1:]):
+                    assert key_b in matrix[key_a]
+                    walked[frozenset((key_a, key_b))] += 1
+                    length += matrix[key_a][key_b]
+                assert length == pytest.approx(density)
+            assert walked == expected
+
+
+def test_closed_path_is_entered_at_any_node_and_keeps_its_edges():
+    points = [Point(0.0, 0.0), Point(4.0, 0.0), Point(4.0, 3.0), Point(0.0, 3.0)]
+    path = Path(points + [points[0]], 14.0)
+    assert path.is_cycled and path.entries() == points
+    head = Point(5.0, 4.0)
+    assert path.distance(head) == pytest.approx(Point.length(head, points[2]))
+    edges = {frozenset((str(a), str(b))) for a, b in zip(path.points, path.points[1:])}
+    path.start_at(points[2])
+    assert path.points[0] is points[2] and path.points[-1] is points[2]
+    assert {frozenset((str(a), str(b))) for a, b in zip(path.points, path.points[1:])} == edges
+    open_path = Path(list(points), 11.0)
+    assert not open_path.is_cycled and open_path.entries() == [points[0], points[-1]]
+    open_path.start_at(points[-1])
+    assert open_path.points == points[::-1]
@@ -0,0 +1,43 @@
+import math
+
+import pytest
+
+from parser.io import GCodeMachine, GCodeFileReader, GCodeFileWriter, format_number
+
+
+def run(commands: list[str], tolerance: float = None) -> list[tuple]:
+    machine = GCodeMachine()
+    points = list()
+    for command in commands:
+        machine.command(command)
+        points.extend((point.x, point.y) for point in machine.points(tolerance))
+    return points
+
+
+def test_modal_state_units_and_relative_moves():
+    points = run(['G21G90', 'G1X10Y10S500F1000', 'X20 (the motion is modal)', 'G91', 'X5Y-5 ; relative',
+                  'G20', 'G90X1Y1'])
+    assert points == [(10.0, 10.0), (20.0, 10.0), (25.0, 5.0), (25.4, 25.4)]
+
+
+@pytest.mark.parametrize('command', ['G2X20Y0I10J0', 'G2X20Y0R10', 'G3X20Y0I10J0'])
+def test_arcs_are_linearized_within_tolerance(command):
+    tolerance = 0.01
+    points = run(['G90', 'G0X0Y0', command], tolerance)
+    assert points[-1] == pytest.approx((20.0, 0.0))
+    assert len(points) > 10
+    assert all(abs(math.hypot(x - 10.0, y) - 10.0) < 1e-9 for x, y in points)
+    for (ax, ay), (bx, by) in zip(points, points[1:]):
+        # the middle of a chord is the farthest from the arc
+        assert 10.0 - math.hypot((ax + bx) / 2 - 10.0, (ay + by) / 2) <= tolerance + 1e-9
+    clockwise = command.startswith('G2')
+    assert (points[len(points) // 2][1] > 0) == clockwise
+
+
+def test_written_coordinates_are_read_back(tmp_path):
+    filename = str(tmp_path / 'points.gcode')
+    values = [(12.3456, -0.0001), (0.1, 99.9999), (-45.5, 3.0)]
+    GCodeFileWriter(filename).write(['G90', 'M3S0'] + [f'G1X{format_number(x)}Y{format_number(y)}S100F600'
+                                                       for x, y in values] + ['M5'])
+    edges = list(GCodeFileReader(filename, precision=None))
+    assert [(edge.point_b.x, edge.point_b.y) for edge in edges] == values
@@ -0,0 +1,26 @@
+import random
+from collections import Counter
+
+import pytest
+
+from optimizer.parts import PartDetector
+from parser.io import Point, Edge
+
+
+def test_copies_are_walked_once_and_cover_every_edge():
+    rnd = random.Random(0)
+    shape = [(0.0, 0.0), (4.0, 0.0), (4.0, 3.0), (2.0, 5.0), (0.0, 3.0), (0.0, 0.0), (4.0, 3.0)]
+    edges = list()
+    for idx in range(12):
+        dx, dy = 10.0 * (idx % 4), 10.0 * (idx // 4)
+        points = [Point(x + dx, y + dy) for x, y in shape]
+        edges.extend(Edge(points[idx - 1], points[idx]) for idx in range(1, len(points)))
+    rnd.shuffle(edges)
+    detector = PartDetector()
+    paths, densities = detector.paths(edges)
+    walked = Counter(frozenset(((point_a.x, point_a.y), (point_b.x, point_b.y)))
+                     for path in paths for point_a, point_b in zip(path, path[1:]))
+    assert walked == Counter(frozenset(((edge.point_a.x, edge.point_a.y), (edge.point_b.x, edge.point_b.y)))
+                             for edge in edges)
+    assert sum(densities) == pytest.approx(sum(edge.length() for edge in edges))
+    assert (detector.report.parts, detector.report.classes, detector.report.repeated_parts) == (12, 1, 11)
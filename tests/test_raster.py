@@ -0,0 +1,49 @@
+import random
+import re
+
+import pytest
+
+from optimizer.raster import RasterOptimizer
+
+
+def image(rows: int, columns: int) -> list[str]:
+    """
+    a raster engraving: every pixel is a move of its own, runs of equal power and blank stretches
+    """
+    rnd = random.Random(0)
+    commands = ['G21G90', 'M3S0']
+    for row in range(rows):
+        commands.append(f'G0X0Y{row * 0.1:.1f}S0')
+        power = 0
+        for column in range(1, columns + 1):
+            if rnd.random() < 0.2:
+                power = rnd.choice((0, 0, 300, 600, 1000))
+            commands.append(f'G1X{column * 0.1:.1f}S{power}F1500')
+    return commands + ['M5']
+
+
+def pixels(commands) -> set:
+    """
+    the burned pixels of horizontal scanlines with their power
+    """
+    burned = set()
+    state = dict(G=0.0, X=0.0, Y=0.0, S=0.0)
+    for command in commands:
+        words = {word: float(value) for word, value in re.findall(r'([GXYS])(-?[0-9.]+)', command)}
+        x, y = state['X'], state['Y']
+        state.update(words)
+        if state['G'] == 1 and state['S'] > 0 and state['Y'] == y:
+            start, end = sorted((round(x * 10), round(state['X'] * 10)))
+            burned.update((round(y * 10), column, state['S']) for column in range(start, end))
+    return burned
+
+
+@pytest.mark.parametrize('bidirectional', [False, True])
+def test_burned_pixels_are_kept(bidirectional):
+    commands = image(20, 300)
+    optimizer = RasterOptimizer(commands, bidirectional=bidirectional)
+    optimized = list(optimizer)
+    assert optimizer.report.lines_after < optimizer.report.lines_before
+    assert optimizer.report.time_after < optimizer.report.time_before
+    assert pixels(optimized) == pixels(commands)
+    assert optimizer.report.lines_after == len(optimized)
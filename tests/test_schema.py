@@ -0,0 +1,38 @@
+import random
+
+from parser import schema
+from parser.schema import MetadataAggregator
+
+
+def records(n: int):
+    rnd = random.Random(0)
+    return ({'id': idx, 'name': f'job-{idx % 10}', 'material': {'thickness': rnd.random()},
+             'tags': ['engrave', 'cut'][:idx % 3], 'note': None if idx % 2 else 'x'} for idx in range(n))
+
+
+def test_small_jobs_are_aggregated_sequentially(monkeypatch):
+    monkeypatch.setattr(schema.Stream, 'parallelize', lambda *args, **kwargs: None)
+    expected = MetadataAggregator.aggregate(records(1000))
+    assert not expected.diff(MetadataAggregator.aggregate_parallel(records(1000), n=2))
+
+
+def test_parallel_schema_is_the_sequential_one(monkeypatch):
+    monkeypatch.setattr(schema.os, 'cpu_count', lambda: 2)
+    expected = MetadataAggregator.aggregate(records(1000))
+    assert not expected.diff(MetadataAggregator.aggregate_parallel(records(1000), n=2, batch_size=64, min_size=0))
+
+
+def test_compiled_validator_accepts_the_records_and_reports_problems():
+    validate = MetadataAggregator.aggregate(records(1000)).compile()
+    assert not any(validate(obj) for obj in records(1000))
+    broken = [({'id': 'x', 'name': 'job-1', 'material': {'thickness': 0.5}, 'tags': [], 'note': None},
+               ['.id!type: int -> str']),
+              ({'id': 1, 'name': 'job-1', 'material': {}, 'tags': ['cut'], 'note': 'x', 'extra': 1},
+               ['.material.thickness!deprecated', '.extra!new']),
+              ({'id': 2, 'name': None, 'material': {'thickness': 1}, 'tags': [3], 'note': 'x'},
+               ['.name!nullable: True -> False', '.material.thickness!type: float -> int',
+                '.tags.item!type: str -> int']),
+              ({'id': 3, 'name': 'job-11', 'material': {'thickness': 1.0}, 'tags': ['weld'], 'note': 'x'},
+               [".name!added:{'job-11'}", ".tags.item!added:{'weld'}"])]
+    for obj, problems in broken:
+        assert sorted(validate(obj)) == sorted(problems)
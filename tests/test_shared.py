@@ -0,0 +1,43 @@
+import gc
+import glob
+import os
+from itertools import count
+from multiprocessing import Value
+from multiprocessing.shared_memory import SharedMemory
+
+import pytest
+
+from parser.shared import SharedArrays, np
+from parser.stream import Stream, ParallelStream
+
+pytestmark = pytest.mark.skipif(np is None, reason='numpy is not installed')
+
+
+def test_block_is_unlinked_when_got_and_kept_by_views():
+    counter = Value('i', 0)
+    arrays = SharedArrays('pstest_', counter)
+    array = np.arange(1000, dtype=np.float64)
+    descriptor = arrays.put(array)
+    view = arrays.get(descriptor)
+    assert np.array_equal(view, array)
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(name=descriptor.name)
+    part = view[10:20]
+    del view
+    gc.collect()
+    assert np.array_equal(part, array[10:20])
+    assert SharedArrays.unlink('pstest_', counter) == 0
+
+
+def test_blocks_are_released_by_parallel_stream(monkeypatch):
+    monkeypatch.setattr(ParallelStream, '__JOBS__', count(7))
+
+    def factory(idx: int):
+        return lambda items: np.array([float(ends.sum()) for ends in items])
+
+    rnd = np.random.default_rng(0)
+    items = [rnd.random((1000, 4)) for _ in range(50)]
+    # the parallel stream is not referenced while its results are read
+    results = Stream(iter(items)).parallelize(n=2, max_queue_size=2, shared_memory=True).consume(factory).to_list()
+    assert sorted(np.concatenate(results).tolist()) == pytest.approx(sorted(float(ends.sum()) for ends in items))
+    assert not glob.glob(f'/dev/shm/ps{os.getpid()}x7_*')
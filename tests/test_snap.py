@@ -0,0 +1,30 @@
+import math
+import random
+
+from optimizer.snap import EndpointSnapper
+from parser.io import Point, Edge
+
+
+def test_broken_strokes_are_joined_within_tolerance():
+    rnd = random.Random(0)
+    tolerance = 0.05
+    edges = list()
+    for square in range(50):
+        x, y = rnd.uniform(0, 100), rnd.uniform(0, 100)
+        corners = [(x, y), (x + 5, y), (x + 5, y + 5), (x, y + 5), (x, y)]
+        # every end is moved by rounding a little, so no two strokes share an end exactly
+        edges.extend(Edge(*(Point(px + rnd.uniform(-0.01, 0.01), py + rnd.uniform(-0.01, 0.01))
+                            for px, py in (corners[idx - 1], corners[idx])))
+                     for idx in range(1, len(corners)))
+    snapper = EndpointSnapper(tolerance=tolerance)
+    result = snapper.snap(edges)
+    assert len(result) == len(edges)
+    assert snapper.report.paths_before == 200 and snapper.report.paths_after == 50
+    nodes = {(point.x, point.y) for edge in result for point in (edge.point_a, edge.point_b)}
+    assert len(nodes) == 200
+    for before, after in zip(edges, result):
+        for point, snapped in ((before.point_a, after.point_a), (before.point_b, after.point_b)):
+            assert math.hypot(point.x - snapped.x, point.y - snapped.y) <= tolerance
+    nodes = sorted(nodes)
+    assert all(math.hypot(ax - bx, ay - by) > tolerance
+               for idx, (ax, ay) in enumerate(nodes) for bx, by in nodes[idx + 1:])
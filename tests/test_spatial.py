@@ -0,0 +1,48 @@
+import random
+import time
+
+import pytest
+
+from optimizer.spatial import SpatialGrid
+from parser.io import Point
+
+
+def grid_of(points: list[Point]) -> SpatialGrid:
+    grid = SpatialGrid(SpatialGrid.cell_size_for(points))
+    for point in points:
+        grid.add(point, point)
+    return grid
+
+
+def nearest_distance(points: list[Point], point: Point) -> float:
+    return min(Point.length(point, other) for other in points)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_nearest_is_the_nearest_of_all_points(seed):
+    rnd = random.Random(seed)
+    # two far clusters, so most cells between them are empty
+    points = [Point(rnd.uniform(0, 10) + corner, rnd.uniform(0, 10) + corner)
+              for corner in (0.0, 500.0) for _ in range(300)]
+    grid = grid_of(points)
+    removed = set(rnd.sample(range(len(points)), 100))
+    for idx in removed:
+        grid.remove(points[idx], points[idx])
+    points = [point for idx, point in enumerate(points) if idx not in removed]
+    for _ in range(200):
+        query = Point(rnd.uniform(-100, 600), rnd.uniform(-100, 600))
+        point, _ = grid.nearest(query)
+        assert Point.length(query, point) == pytest.approx(nearest_distance(points, query))
+
+
+def test_far_queries_do_not_walk_empty_rings():
+    rnd = random.Random(0)
+    points = [Point(1000 + rnd.uniform(0, 100), 1000 + rnd.uniform(0, 100)) for _ in range(100_000)]
+    grid = grid_of(points)
+    queries = [Point(0.0, 0.0), Point(-1e6, 3e5), Point(1050.0, -2e5), Point(1e7, 1e7)]
+    started = time.perf_counter()
+    found = [grid.nearest(query)[0] for query in queries]
+    # a walk of the empty rings between the query and the points takes minutes
+    assert time.perf_counter() - started < 1.0
+    for query, point in zip(queries, found):
+        assert Point.length(query, point) == pytest.approx(nearest_distance(points, query))
@@ -0,0 +1,150 @@
+import os
+import random
+import tracemalloc
+
+import pytest
+
+from parser.io import Edge, Point
+from parser.stream import Stream, JoinStrategy, JoinType
+
+
+def edges(n: int):
+    rnd = random.Random(0)
+    return (Edge(Point(rnd.random(), rnd.random()), Point(rnd.random(), rnd.random())) for _ in range(n))
+
+
+def records(n: int):
+    rnd = random.Random(0)
+    return ({'id': 10 ** 6 + idx, 'name': f'job-{10 ** 6 + idx}', 'tags': ['engrave', 'cut'][:idx % 3],
+             'power': [rnd.random() for _ in range(idx % 5)]} for idx in range(n))
+
+
+def traced_size(supplier, count: int) -> int:
+    tracemalloc.start()
+    try:
+        data = supplier(count + 1)
+        before = tracemalloc.get_traced_memory()[0]
+        chunk = [next(data) for _ in range(count)]
+        return tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize('supplier', [edges, records])
+def test_pockets_fit_the_memory_limit(supplier):
+    mem_limit = 1_000_000
+    pockets = Stream(supplier(20_000)).to_pockets(mem_limit, calibrate=True).map(len).to_list()
+    assert sum(pockets) == 20_000
+    assert abs(traced_size(supplier, pockets[0]) / mem_limit - 1) < 0.15
+    assert not tracemalloc.is_tracing()
+
+
+def test_calibration_keeps_tracing_started_by_the_caller():
+    tracemalloc.start()
+    try:
+        pockets = Stream(edges(1000)).to_pockets(10_000, calibrate=True).map(len).to_list()
+        assert sum(pockets) == 1000
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize('join_type', list(JoinType))
+def test_join_strategies_agree(join_type):
+    left = [{'key': f'{idx:05}', 'side': 'left'} for idx in range(0, 3000, 2)]
+    right = [{'key': f'{idx:05}', 'side': 'right'} for idx in range(0, 3000, 3)]
+
+    def pairs(strategy: JoinStrategy) -> set:
+        return set(Stream.zip_stream(iter(left), iter(right), lambda item: item['key'], join_type, strategy,
+                                     mem_limit=10_000)
+                   .map(lambda pair: tuple(item['key'] if item else None for item in pair)).to_list())
+
+    sizes = {JoinType.FULL: 2000, JoinType.LEFT: 1500, JoinType.RIGHT: 1000, JoinType.INNER: 500}
+    expected = pairs(JoinStrategy.HASH)
+    assert len(expected) == sizes[join_type]
+    assert pairs(JoinStrategy.SORT_MERGE) == expected
+    assert pairs(JoinStrategy.SPILLING_HASH) == expected
+
+
+def test_external_sort_and_distinct_spill_and_agree_with_memory():
+    rnd = random.Random(0)
+    values = [rnd.randrange(5000) for _ in range(20_000)]
+    assert Stream(values).external_sorted(lambda value: value, mem_limit=10_000).to_list() == sorted(values)
+    assert Stream(values).external_sorted(lambda value: value, mem_limit=10_000, reverse=True).to_list() \
+        == sorted(values, reverse=True)
+    distinct = Stream(values).external_distinct(mem_limit=10_000, partitions=4).to_list()
+    assert sorted(distinct) == sorted(set(values))
+
+
+def test_fan_out_reads_once_and_feeds_every_consumer():
+    reads = list()
+
+    def data():
+        for idx in range(10_000):
+            reads.append(idx)
+            yield idx
+
+    first = lambda items: next(iter(items))
+    total, count, head = Stream(data()).fan_out(sum, lambda items: sum(1 for _ in items), first, buffer_size=64)
+    assert (total, count, head) == (sum(range(10_000)), 10_000, 0)
+    assert len(reads) == 10_000
+
+
+def test_cache_replays_spilled_items_without_reading_again():
+    reads = list()
+
+    def data():
+        for idx in range(5000):
+            reads.append(idx)
+            yield {'idx': idx, 'name': f'item-{idx}'}
+
+    cached = Stream(data()).cache(mem_limit=20_000)
+    first = iter(cached)
+    head = [next(first) for _ in range(100)]
+    assert list(cached) == list(cached) == head + list(first)
+    assert len(reads) == 5000
+
+
+def test_cache_removes_the_spill_file_when_iteration_is_stopped_early():
+    with Stream({'idx': idx, 'name': f'item-{idx}'} for idx in range(5000)).cache(mem_limit=20_000) as cached:
+        for item in cached:
+            if item['idx'] == 3000:
+                break
+        spill_file = cached._iter_._file_
+        assert not spill_file.closed
+    assert spill_file.closed
+
+
+@pytest.mark.parametrize('scaling', [dict(n=2), dict(n=1, min_n=1, max_n=3, scale_interval=0.05)])
+def test_parallel_metrics_count_every_item(scaling):
+    parallel = Stream(range(2000)).parallelize(max_queue_size=16, **scaling)
+    results = parallel.consume(lambda idx: lambda items: sum(items)).to_list()
+    assert sum(results) == sum(range(2000))
+    assert parallel.metrics.supplied == parallel.metrics.consumed == 2000
+    assert 1 <= len(parallel.metrics.items) <= 3
+
+
+def test_failures_of_parallel_processes_are_raised_by_the_reader():
+    def raising(idx: int):
+        def combiner(items):
+            for item in items:
+                if item == 500:
+                    raise ValueError(f'item {item} is broken')
+        return combiner
+
+    def dying(idx: int):
+        def combiner(items):
+            for _ in items:
+                os._exit(3)
+        return combiner
+
+    def data():
+        yield from range(500)
+        raise ValueError('source is broken')
+
+    with pytest.raises(ValueError, match='item 500 is broken'):
+        Stream(range(2000)).parallelize(n=2, max_queue_size=16).consume(raising).to_list()
+    with pytest.raises(ChildProcessError, match='exited with code 3'):
+        Stream(range(2000)).parallelize(n=2, max_queue_size=16).consume(dying).to_list()
+    with pytest.raises(ValueError, match='source is broken'):
+        Stream(data()).parallelize(n=2, max_queue_size=16).consume(lambda idx: sum).to_list()
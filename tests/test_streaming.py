@@ -0,0 +1,34 @@
+import math
+import random
+from collections import Counter
+
+import pytest
+
+from optimizer.streaming import StreamingOptimizer
+from parser.io import GCodeFileReader, GCodeFileWriter, Point, Edge
+
+
+def segments(edges) -> Counter:
+    return Counter(frozenset(((edge.point_a.x, edge.point_a.y), (edge.point_b.x, edge.point_b.y))) for edge in edges)
+
+
+def polygons(count: int) -> list[Edge]:
+    rnd = random.Random(0)
+    edges = list()
+    for _ in range(count):
+        cx, cy, radius, n = rnd.uniform(0, 200), rnd.uniform(0, 200), rnd.uniform(2, 20), rnd.randint(3, 40)
+        points = [Point(round(cx + radius * math.cos(2 * math.pi * idx / n), 3),
+                        round(cy + radius * math.sin(2 * math.pi * idx / n), 3)) for idx in range(n)]
+        edges.extend(Edge(points[idx - 1], points[idx]) for idx in range(n))
+    rnd.shuffle(edges)
+    return edges
+
+
+@pytest.mark.parametrize('window_size', [50, 100_000])
+def test_every_edge_is_cut(tmp_path, window_size):
+    edges = polygons(40)
+    target = str(tmp_path / 'target.gcode')
+    optimizer = StreamingOptimizer(edges, 1000.0, 600.0, window_size=window_size)
+    GCodeFileWriter(target).write(optimizer)
+    assert segments(GCodeFileReader(target, precision=None)) == segments(edges)
+    assert optimizer.report.edges == len(edges)
@@ -0,0 +1,36 @@
+import random
+
+import pytest
+
+from optimizer.verify import EquivalenceChecker, np
+from parser.io import Point, Edge
+
+VECTORIZED = (False, True) if np is not None else (False,)
+
+
+def grid(rows: int, columns: int, step: float) -> list[Edge]:
+    return [Edge(Point(column * step, row * 0.5), Point((column + 1) * step, row * 0.5))
+            for row in range(rows) for column in range(columns)]
+
+
+@pytest.mark.parametrize('vectorized', VECTORIZED)
+def test_reordered_reversed_and_merged_edges_are_equivalent(vectorized):
+    rnd = random.Random(0)
+    expected = grid(10, 20, 1.0)
+    actual = [Edge(edge.point_b, edge.point_a) for edge in expected[:100]] + [
+        Edge(expected[idx].point_a, expected[idx + 1].point_b) for idx in range(100, 200, 2)]
+    rnd.shuffle(actual)
+    assert EquivalenceChecker(vectorized=vectorized).check(expected, actual).is_equivalent
+
+
+@pytest.mark.parametrize('step', [1.0, 0.5])
+def test_removed_length_is_measured_whole_and_both_ways_agree(step):
+    rnd = random.Random(1)
+    expected = grid(20, 50, step)
+    removed = set(rnd.sample(range(len(expected)), 25))
+    actual = [edge for idx, edge in enumerate(expected) if idx not in removed]
+    actual.append(Edge(Point(-5.0, -5.0), Point(-1.0, -2.0)))
+    for vectorized in VECTORIZED:
+        report = EquivalenceChecker(vectorized=vectorized).check(expected, actual)
+        assert report.missing_length == pytest.approx(25 * step)
+        assert report.extra_length == pytest.approx(5.0)